@@ -0,0 +1,326 @@
+import json
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from serialization import dumps_str
+from streaming import Delay, EncodedEvent, format_sse_event, iter_events
+
+# Picsum placeholder images are JPEGs
+IMAGE_MIME_TYPE = 'image/jpeg'
+
+def _part_text(part: Any) -> str:
+    """Text of an A2A part or a chat content part ({"kind"|"type": "text", "text"})"""
+    if not isinstance(part, dict) or (part.get('kind') or part.get('type') or 'text') != 'text':
+        return ''
+    text = part.get('text') or ''
+    if not isinstance(text, str):
+        raise ValueError("text parts must have a string 'text'")
+    return text
+
+def _content_text(content: Any) -> str:
+    """Text of a message content that is a string or a list of parts"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return ''.join(_part_text(part) for part in content)
+    return ''
+
+def _pipeline_data(text: str, body: Dict[str, Any], files: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """Message request for the pipeline; latency, seed and dataset are accepted as extensions"""
+    return {
+        'text': text,
+        'files': [f for f in files or [] if isinstance(f, dict)],
+        'latency': body.get('latency'),
+        'seed': body.get('seed'),
+        'dataset': body.get('dataset')
+    }
+
+class A2ARequest:
+    """An A2A message:send / message:stream request translated for the message pipeline"""
+
+    __slots__ = ('context_id', 'message', 'data')
+
+    def __init__(self, body: Dict[str, Any]):
+        """
+        Args:
+            body: The request's JSON body ({"message": {"role", "parts", ...}, ...})
+        
+        Raises:
+            ValueError: If the body is not an object, the message is missing
+                or has no text, or a text part is not a string
+        """
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        message = body.get('message')
+        if not isinstance(message, dict):
+            raise ValueError("'message' must be an object")
+        text = _content_text(message.get('parts')) or _content_text(message.get('content'))
+        if not text:
+            raise ValueError("'message' must have a text part")
+
+        self.context_id = message.get('contextId') or uuid.uuid4().hex
+        self.message = {'kind': 'message', 'role': 'user', 'messageId': message.get('messageId') or uuid.uuid4().hex,
+                        'parts': [{'kind': 'text', 'text': text}]}
+        self.data = _pipeline_data(text, body, body.get('files'))
+
+class A2AEncoder:
+    """
+    Encodes message pipeline events as A2A task events
+
+    Thinking steps become working status updates carrying an agent message,
+    response text is appended to a single artifact, and the completion event
+    becomes the final completed status update. Every frame is a fixed prefix
+    and suffix around the JSON-encoded text, built once per task.
+    """
+
+    __slots__ = ('task_id', 'context_id', 'artifact_id', 'status_prefix', 'status_suffix', 'artifact_prefix',
+                 'artifact_suffix', 'first_artifact_suffix', 'image_prefix', 'task_frame', 'completed_frame',
+                 'cancel_frame', 'steps', 'appending')
+
+    def __init__(self, task_id: str, context_id: str):
+        self.task_id = task_id
+        self.context_id = context_id
+        self.artifact_id = f'{task_id}-response'
+        ids = f'"taskId": {json.dumps(task_id)}, "contextId": {json.dumps(context_id)}'
+        self.status_prefix = (f'data: {{"kind": "status-update", {ids}, "status": {{"state": "working", '
+                              f'"message": {{"kind": "message", "role": "agent", "messageId": "{task_id}-').encode()
+        self.status_suffix = b'}]}}, "final": false}\n\n'
+        artifact = f'data: {{"kind": "artifact-update", {ids}, "artifact": {{"artifactId": "{self.artifact_id}", "parts": ['
+        self.artifact_prefix = f'{artifact}{{"kind": "text", "text": '.encode()
+        self.artifact_suffix = b'}]}, "append": true, "lastChunk": false}\n\n'
+        self.first_artifact_suffix = b'}]}, "append": false, "lastChunk": false}\n\n'
+        self.image_prefix = f'{artifact}{{"kind": "file", "file": {{"mimeType": "{IMAGE_MIME_TYPE}", "uri": '.encode()
+        self.task_frame = format_sse_event({'kind': 'task', 'id': task_id, 'contextId': context_id,
+                                            'status': {'state': 'working'}})
+        self.completed_frame = self.status_frame('completed')
+        self.cancel_frame = self.status_frame('canceled')
+        self.steps = 0
+        self.appending = False
+
+    def status_frame(self, state: str) -> bytes:
+        """Final status update ending the task in `state`"""
+        return format_sse_event({'kind': 'status-update', 'taskId': self.task_id, 'contextId': self.context_id,
+                                 'status': {'state': state}, 'final': True})
+
+    def thinking(self, text: str) -> bytes:
+        self.steps += 1
+        return (self.status_prefix + f'thinking-{self.steps}", "parts": [{{"kind": "text", "text": '.encode()
+                + dumps_str(text) + self.status_suffix)
+
+    def text(self, text: str) -> bytes:
+        suffix = self.artifact_suffix if self.appending else self.first_artifact_suffix
+        self.appending = True
+        return self.artifact_prefix + dumps_str(text) + suffix
+
+    def image(self, url: str) -> bytes:
+        suffix = self.artifact_suffix if self.appending else self.first_artifact_suffix
+        self.appending = True
+        return self.image_prefix + dumps_str(url) + b'}' + suffix
+
+    def encode(self, events: Iterator[Any]) -> Iterator[Any]:
+        """
+        Translate pipeline events into encoded A2A frames
+        
+        Args:
+            events: Generator of data chunks and Delay markers
+        
+        Returns:
+            Generator of EncodedEvents and Delay markers for create_sse_response
+        """
+        yield EncodedEvent(self.task_frame, {})
+        for item in events:
+            if isinstance(item, Delay):
+                yield item
+            elif item.get('complete'):
+                yield EncodedEvent(self.completed_frame, item)
+            elif 'thinking' in item:
+                if item['thinking']:
+                    yield EncodedEvent(self.thinking(item['thinking']), item)
+            else:
+                frame = self.text(item.get('text', ''))
+                if item.get('imageUrl'):
+                    frame += self.image(item['imageUrl'])
+                yield EncodedEvent(frame, item)
+
+def a2a_task(request: A2ARequest, task_id: str, events: Iterator[Any]) -> Dict[str, Any]:
+    """
+    Run the pipeline to the end (performing its delays) and build the completed A2A task
+    
+    Args:
+        request: The parsed request
+        task_id: Id of the new task
+        events: Generator of data chunks and Delay markers
+    
+    Returns:
+        The task object: the response as one artifact, thinking steps as agent messages in its history
+    """
+    history = [request.message]
+    text, parts = [], []
+    for item in iter_events(events):
+        if item.get('thinking'):
+            history.append({'kind': 'message', 'role': 'agent', 'messageId': f'{task_id}-thinking-{len(history)}',
+                            'parts': [{'kind': 'text', 'text': item['thinking']}]})
+        elif 'text' in item:
+            text.append(item['text'])
+            if item.get('imageUrl'):
+                parts.append({'kind': 'file', 'file': {'mimeType': IMAGE_MIME_TYPE, 'uri': item['imageUrl']}})
+    parts.insert(0, {'kind': 'text', 'text': ''.join(text)})
+    return {
+        'kind': 'task',
+        'id': task_id,
+        'contextId': request.context_id,
+        'status': {'state': 'completed'},
+        'artifacts': [{'artifactId': f'{task_id}-response', 'parts': parts}],
+        'history': history
+    }
+
+class AgUiRequest:
+    """An AG-UI run request (RunAgentInput) translated for the message pipeline"""
+
+    __slots__ = ('thread_id', 'run_id', 'data')
+
+    def __init__(self, body: Dict[str, Any]):
+        """
+        Args:
+            body: The request's JSON body ({"threadId", "runId", "messages", ...})
+        
+        Raises:
+            ValueError: If the body is not an object, there is no user message
+                or a text part is not a string
+        """
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        messages = body.get('messages')
+        user_messages = [m for m in messages if isinstance(m, dict) and m.get('role') == 'user'] \
+            if isinstance(messages, list) else []
+        text = _content_text(user_messages[-1].get('content')) if user_messages else ''
+        if not text and isinstance(body.get('input'), str):
+            text = body['input']
+        if not text:
+            raise ValueError("'messages' must contain a user message")
+
+        self.thread_id = body.get('threadId') or uuid.uuid4().hex
+        self.run_id = body.get('runId') or uuid.uuid4().hex
+        self.data = _pipeline_data(text, body, body.get('attachments'))
+
+class AgUiEncoder:
+    """
+    Encodes message pipeline events as AG-UI run events
+
+    Thinking steps are sent between THINKING_START and THINKING_END as one
+    thinking text message, the response as one assistant text message, all
+    between RUN_STARTED and RUN_FINISHED. Start and end events are fixed
+    frames built once per run; content events are a prefix and suffix around
+    the JSON-encoded delta.
+    """
+
+    __slots__ = ('message_id', 'run_started', 'run_finished', 'thinking_start', 'thinking_end', 'text_start',
+                 'text_end', 'thinking_prefix', 'text_prefix', 'suffix', 'cancel_frame', 'thinking_open', 'text_open')
+
+    def __init__(self, thread_id: str, run_id: str):
+        ids = {'threadId': thread_id, 'runId': run_id}
+        self.message_id = f'{run_id}-response'
+        self.run_started = format_sse_event({'type': 'RUN_STARTED', **ids})
+        self.run_finished = format_sse_event({'type': 'RUN_FINISHED', **ids})
+        self.thinking_start = (format_sse_event({'type': 'THINKING_START'})
+                               + format_sse_event({'type': 'THINKING_TEXT_MESSAGE_START'}))
+        self.thinking_end = (format_sse_event({'type': 'THINKING_TEXT_MESSAGE_END'})
+                             + format_sse_event({'type': 'THINKING_END'}))
+        self.text_start = format_sse_event({'type': 'TEXT_MESSAGE_START', 'messageId': self.message_id,
+                                            'role': 'assistant'})
+        self.text_end = format_sse_event({'type': 'TEXT_MESSAGE_END', 'messageId': self.message_id})
+        self.thinking_prefix = b'data: {"type": "THINKING_TEXT_MESSAGE_CONTENT", "delta": '
+        # The run id comes from the client, so the message id is JSON-encoded rather than interpolated
+        self.text_prefix = (b'data: {"type": "TEXT_MESSAGE_CONTENT", "messageId": ' + dumps_str(self.message_id)
+                            + b', "delta": ')
+        self.suffix = b'}\n\n'
+        self.cancel_frame = format_sse_event({'type': 'RUN_ERROR', 'message': 'Run cancelled', 'code': 'cancelled'})
+        self.thinking_open = False
+        self.text_open = False
+
+    def thinking(self, text: str) -> bytes:
+        frame = self.thinking_prefix + dumps_str(text) + self.suffix
+        if not self.thinking_open:
+            self.thinking_open = True
+            frame = self.thinking_start + frame
+        return frame
+
+    def end_thinking(self) -> bytes:
+        if not self.thinking_open:
+            return b''
+        self.thinking_open = False
+        return self.thinking_end
+
+    def text(self, text: str) -> bytes:
+        # TEXT_MESSAGE_CONTENT deltas must not be empty
+        frame = self.text_prefix + dumps_str(text) + self.suffix if text else b''
+        if not self.text_open:
+            self.text_open = True
+            frame = self.end_thinking() + self.text_start + frame
+        return frame
+
+    def finish(self) -> bytes:
+        frame = self.end_thinking()
+        if self.text_open:
+            self.text_open = False
+            frame += self.text_end
+        return frame + self.run_finished
+
+    def encode(self, events: Iterator[Any]) -> Iterator[Any]:
+        """
+        Translate pipeline events into encoded AG-UI frames
+        
+        Args:
+            events: Generator of data chunks and Delay markers
+        
+        Returns:
+            Generator of EncodedEvents and Delay markers for create_sse_response
+        """
+        yield EncodedEvent(self.run_started, {})
+        for item in events:
+            if isinstance(item, Delay):
+                yield item
+            elif item.get('complete'):
+                yield EncodedEvent(self.finish(), item)
+            elif 'thinking' in item:
+                frame = self.thinking(item['thinking']) if item['thinking'] else b''
+                if item.get('thinkingComplete'):
+                    frame += self.end_thinking()
+                if frame:
+                    yield EncodedEvent(frame, item)
+            else:
+                text = item.get('text', '')
+                if item.get('imageUrl'):
+                    text += f"\n\n![image]({item['imageUrl']})\n\n"
+                yield EncodedEvent(self.text(text), item)
+
+def ag_ui_result(request: AgUiRequest, events: Iterator[Any]) -> Dict[str, Any]:
+    """
+    Run the pipeline to the end (performing its delays) and summarize the run
+    
+    AG-UI itself only streams; this is the reply for clients that POST /runs
+    without accepting text/event-stream.
+    
+    Args:
+        request: The parsed request
+        events: Generator of data chunks and Delay markers
+    
+    Returns:
+        The run's ids, the assistant message and, when there was any, the thinking text
+    """
+    content, thinking = [], []
+    for item in iter_events(events):
+        if 'thinking' in item:
+            thinking.append(item['thinking'])
+        elif 'text' in item:
+            content.append(item['text'])
+            if item.get('imageUrl'):
+                content.append(f"\n\n![image]({item['imageUrl']})\n\n")
+    result = {
+        'threadId': request.thread_id,
+        'runId': request.run_id,
+        'message': {'id': f'{request.run_id}-response', 'role': 'assistant', 'content': ''.join(content)}
+    }
+    if thinking:
+        result['thinking'] = ''.join(thinking)
+    return result
@@ -4,12 +4,25 @@ import time
 import uuid
 import random
 from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory, make_response
+from flask import Flask, g, request, jsonify, send_file, send_from_directory, make_response
 from flask_cors import CORS
+from werkzeug.http import parse_content_range_header
 from werkzeug.utils import secure_filename
-from streaming import create_sse_response, stream_response_generator
+from streaming import create_sse_response, stream_response_generator, FlushPolicy, stream_stats, active_streams
 from config_loader import config_manager
 from chart_generator import ChartGenerator
+from latency import LatencyModel
+from replay import ReplayRegistry, ReplayGap
+from uploads import UploadSessions, UploadTooLarge, IncompleteUpload, UploadAlreadyCompleted, DEFAULT_BUFFER_SIZE
+from file_store import BlobStore, FileIndex, ContentMismatch
+from thumbnails import ThumbnailPipeline
+from sessions import create_session_store, record_reply
+from response_cache import ResponseCache, request_key
+from state import create_backend
+from compression import Compression
+from agent_protocols import A2ARequest, A2AEncoder, AgUiRequest, AgUiEncoder, a2a_task, ag_ui_result
+from openai_compat import ChatRequest, ChunkEncoder, DEFAULT_MODEL, completion_response, error_body, new_completion_id
+import metrics
 
 app = Flask(__name__)
 
@@ -18,10 +31,54 @@ config = config_manager.get_backend_config()
 server_config = config_manager.get_server_config()
 uploads_config = config_manager.get_uploads_config()
 cors_config = config_manager.get_cors_config()
+streaming_config = config_manager.get_streaming_config()
+latency_model = LatencyModel(config_manager.get_latency_config())
+ChartGenerator.configure(config_manager.get_charts_config())
+
+# How SSE events are batched into socket writes
+sse_flush_policy = FlushPolicy.from_config(streaming_config.get("coalesce", {}))
+
+# Idle streams send a comment this often, so a client that has gone is noticed
+SSE_HEARTBEAT_SECONDS = streaming_config.get("heartbeatSeconds", 15)
+
+# Buffers that let dropped clients resume streams with Last-Event-ID
+replay_config = streaming_config.get("replay", {})
+replay_registry = ReplayRegistry.from_config(replay_config) if replay_config.get("enabled", True) else None
+
+# Backend shared by worker processes for caches and sessions (None keeps them in process)
+state_backend = create_backend(config_manager.get_state_config())
+
+# Cancels for streams served by another worker are left in the shared backend
+CANCEL_KEY_PREFIX = 'cancel:'
+CANCEL_TTL_SECONDS = 600
+
+def cancelled_elsewhere(stream_id):
+    """Whether a cancel for the stream was recorded by another worker"""
+    return state_backend.get(CANCEL_KEY_PREFIX + stream_id) is not None
+
+# Opt-in cache of /api/message/fetch responses for replayed prompts
+response_cache_config = config_manager.get_response_cache_config()
+response_cache = ResponseCache.from_config(response_cache_config, state_backend) if response_cache_config.get("enabled", False) else None
+SKIP_LATENCY_ON_HIT = response_cache_config.get("skipLatencyOnHit", True)
+
+# Negotiated gzip/br/zstd compression of JSON bodies and event streams
+compression_config = config_manager.get_compression_config()
+compression = Compression.from_config(compression_config) if compression_config.get("enabled", True) else None
+
+# Conversation state for the /api/session/* endpoints, keyed by the session cookie
+sessions_config = config_manager.get_sessions_config()
+session_store = create_session_store(sessions_config, state_backend)
+SESSION_COOKIE = sessions_config.get("cookieName", "session")
+
+# Prometheus metrics for /metrics; None when disabled
+metrics_registry = metrics.configure(config_manager.get_metrics_config())
+
+# Upload endpoints whose throughput is recorded
+UPLOAD_ENDPOINTS = {'upload_file', 'upload_file_stream', 'upload_session_range', 'session_upload'}
 
 # Enable CORS if configured
 if cors_config.get("enabled", True):
-    CORS(app)
+    CORS(app, expose_headers=['X-Stream-Id', 'X-Next-Cursor', 'X-Cache'], supports_credentials=True)
 
 # Configure uploads
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), uploads_config.get("folder", "uploads"))
@@ -29,9 +86,76 @@ ALLOWED_EXTENSIONS = set(uploads_config.get("allowedExtensions", ["png", "jpg",
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = uploads_config.get("maxContentLength", 16 * 1024 * 1024)  # Default 16MB
 
+# Streaming uploads bypass form parsing, so they have their own (much larger) limit
+STREAM_UPLOAD_LIMIT = uploads_config.get("maxStreamLength", 4 * 1024 * 1024 * 1024)  # Default 4GB
+STREAM_BUFFER_SIZE = uploads_config.get("streamBufferSize", DEFAULT_BUFFER_SIZE)
+
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Uploads are stored once per unique content; the index maps file ids to blobs
+blob_store = BlobStore(UPLOAD_FOLDER)
+file_index = FileIndex(os.path.join(UPLOAD_FOLDER, uploads_config.get("indexFile", "index.jsonl")),
+                       uploads_config.get("indexCompactAfter", 10000))
+# Unreferenced blobs are deleted once they have been idle this long
+BLOB_GRACE_SECONDS = uploads_config.get("blobGraceSeconds", 60)
+
+# Blobs never change, so clients may cache them for maxAge; the file body can be
+# offloaded to the front-end server with X-Sendfile or X-Accel-Redirect
+serving_config = uploads_config.get("serving", {})
+FILE_MAX_AGE = serving_config.get("maxAge", 365 * 24 * 3600)
+FILE_OFFLOAD = serving_config.get("offload")  # None, "sendfile" or "accel"
+ACCEL_REDIRECT_PREFIX = serving_config.get("accelRedirectPrefix", "/_uploads/")
+app.config['USE_X_SENDFILE'] = FILE_OFFLOAD == 'sendfile'
+
+# Thumbnails of uploaded images are rendered in a process pool after the upload returns
+thumbnail_pipeline = ThumbnailPipeline.from_config(uploads_config.get("thumbnails", {}))
+
+# Resumable uploads keep their parts in a subfolder of the upload folder
+upload_sessions = UploadSessions.from_config(UPLOAD_FOLDER, uploads_config.get("resumable", {}))
+
+@app.before_request
+def start_timer():
+    """Note when the request arrived, for the latency metrics"""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and observe its handler time (and upload throughput)"""
+    if metrics_registry is None or 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    endpoint = request.endpoint or 'unmatched'
+    metrics.http_requests.inc(1, endpoint, request.method, str(response.status_code))
+    metrics.http_latency.observe(elapsed, endpoint)
+    if endpoint in UPLOAD_ENDPOINTS and response.status_code < 300 and g.get('upload_bytes'):
+        metrics.upload_bytes.inc(g.upload_bytes, endpoint)
+        metrics.upload_throughput.observe(g.upload_bytes / max(elapsed, 1e-6), endpoint)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON bodies and event streams in the encoding the client accepts best"""
+    if compression is None or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype == 'text/event-stream' and compression.sse:
+        response.vary.add('Accept-Encoding')
+        encoding = compression.negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+        response.response = compression.stream(encoding, response.response)
+    elif response.mimetype == 'application/json' and not response.is_streamed:
+        response.vary.add('Accept-Encoding')
+        data = response.get_data()
+        encoding = compression.negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None or len(data) < compression.min_bytes:
+            return response
+        response.set_data(compression.compress(encoding, data))
+    else:
+        return response
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -57,6 +181,44 @@ def set_test_cookies(response):
     
     return response
 
+def declared_sha256():
+    """The upload's hex SHA-256 from the optional X-Content-SHA256 header"""
+    value = request.headers.get('X-Content-SHA256', '').lower()
+    if value and (len(value) != 64 or not all(c in '0123456789abcdef' for c in value)):
+        raise ContentMismatch('X-Content-SHA256 must be a hex SHA-256 digest')
+    return value or None
+
+def request_owner():
+    """The user a request acts for: the X-User-Id header, else the client's session"""
+    return request.headers.get('X-User-Id') or g.get('session_id') or request.cookies.get(SESSION_COOKIE) or None
+
+def file_metadata(record):
+    """The client-facing metadata of an indexed file"""
+    return {
+        'id': record['id'],
+        'name': record['name'],
+        'type': record['type'],
+        'size': record['size'],
+        'sha256': record['sha256'],
+        'created': record['created'],
+        'url': f"/api/files/{record['id']}/{record['name']}"
+    }
+
+def record_upload(name, content_type, size, sha256):
+    """Index a stored blob under a new file id and return the file metadata"""
+    record = {
+        'id': str(uuid.uuid4()),
+        'name': name,
+        'type': content_type,
+        'size': size,
+        'sha256': sha256,
+        'owner': request_owner(),
+        'created': time.time()
+    }
+    file_index.add(record)
+    thumbnail_pipeline.submit(blob_store.path(sha256), content_type)
+    return file_metadata(record)
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and return file metadata"""
@@ -69,23 +231,15 @@ def upload_file():
     
     if file and allowed_file(file.filename):
         filename = secure_filename(file.filename)
-        # Add timestamp to ensure uniqueness
-        timestamp = int(time.time())
-        unique_filename = f"{timestamp}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        try:
+            # Duplicate content is discarded (or, with X-Content-SHA256, never written)
+            size, sha256, _ = blob_store.receive(file.stream, expected_sha256=declared_sha256())
+        except ContentMismatch as e:
+            return jsonify({'error': str(e)}), 400
+        g.upload_bytes = size
         
         # Prepare file metadata for response
-        file_id = str(uuid.uuid4())
-        file_url = f"/api/files/{unique_filename}"
-        
-        response = jsonify({
-            'id': file_id,
-            'name': filename,
-            'type': file.content_type,
-            'size': os.path.getsize(file_path),
-            'url': file_url
-        })
+        response = jsonify(record_upload(filename, file.content_type, size, sha256))
         
         # Add test cookies to response
         response = set_test_cookies(response)
@@ -94,31 +248,276 @@ def upload_file():
     
     return jsonify({'error': 'File type not allowed'}), 400
 
+@app.route('/api/upload/stream', methods=['POST', 'PUT'])
+def upload_file_stream():
+    """Handle a raw-body upload, writing it to disk as it arrives"""
+    original_name = request.headers.get('X-File-Name', request.args.get('filename', ''))
+    if original_name == '':
+        return jsonify({'error': 'No file name given (X-File-Name header or filename parameter)'}), 400
+    if not allowed_file(original_name):
+        return jsonify({'error': 'File type not allowed'}), 400
+    
+    # Read wsgi.input directly: request.stream would hide readinto and the form
+    # parser would spool the whole body
+    length = request.content_length
+    if length is None and not request.environ.get('wsgi.input_terminated'):
+        return jsonify({'error': 'Content-Length required'}), 411
+    
+    try:
+        size, sha256, _ = blob_store.receive(request.environ['wsgi.input'], length, STREAM_UPLOAD_LIMIT,
+                                             STREAM_BUFFER_SIZE, declared_sha256())
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except (IncompleteUpload, ContentMismatch) as e:
+        return jsonify({'error': str(e)}), 400
+    g.upload_bytes = size
+    
+    response = jsonify(record_upload(secure_filename(original_name), request.mimetype or 'application/octet-stream',
+                                     size, sha256))
+    
+    # Add test cookies to response
+    response = set_test_cookies(response)
+    
+    return response
+
+@app.route('/api/upload/sessions', methods=['POST'])
+def create_upload_session():
+    """Start a resumable upload of a file of known size"""
+    data = request.json or {}
+    name = data.get('name', '')
+    size = data.get('size')
+    if name == '':
+        return jsonify({'error': 'No file name given'}), 400
+    if not allowed_file(name):
+        return jsonify({'error': 'File type not allowed'}), 400
+    if not isinstance(size, int) or size < 0:
+        return jsonify({'error': 'size must be a non-negative integer'}), 400
+    
+    try:
+        session = upload_sessions.create(secure_filename(name), size, data.get('type') or 'application/octet-stream')
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except OSError as e:
+        return jsonify({'error': f'Could not reserve space for the upload: {e.strerror}'}), 507
+    
+    return jsonify({
+        'uploadId': session['id'],
+        'size': size,
+        'url': f"/api/upload/sessions/{session['id']}"
+    }), 201
+
+@app.route('/api/upload/sessions/<upload_id>', methods=['PUT'])
+def upload_session_range(upload_id):
+    """Write one byte range of a resumable upload (Content-Range: bytes start-end/size)"""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired upload'}), 404
+    
+    content_range = parse_content_range_header(request.headers.get('Content-Range'))
+    if content_range is None or content_range.units != 'bytes' or content_range.start is None:
+        return jsonify({'error': 'Content-Range header required (bytes start-end/size)'}), 400
+    if content_range.length != session['size']:
+        return jsonify({'error': f"Content-Range size must be {session['size']}"}), 400
+    if request.content_length != content_range.stop - content_range.start:
+        return jsonify({'error': 'Content-Length does not match Content-Range'}), 400
+    
+    try:
+        upload_sessions.write(session, content_range.start, content_range.stop - 1,
+                              request.environ['wsgi.input'], STREAM_BUFFER_SIZE)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 416
+    except IncompleteUpload as e:
+        return jsonify({'error': str(e)}), 400
+    except UploadAlreadyCompleted as e:
+        return jsonify({'error': str(e)}), 409
+    g.upload_bytes = content_range.stop - content_range.start
+    
+    return upload_session_status(upload_id)
+
+@app.route('/api/upload/sessions/<upload_id>', methods=['GET'])
+def upload_session_status(upload_id):
+    """Report which byte ranges of a resumable upload have been received"""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired upload'}), 404
+    
+    try:
+        received = upload_sessions.received(session)
+        missing = upload_sessions.missing(session)
+    except UploadAlreadyCompleted:
+        # Completed between reading the session and its ranges
+        return jsonify({'error': 'Unknown or expired upload'}), 404
+    return jsonify({
+        'uploadId': upload_id,
+        'size': session['size'],
+        'receivedBytes': sum(end - start for start, end in received),
+        'received': [[start, end] for start, end in received],
+        'missing': [[start, end] for start, end in missing]
+    })
+
+@app.route('/api/upload/sessions/<upload_id>', methods=['DELETE'])
+def abort_upload_session(upload_id):
+    """Abandon a resumable upload"""
+    if upload_sessions.get(upload_id) is None:
+        return jsonify({'error': 'Unknown or expired upload'}), 404
+    upload_sessions.abort(upload_id)
+    return '', 204
+
+@app.route('/api/upload/sessions/<upload_id>/complete', methods=['POST'])
+def complete_upload_session(upload_id):
+    """Finish a resumable upload and return the file metadata"""
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        return jsonify({'error': 'Unknown or expired upload'}), 404
+    
+    try:
+        sha256, _ = upload_sessions.complete(session, blob_store)
+    except IncompleteUpload as e:
+        return jsonify({'error': str(e), 'missing': upload_sessions.missing(session)}), 409
+    except UploadAlreadyCompleted as e:
+        return jsonify({'error': str(e)}), 409
+    
+    response = jsonify(record_upload(session['name'], session['type'], session['size'], sha256))
+    
+    # Add test cookies to response
+    response = set_test_cookies(response)
+    
+    return response
+
+@app.route('/api/files', methods=['GET'])
+def list_files():
+    """List uploaded files, newest first, one page at a time (next page cursor in X-Next-Cursor)"""
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 1000)
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'limit and cursor must be integers'}), 400
+    
+    owner = request_owner()
+    if owner is None:
+        # FileIndex.page(None) lists every file; that is for internal callers, not anonymous clients
+        return jsonify([])
+    records, next_cursor = file_index.page(owner, limit, cursor)
+    response = jsonify([file_metadata(record) for record in records])
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = str(next_cursor)
+    return response
+
+@app.route('/api/files/<file_id>', methods=['DELETE'])
+def delete_file(file_id):
+    """Delete an uploaded file; its blob goes once no other file references it"""
+    record = file_index.get(file_id)
+    if record is None or record.get('owner') not in (None, request_owner()):
+        return jsonify({'error': 'File not found'}), 404
+    file_index.remove(file_id)
+    file_index.collect_garbage(blob_store, BLOB_GRACE_SECONDS)
+    return '', 204
+
+@app.route('/api/files/<file_id>/<name>', methods=['GET'])
+def get_file_content(file_id, name):
+    """Serve an uploaded file from the blob store"""
+    record = file_index.get(file_id)
+    if record is None:
+        return jsonify({'error': 'File not found'}), 404
+    
+    # ?size=<pixels> asks for one of the configured thumbnail sizes
+    size = request.args.get('size')
+    if size is not None and (not size.isdigit() or int(size) not in thumbnail_pipeline.sizes):
+        return jsonify({'error': f'size must be one of {thumbnail_pipeline.sizes}'}), 400
+    if size is None or not thumbnail_pipeline.accepts(record['type']):
+        # Files that never get thumbnails are served whole, with the usual caching
+        return send_blob(record, blob_store.path(record['sha256']), record['sha256'], record['type'])
+    
+    thumbnail = thumbnail_pipeline.find(blob_store.path(record['sha256']), int(size))
+    if thumbnail is None:
+        # Not rendered (yet): serve the original, but let the client pick up the thumbnail later
+        response = send_blob(record, blob_store.path(record['sha256']), record['sha256'], record['type'])
+        response.cache_control.immutable = False
+        response.cache_control.max_age = 0
+        response.cache_control.no_cache = True
+        response.expires = None
+        return response
+    mimetype = 'image/png' if thumbnail.endswith('.png') else 'image/jpeg'
+    return send_blob(record, thumbnail, f"{record['sha256']}-{size}", mimetype)
+
+def send_blob(record, path, etag, mimetype):
+    """
+    Serve a blob (or a file derived from it) with a content-based strong ETag
+    
+    Revalidations are answered with 304 before the file is opened. Range
+    requests are handled by send_file, or by the front-end server when the
+    body is offloaded to it.
+    """
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    elif FILE_OFFLOAD == 'accel':
+        # nginx serves the file (and any Range) from its internal location
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = ACCEL_REDIRECT_PREFIX + os.path.relpath(path, blob_store.blob_root)
+        response.content_type = mimetype
+    else:
+        response = send_file(path, mimetype=mimetype, download_name=record['name'],
+                             etag=etag, conditional=True, max_age=FILE_MAX_AGE)
+    
+    response.set_etag(etag)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = FILE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/api/files/<filename>', methods=['GET'])
 def get_file(filename):
-    """Serve uploaded files"""
+    """Get an uploaded file's metadata by id, or serve a file uploaded before content-addressed storage"""
+    record = file_index.get(filename)
+    if record is not None:
+        return jsonify(file_metadata(record))
+    
+    # Legacy names are <timestamp>_<name>; nothing else in the folder is served
+    timestamp, _, rest = filename.partition('_')
+    if not timestamp.isdigit() or not rest:
+        return jsonify({'error': 'File not found'}), 404
     return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
 
 @app.route('/api/message/stream', methods=['POST'])
 def stream_message():
     """Handle streaming message responses using SSE"""
-    data = request.json
+    return message_stream_response(request.json)
+
+def message_events(data):
+    """
+    The event pipeline for a message request, shared by every streaming protocol
+    
+    Args:
+        data: The message request ({"text", "files", "latency", "seed", "dataset"})
+        
+    Returns:
+        Generator of data chunks and Delay markers (see stream_response_generator)
+        
+    Raises:
+        ValueError: If the latency, seed or dataset options are invalid
+    """
     text = data.get('text', '')
     uploaded_files = data.get('files', [])
     
-    # Add delay before processing to test pause functionality
-    time.sleep(3)  # 3 second delay
+    # Per-request latency override: a profile name or a profile dictionary
+    latency = latency_model.resolve(data.get('latency'))
     
-    # Check for chart requests
-    chart_type = ChartGenerator.detect_chart_request(text)
-    chart_response = None
+    # Optional seed for deterministic (and cacheable) chart data
+    seed = data.get('seed')
+    if seed is not None and not isinstance(seed, int):
+        raise ValueError('seed must be an integer')
+    
+    # Optional large synthetic dataset for chart requests
+    dataset = ChartGenerator.dataset_spec(data.get('dataset'), seed)
+    
+    # Check for chart requests (type and data context in one keyword scan)
+    chart_type, data_context, _ = ChartGenerator.analyze(text)
+    chart_stream = None
     if chart_type:
-        data_context = ChartGenerator.detect_data_context(text)
-        if chart_type == 'all':
-            chart_response = ChartGenerator.create_all_charts_markdown(data_context)
-        else:
-            single_chart_data = ChartGenerator.generate_chart_data(chart_type, data_context)
-            chart_response = ChartGenerator.create_chart_markdown(single_chart_data)
+        # Rows are generated as the stream is consumed
+        chart_stream = ChartGenerator.stream_markdown(chart_type, data_context, seed, dataset)
     
     # Determine if we should include an image in the response
     include_image = any(f.get('type', '').startswith('image/') for f in uploaded_files) or (random.random() < 0.3)
@@ -129,16 +528,146 @@ def stream_message():
         image_size = 200 + (int(time.time()) % 100)
         image_url = f"https://picsum.photos/{image_size}/{image_size}?random={int(time.time())}"
     
-    # Create an SSE response using our generator
-    response = create_sse_response(
-        stream_response_generator(text, uploaded_files, image_url, chart_response)
-    )
+    # The first-token delay that tests pause functionality runs inside the
+    # stream so it never blocks the worker
+    return stream_response_generator(text, uploaded_files, image_url, latency=latency, chart_stream=chart_stream)
+
+def message_stream_response(data, observe=None):
+    """
+    Build the SSE response for a message request
+    
+    Args:
+        data: The request's JSON body
+        observe: Optional wrapper applied to the event generator, e.g. to
+            record the reply
+    """
+    try:
+        generator = message_events(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if observe is not None:
+        generator = observe(generator)
+    if replay_registry is not None:
+        # Events carry ids so the client can resume via /api/message/stream/<stream_id>
+        replay = replay_registry.open(generator)
+        stream_id, events = replay.stream_id, replay.attach()
+    else:
+        stream_id, events = uuid.uuid4().hex, generator
+    response = stream_response(stream_id, events)
     
     # Note: Cannot set cookies on SSE responses as they're streamed
     # If you need cookies for SSE, set them in a previous request
     
     return response
 
+@app.route('/api/message/stream/<stream_id>', methods=['GET'])
+def resume_stream(stream_id):
+    """Resume a dropped stream, replaying only the events after Last-Event-ID"""
+    replay = replay_registry.get(stream_id) if replay_registry is not None else None
+    if replay is None:
+        return jsonify({'error': 'Unknown or expired stream'}), 404
+    
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('lastEventId'))
+    try:
+        events = replay.attach(int(last_event_id) if last_event_id else None)
+    except ValueError:
+        return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+    except ReplayGap as e:
+        return jsonify({'error': str(e)}), 410
+    
+    return stream_response(stream_id, events)
+
+def stream_response(stream_id, events, cancel_frame=None):
+    """SSE response for a stream that can be cancelled by id via /api/message/stream/<stream_id>/cancel"""
+    control = active_streams.open(stream_id, cancelled_elsewhere if state_backend is not None else None)
+    response = create_sse_response(events, sse_flush_policy, g.request_started, control, SSE_HEARTBEAT_SECONDS,
+                                   cancel_frame)
+    response.headers['X-Stream-Id'] = stream_id
+    return response
+
+@app.route('/api/message/stream/<stream_id>/cancel', methods=['POST'])
+def cancel_stream(stream_id):
+    """Stop a stream: its connection ends with a cancelled event and its replay buffer is dropped"""
+    cancelled = active_streams.cancel(stream_id)
+    if replay_registry is not None and replay_registry.discard(stream_id):
+        cancelled = True
+    if cancelled:
+        return jsonify({'streamId': stream_id, 'cancelled': True})
+    if state_backend is not None:
+        # The stream may be open on another worker, which polls for this between waits
+        state_backend.set(CANCEL_KEY_PREFIX + stream_id, b'1', CANCEL_TTL_SECONDS)
+        return jsonify({'streamId': stream_id, 'cancelled': False, 'pending': True}), 202
+    return jsonify({'error': 'Unknown or finished stream'}), 404
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """OpenAI-compatible chat completions over the message pipeline, streamed or complete"""
+    try:
+        chat = ChatRequest(request.get_json(silent=True) or {})
+        events = message_events(chat.data)
+    except ValueError as e:
+        return jsonify(error_body(str(e))), 400
+    
+    if not chat.stream:
+        return jsonify(completion_response(chat, events))
+    
+    encoder = ChunkEncoder(new_completion_id(), chat.model, int(time.time()))
+    frames = encoder.encode(events, chat.prompt_tokens if chat.include_usage else None)
+    return stream_response(uuid.uuid4().hex, frames, encoder.cancel_frame)
+
+@app.route('/v1/models', methods=['GET'])
+def list_models():
+    """The single mock model served by /v1/chat/completions"""
+    return jsonify({'object': 'list', 'data': [
+        {'id': DEFAULT_MODEL, 'object': 'model', 'created': 0, 'owned_by': 'chat-ui'}
+    ]})
+
+@app.route('/api/message:send', methods=['POST'])
+def a2a_send():
+    """A2A message:send: run the message pipeline and return the completed task"""
+    try:
+        a2a = A2ARequest(request.get_json(silent=True) or {})
+        events = message_events(a2a.data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(a2a_task(a2a, uuid.uuid4().hex, events))
+
+@app.route('/api/message:stream', methods=['POST'])
+def a2a_stream():
+    """A2A message:stream: the message pipeline as task status and artifact update events"""
+    try:
+        a2a = A2ARequest(request.get_json(silent=True) or {})
+        events = message_events(a2a.data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    encoder = A2AEncoder(uuid.uuid4().hex, a2a.context_id)
+    return stream_response(encoder.task_id, encoder.encode(events), encoder.cancel_frame)
+
+@app.route('/api/runs', methods=['POST'])
+def ag_ui_run():
+    """AG-UI run: an event stream when the client accepts one, otherwise the run's result"""
+    if request.accept_mimetypes.best == 'text/event-stream':
+        return ag_ui_run_stream()
+    try:
+        run = AgUiRequest(request.get_json(silent=True) or {})
+        events = message_events(run.data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(ag_ui_result(run, events))
+
+@app.route('/api/runs/stream', methods=['POST'])
+def ag_ui_run_stream():
+    """AG-UI run as a stream of RUN_STARTED ... RUN_FINISHED events"""
+    try:
+        run = AgUiRequest(request.get_json(silent=True) or {})
+        events = message_events(run.data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    encoder = AgUiEncoder(run.thread_id, run.run_id)
+    # The run id is the client's and need not be unique, so the stream gets its own
+    return stream_response(uuid.uuid4().hex, encoder.encode(events), encoder.cancel_frame)
+
 @app.route('/api/message/fetch', methods=['POST'])
 def fetch_message():
     """Handle complete message responses"""
@@ -146,22 +675,49 @@ def fetch_message():
     text = data.get('text', '')
     uploaded_files = data.get('files', [])
     
+    try:
+        latency = latency_model.resolve(data.get('latency'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Optional seed for deterministic (and cacheable) chart data
+    seed = data.get('seed')
+    if seed is not None and not isinstance(seed, int):
+        return jsonify({'error': 'seed must be an integer'}), 400
+    
+    # Optional large synthetic dataset for chart requests
+    try:
+        dataset = ChartGenerator.dataset_spec(data.get('dataset'), seed)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Identical requests are answered from the cache unless the request sets "cache": false
+    cache_key = None
+    if response_cache is not None and data.get('cache', True):
+        cache_key = request_key(data)
+        body = response_cache.get(cache_key)
+        if body is not None:
+            if not SKIP_LATENCY_ON_HIT:
+                delay = latency.first_token()
+                if delay:
+                    time.sleep(delay)
+            response = app.response_class(body, mimetype='application/json')
+            response.headers['X-Cache'] = 'HIT'
+            return set_test_cookies(response)
+    
     # Add delay before processing to test pause functionality
-    time.sleep(3)  # 3 second delay
+    delay = latency.first_token()
+    if delay:
+        time.sleep(delay)
     
     # Check if thinking mode should be enabled
     enable_thinking = '/think' in text
     
-    # Check for chart requests
-    chart_type = ChartGenerator.detect_chart_request(text)
+    # Check for chart requests (type and data context in one keyword scan)
+    chart_type, data_context, _ = ChartGenerator.analyze(text)
     chart_response = None
     if chart_type:
-        data_context = ChartGenerator.detect_data_context(text)
-        if chart_type == 'all':
-            chart_response = ChartGenerator.create_all_charts_markdown(data_context)
-        else:
-            single_chart_data = ChartGenerator.generate_chart_data(chart_type, data_context)
-            chart_response = ChartGenerator.create_chart_markdown(single_chart_data)
+        chart_response = ChartGenerator.render_markdown(chart_type, data_context, seed, dataset)
     
     # Determine if we should include an image in the response
     include_image = any(f.get('type', '').startswith('image/') for f in uploaded_files) or (random.random() < 0.3)
@@ -192,12 +748,124 @@ def fetch_message():
         }
     
     response = jsonify(response_data)
+    if cache_key is not None:
+        response_cache.put(cache_key, response.get_data())
+        response.headers['X-Cache'] = 'MISS'
     
     # Add test cookies to response
     response = set_test_cookies(response)
     
     return response
 
+def current_session():
+    """The request's session, from the session cookie, started if needed"""
+    session, created = session_store.get_or_create(request.cookies.get(SESSION_COOKIE))
+    # Uploads and listings made through the session are owned by it
+    g.session_id = session.session_id
+    return session, created
+
+def with_session_cookie(response, session, created):
+    """Set the session cookie on a response for a newly started session"""
+    response = make_response(response)
+    if created:
+        response.set_cookie(SESSION_COOKIE, session.session_id, path='/', httponly=True, samesite='Lax')
+    return response
+
+def message_files(data):
+    """Ids of the files attached to a message request"""
+    return [f.get('id') for f in data.get('files', []) if isinstance(f, dict) and f.get('id')]
+
+@app.route('/api/session', methods=['GET'])
+def get_session():
+    """Return the session's recent messages"""
+    session, created = current_session()
+    return with_session_cookie(jsonify(session.to_dict()), session, created)
+
+@app.route('/api/session/message', methods=['POST'])
+def session_message():
+    """Handle a complete message response within the client's session"""
+    session, created = current_session()
+    data = request.json or {}
+    
+    response = make_response(fetch_message())
+    # A rejected request leaves no turn in the history
+    if response.status_code == 200:
+        session_store.append(session, 'user', data.get('text', ''), message_files(data))
+        session_store.append(session, 'assistant', response.get_json().get('text', ''))
+    return with_session_cookie(response, session, created)
+
+@app.route('/api/session/stream', methods=['POST'])
+def session_stream():
+    """Handle a streaming message response within the client's session"""
+    session, created = current_session()
+    data = request.json or {}
+    
+    response = make_response(message_stream_response(data, lambda events: record_reply(events, session_store,
+                                                                                         session)))
+    # The reply is recorded when the stream completes, so the request is recorded first
+    if response.status_code == 200:
+        session_store.append(session, 'user', data.get('text', ''), message_files(data))
+    return with_session_cookie(response, session, created)
+
+@app.route('/api/session/upload', methods=['POST'])
+def session_upload():
+    """Upload a file owned by the client's session"""
+    session, created = current_session()
+    return with_session_cookie(upload_file(), session, created)
+
+@app.route('/api/session/files', methods=['GET'])
+def session_files():
+    """List the files uploaded in the client's session"""
+    session, created = current_session()
+    return with_session_cookie(list_files(), session, created)
+
+@app.route('/api/session/files/<file_id>', methods=['GET'])
+def session_file(file_id):
+    """Get the metadata of a file uploaded in the client's session"""
+    session, created = current_session()
+    record = file_index.get(file_id)
+    if record is None or record.get('owner') != session.session_id:
+        return with_session_cookie((jsonify({'error': 'File not found'}), 404), session, created)
+    return with_session_cookie(jsonify(file_metadata(record)), session, created)
+
+@app.route('/api/session/mcp/config', methods=['GET'])
+def get_session_mcp_config():
+    """Return the session's MCP server configuration"""
+    session, created = current_session()
+    return with_session_cookie(jsonify(session.mcp_config or {'mcpServers': {}}), session, created)
+
+@app.route('/api/session/mcp/config', methods=['POST'])
+def save_session_mcp_config():
+    """Replace the session's MCP server configuration"""
+    session, created = current_session()
+    config = request.json
+    if not isinstance(config, dict) or not isinstance(config.get('mcpServers'), dict):
+        return with_session_cookie((jsonify({'error': 'mcpServers must be an object'}), 400), session, created)
+    session_store.set_mcp_config(session, {'mcpServers': config['mcpServers']})
+    return with_session_cookie(jsonify({'success': True}), session, created)
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Report runtime counters for this worker process"""
+    return jsonify({
+        'sse': stream_stats.snapshot(),
+        'chartCache': ChartGenerator.render_cache.stats(),
+        'replay': replay_registry.stats() if replay_registry is not None else None,
+        'files': file_index.stats(),
+        'thumbnails': thumbnail_pipeline.stats(),
+        'sessions': session_store.stats(),
+        'responseCache': response_cache.stats() if response_cache is not None else None,
+        'state': state_backend.stats() if state_backend is not None else None,
+        'compression': compression.stats() if compression is not None else None
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics of this worker (or of all workers, with a shared metrics directory)"""
+    if metrics_registry is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return app.response_class(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -210,5 +878,5 @@ if __name__ == '__main__':
     app.run(
         host=server_config.get("host", "0.0.0.0"), 
         port=port, 
-        debug=server_config.get("debug", True)
+        debug=server_config.get("debug", False)
     ) 
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""
+Benchmarks for the Chat UI backend
+
+Each module is runnable on its own from the backend directory, e.g.
+``python -m benchmarks.concurrent_streams``. Nothing here touches the network
+beyond the loopback interface.
+"""
@@ -0,0 +1,96 @@
+"""
+Micro-benchmark: chart intent detection on long inputs
+
+Compares ChartGenerator.analyze (one lower-casing, precompiled gated keyword
+probes) with the previous request path, which lower-cased the text and ran
+separate substring scans in detect_chart_request and detect_data_context.
+
+    python -m benchmarks.chart_detection --kb 50
+"""
+import argparse
+import random
+import time
+
+from chart_generator import ChartGenerator
+
+FILLER = ("the quick brown fox jumps over the lazy dog while we discuss quarterly "
+          "planning notes lorem ipsum dolor sit amet consectetur adipiscing elit").split()
+
+def legacy_detect(text):
+    """The detection logic as it was before the precompiled matcher"""
+    text_lower = text.lower()
+    chart_type = None
+    if any(k in text_lower for k in ChartGenerator.TEST_ALL_KEYWORDS):
+        chart_type = 'all'
+    else:
+        for candidate, keywords in ChartGenerator.CHART_KEYWORDS.items():
+            if any(k in text_lower for k in keywords):
+                chart_type = candidate
+                break
+        else:
+            if any(k in text_lower for k in ChartGenerator.CHART_INDICATORS):
+                chart_type = 'bar'
+    data_context = None
+    if chart_type:
+        text_lower = text.lower()
+        data_context = 'sales'
+        for candidate, keywords in ChartGenerator.CONTEXT_KEYWORDS.items():
+            if any(k in text_lower for k in keywords):
+                data_context = candidate
+                break
+    return chart_type, data_context
+
+def make_inputs(kb, seed=7):
+    """Long prompts: no keywords, a keyword at the end, and a keyword at the start"""
+    rng = random.Random(seed)
+    words = []
+    while sum(len(w) + 1 for w in words) < kb * 1024:
+        words.append(rng.choice(FILLER))
+    filler = ' '.join(words)
+    return {
+        'no match': filler,
+        'match at end': filler + ' please show this as a line chart of device usage',
+        'match at start': 'show a scatter plot of revenue ' + filler
+    }
+
+def run(kb=50, iterations=200):
+    """
+    Time both implementations on each input
+    
+    Args:
+        kb: Approximate input size in KiB
+        iterations: Calls per measurement
+        
+    Returns:
+        Dictionary keyed by input name with per-call timings in microseconds
+    """
+    results = {}
+    for name, text in make_inputs(kb).items():
+        intent = ChartGenerator.analyze(text)
+        assert (intent.chart_type, intent.data_context) == legacy_detect(text), name
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            legacy_detect(text)
+        legacy = (time.perf_counter() - started) / iterations * 1e6
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            ChartGenerator.analyze(text)
+        matcher = (time.perf_counter() - started) / iterations * 1e6
+
+        results[name] = {'legacy_us': legacy, 'matcher_us': matcher, 'speedup': legacy / matcher}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--kb', type=int, default=50, help='input size in KiB')
+    parser.add_argument('--iterations', type=int, default=200, help='calls per measurement')
+    args = parser.parse_args()
+
+    print(f"{'input':>15} {'legacy us':>10} {'matcher us':>11} {'speedup':>8}")
+    for name, r in run(args.kb, args.iterations).items():
+        print(f"{name:>15} {r['legacy_us']:>10.1f} {r['matcher_us']:>11.1f} {r['speedup']:>7.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: response compression, CPU cost against bytes saved
+
+Compresses the same multi-chart response with every available encoding and a
+range of levels, three ways: as an SSE stream flushed after every event, as
+an SSE stream coalesced into 4 KB writes, and as the complete JSON body of
+/api/message/fetch. Reports bytes per response, the share saved and CPU time
+per response.
+
+    python -m benchmarks.compression --responses 50
+"""
+import argparse
+import json
+import time
+
+from chart_generator import ChartGenerator
+from compression import Compression, STREAMS, compress_body
+from latency import LatencyProfile
+from streaming import FlushPolicy, IMMEDIATE_FLUSH, StreamStats, stream_response_generator, write_sse_frames
+
+ZERO_LATENCY = {"firstToken": 0, "interToken": 0, "thinkingStep": 0, "thinkingComplete": 0}
+
+LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 6, 11), 'zstd': (1, 3, 9)}
+
+def sse_writes(chart_response, policy):
+    """The writes of one stream of chart_response under a flush policy"""
+    generator = stream_response_generator("/think test all charts", [], None, chart_response,
+                                          LatencyProfile(ZERO_LATENCY))
+    return list(write_sse_frames(generator, policy, StreamStats()))
+
+def measure_stream(writes, encoding, level, responses):
+    """Bytes out and CPU seconds per response for a stream compressed write by write"""
+    compression = Compression([encoding], {encoding: level})
+    size = 0
+    started = time.process_time()
+    for _ in range(responses):
+        for data in compression.stream(encoding, iter(writes)):
+            size += len(data)
+    return size / responses, (time.process_time() - started) / responses
+
+def measure_body(body, encoding, level, responses):
+    size = 0
+    started = time.process_time()
+    for _ in range(responses):
+        size += len(compress_body(encoding, body, level))
+    return size / responses, (time.process_time() - started) / responses
+
+def run(responses=50):
+    """
+    Compress the chart response with each encoding and level
+
+    Args:
+        responses: Responses compressed per combination
+
+    Returns:
+        List of result rows: mode, encoding, level, bytes in and out, saved share, CPU ms
+    """
+    chart_response = ChartGenerator.create_all_charts_markdown('sales')
+    modes = {
+        'sse/event': sse_writes(chart_response, IMMEDIATE_FLUSH),
+        'sse/4KB': sse_writes(chart_response, FlushPolicy(max_bytes=4096, max_latency=0.020)),
+        'json': json.dumps({'text': chart_response, 'imageUrl': None}).encode()
+    }
+    rows = []
+    for mode, content in modes.items():
+        bytes_in = len(content) if mode == 'json' else sum(len(write) for write in content)
+        for encoding in STREAMS:
+            for level in LEVELS[encoding]:
+                if mode == 'json':
+                    bytes_out, cpu = measure_body(content, encoding, level, responses)
+                else:
+                    bytes_out, cpu = measure_stream(content, encoding, level, responses)
+                rows.append({'mode': mode, 'encoding': encoding, 'level': level, 'bytes_in': bytes_in,
+                             'bytes_out': bytes_out, 'saved': 1 - bytes_out / bytes_in, 'cpu_ms': cpu * 1000})
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--responses', type=int, default=50, help='responses compressed per combination')
+    args = parser.parse_args()
+
+    print(f"{'mode':>9} {'encoding':>8} {'level':>5} {'bytes in':>9} {'bytes out':>9} {'saved':>6} {'cpu ms':>7}")
+    for r in run(args.responses):
+        print(f"{r['mode']:>9} {r['encoding']:>8} {r['level']:>5} {r['bytes_in']:>9} {r['bytes_out']:>9.0f} "
+              f"{r['saved']:>6.0%} {r['cpu_ms']:>7.3f}")
+
+if __name__ == '__main__':
+    main()
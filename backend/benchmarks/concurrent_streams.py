@@ -0,0 +1,103 @@
+"""
+Load test: many concurrent SSE streams served by one process
+
+Starts the Flask app under gevent's WSGI server (the same cooperative model as
+the gunicorn gevent worker) and opens N simultaneous /api/message/stream
+requests from greenlets in the same process.
+
+    python -m benchmarks.concurrent_streams --streams 2000
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import http.client
+import json
+import time
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+from app import app
+from benchmarks.utils import peak_rss_mb, percentile, raise_open_file_limit
+
+def open_stream(port, text, results):
+    """Run one streaming request to completion and record its timings"""
+    started = time.perf_counter()
+    first_event = None
+    events = 0
+    try:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        conn.request('POST', '/api/message/stream', body=json.dumps({'text': text, 'files': []}),
+                      headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        for line in response:
+            if not line.startswith(b'data: '):
+                continue
+            events += 1
+            if first_event is None:
+                first_event = time.perf_counter() - started
+            if b'"complete":true' in line:
+                break
+        conn.close()
+        results.append({
+            'ok': True,
+            'ttfe': first_event,
+            'duration': time.perf_counter() - started,
+            'events': events
+        })
+    except Exception as e:
+        results.append({'ok': False, 'error': repr(e)})
+
+def run(streams=1000, text="Hello there, how are you today?"):
+    """
+    Open `streams` concurrent streams against an in-process server
+    
+    Args:
+        streams: Number of simultaneous streaming requests
+        text: Prompt sent with every request
+        
+    Returns:
+        Dictionary of throughput and latency results
+    """
+    raise_open_file_limit(streams * 2 + 256)
+    server = WSGIServer(('127.0.0.1', 0), app, log=None, backlog=streams)
+    server.start()
+    port = server.server_port
+
+    results = []
+    started = time.perf_counter()
+    greenlets = [gevent.spawn(open_stream, port, text, results) for _ in range(streams)]
+    gevent.joinall(greenlets)
+    elapsed = time.perf_counter() - started
+    server.stop()
+
+    ok = [r for r in results if r['ok']]
+    ttfe = [r['ttfe'] for r in ok if r['ttfe'] is not None]
+    durations = [r['duration'] for r in ok]
+    return {
+        'streams': streams,
+        'completed': len(ok),
+        'failed': len(results) - len(ok),
+        'wall_seconds': elapsed,
+        'events': sum(r['events'] for r in ok),
+        'ttfe_p50': percentile(ttfe, 50),
+        'ttfe_p99': percentile(ttfe, 99),
+        'duration_p50': percentile(durations, 50),
+        'duration_p99': percentile(durations, 99),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--streams', type=int, default=1000, help='concurrent streams to open')
+    parser.add_argument('--text', default="Hello there, how are you today?", help='prompt to send')
+    args = parser.parse_args()
+
+    result = run(args.streams, args.text)
+    for key, value in result.items():
+        print(f"{key:>14}: {value:.3f}" if isinstance(value, float) else f"{key:>14}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: large synthetic chart datasets
+
+Times vectorized generation against the pure-Python fallback, LTTB and
+min/max downsampling to the row budget, and rendering the downsampled table
+through ChartGenerator.stream_markdown.
+
+    python -m benchmarks.dataset_generation --points 10000 100000 1000000
+"""
+import argparse
+import time
+
+import datasets
+from chart_generator import ChartGenerator
+from datasets import DatasetSpec
+
+def timed(fn, *args):
+    """Run fn once and return (result, elapsed milliseconds)"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+def run(points=(10000, 100000, 1000000), series=3, max_rows=2000, python_limit=200000):
+    """
+    Time each stage for every dataset size
+    
+    Args:
+        points: Dataset sizes to measure
+        series: Series per dataset
+        max_rows: Row budget for downsampling
+        python_limit: Largest size also timed with the pure-Python generator
+        
+    Returns:
+        Dictionary keyed by point count with per-stage timings in milliseconds
+        (python_ms is None when skipped or NumPy is unavailable)
+    """
+    results = {}
+    for n in points:
+        spec = DatasetSpec(points=n, series=series, trend=0.01, period=max(n // 20, 2), amplitude=25.0,
+                           seed=1, max_rows=max_rows)
+        values, generate_ms = timed(datasets.generate, spec)
+
+        python_ms = None
+        if datasets.np is not None and n <= python_limit:
+            numpy_module, datasets.np = datasets.np, None
+            try:
+                _, python_ms = timed(datasets.generate, spec)
+            finally:
+                datasets.np = numpy_module
+
+        _, lttb_ms = timed(datasets.downsample_indices, values[0], max_rows, 'lttb')
+        _, minmax_ms = timed(datasets.downsample_indices, values[0], max_rows, 'minmax')
+        markdown, render_ms = timed(lambda: ''.join(ChartGenerator.stream_markdown('line', dataset=spec)))
+
+        results[n] = {
+            'generate_ms': generate_ms,
+            'python_ms': python_ms,
+            'lttb_ms': lttb_ms,
+            'minmax_ms': minmax_ms,
+            'render_ms': render_ms,
+            'markdown_kb': len(markdown) / 1024
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--points', type=int, nargs='+', default=[10000, 100000, 1000000], help='dataset sizes')
+    parser.add_argument('--series', type=int, default=3, help='series per dataset')
+    parser.add_argument('--max-rows', type=int, default=2000, help='row budget')
+    parser.add_argument('--python-limit', type=int, default=200000,
+                        help='largest size also timed with the pure-Python generator')
+    args = parser.parse_args()
+
+    if datasets.np is None:
+        print("NumPy is not installed; timings use the pure-Python fallback")
+    print(f"{'points':>9} {'generate ms':>12} {'python ms':>10} {'lttb ms':>8} {'minmax ms':>10} "
+          f"{'render ms':>10} {'table KiB':>10}")
+    for n, r in run(args.points, args.series, args.max_rows, args.python_limit).items():
+        python_ms = f"{r['python_ms']:>10.1f}" if r['python_ms'] is not None else f"{'-':>10}"
+        print(f"{n:>9} {r['generate_ms']:>12.1f} {python_ms} {r['lttb_ms']:>8.1f} {r['minmax_ms']:>10.1f} "
+              f"{r['render_ms']:>10.1f} {r['markdown_kb']:>10.1f}")
+
+if __name__ == '__main__':
+    main()
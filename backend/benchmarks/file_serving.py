@@ -0,0 +1,105 @@
+"""
+Load test: requests/sec for hot small files
+
+Starts the Flask app under gevent's WSGI server, uploads a set of small
+files and has concurrent keep-alive clients fetch them: through the legacy
+/api/files/<filename> route (send_from_directory), through
+/api/files/<id>/<name>, and revalidating with If-None-Match (304).
+
+    python -m benchmarks.file_serving --files 50 --requests 5000 --clients 20
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import http.client
+import os
+import shutil
+import tempfile
+import time
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+import app as backend
+from benchmarks.utils import percentile
+from file_store import BlobStore, FileIndex
+
+def client(port, paths, count, headers, latencies):
+    """Issue count GETs over one keep-alive connection, cycling through paths"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    for i in range(count):
+        path, etag = paths[i % len(paths)]
+        started = time.perf_counter()
+        conn.request('GET', path, headers={'If-None-Match': etag} if headers else {})
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+
+def run(files=50, size=4096, requests=5000, clients=20):
+    """
+    Measure each serving mode
+    
+    Args:
+        files: Number of distinct files
+        size: Size of each file in bytes
+        requests: Total requests per mode
+        clients: Concurrent keep-alive connections
+        
+    Returns:
+        Dictionary keyed by mode with requests/sec and latency percentiles
+    """
+    folder = tempfile.mkdtemp(dir=backend.UPLOAD_FOLDER)
+    backend.blob_store = BlobStore(folder)
+    backend.file_index = FileIndex(os.path.join(folder, 'index.jsonl'))
+    server = WSGIServer(('127.0.0.1', 0), backend.app, log=None)
+    server.start()
+    web = backend.app.test_client()
+
+    current, legacy = [], []
+    for i in range(files):
+        body = os.urandom(size)
+        response = web.post('/api/upload/stream', data=body,
+                            headers={'X-File-Name': f'thumb{i}.png', 'Content-Type': 'image/png'})
+        current.append((response.json['url'], f'"{response.json["sha256"]}"'))
+        legacy_name = f'{int(time.time())}_bench{i}.png'
+        with open(os.path.join(backend.UPLOAD_FOLDER, legacy_name), 'wb') as f:
+            f.write(body)
+        legacy.append((f'/api/files/{legacy_name}', ''))
+
+    results = {}
+    for mode, paths, revalidate in (('legacy', legacy, False), ('blob', current, False), ('304', current, True)):
+        latencies = []
+        started = time.perf_counter()
+        greenlets = [gevent.spawn(client, server.server_port, paths, requests // clients, revalidate, latencies)
+                     for _ in range(clients)]
+        gevent.joinall(greenlets, raise_error=True)
+        elapsed = time.perf_counter() - started
+        results[mode] = {
+            'requests_per_s': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000
+        }
+
+    server.stop()
+    shutil.rmtree(folder)
+    for path, _ in legacy:
+        os.remove(os.path.join(backend.UPLOAD_FOLDER, path.rsplit('/', 1)[1]))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--files', type=int, default=50, help='distinct files')
+    parser.add_argument('--size', type=int, default=4096, help='file size in bytes')
+    parser.add_argument('--requests', type=int, default=5000, help='requests per mode')
+    parser.add_argument('--clients', type=int, default=20, help='concurrent keep-alive connections')
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, r in run(args.files, args.size, args.requests, args.clients).items():
+        print(f"{mode:>8} {r['requests_per_s']:>9.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+if __name__ == '__main__':
+    main()
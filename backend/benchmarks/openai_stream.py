@@ -0,0 +1,130 @@
+"""
+Benchmark: OpenAI-compatible streaming against the REST stream
+
+Compares /v1/chat/completions (chat.completion.chunk frames) with
+/api/message/stream, first through the SSE writer in-process (encoding cost
+per event and bytes per stream), then over HTTP against an in-process gevent
+server (streams/sec and time to first token at a fixed concurrency).
+
+    python -m benchmarks.openai_stream --streams 200 --requests 1000 --concurrency 50
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import http.client
+import json
+import socket
+import time
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+import app as backend
+from benchmarks.utils import percentile
+from chart_generator import ChartGenerator
+from openai_compat import ChunkEncoder, new_completion_id
+from streaming import IMMEDIATE_FLUSH, StreamStats, stream_response_generator, write_sse_frames
+
+PROMPT = '/think test all charts'
+
+def writer_run(streams, encode):
+    """Events/sec and bytes/stream of the SSE writer over chart responses, optionally re-encoded"""
+    chart_response = ChartGenerator.create_all_charts_markdown('sales')
+    profile = backend.latency_model.resolve('zero')
+    stats = StreamStats()
+    started = time.perf_counter()
+    for _ in range(streams):
+        generator = stream_response_generator(PROMPT, [], None, chart_response, profile)
+        if encode:
+            generator = ChunkEncoder(new_completion_id(), 'chat-ui-mock', int(time.time())).encode(generator, 0)
+        for _payload in write_sse_frames(generator, IMMEDIATE_FLUSH, stats):
+            pass
+    elapsed = time.perf_counter() - started
+    snapshot = stats.snapshot()
+    return {'events_per_s': snapshot['events'] / elapsed, 'bytes_per_stream': snapshot['bytesPerStream']}
+
+REQUESTS = {
+    'rest': ('/api/message/stream', lambda i: {'text': f'{PROMPT} {i}', 'files': [], 'latency': 'zero'},
+             b'"text"'),
+    'openai': ('/v1/chat/completions',
+               lambda i: {'messages': [{'role': 'user', 'content': f'{PROMPT} {i}'}], 'stream': True,
+                          'latency': 'zero'},
+               b'"content":"')
+}
+
+def client(port, name, counter, samples):
+    """Stream responses over one keep-alive connection until the shared budget is spent"""
+    path, body, first_marker = REQUESTS[name]
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    while counter[0] > 0:
+        counter[0] -= 1
+        started = time.perf_counter()
+        conn.request('POST', path, body=json.dumps(body(counter[0])), headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        first_token = None
+        for line in response:
+            if first_token is None and first_marker in line:
+                first_token = time.perf_counter() - started
+        samples.append((response.status, time.perf_counter() - started, first_token))
+    conn.close()
+
+def http_run(port, name, requests, concurrency):
+    samples = []
+    counter = [requests]
+    started = time.perf_counter()
+    gevent.joinall([gevent.spawn(client, port, name, counter, samples) for _ in range(concurrency)],
+                   raise_error=True)
+    elapsed = time.perf_counter() - started
+    first_tokens = [first for status, _, first in samples if status == 200 and first is not None]
+    return {
+        'streams_per_s': len(first_tokens) / elapsed,
+        'ttft_p50_ms': percentile(first_tokens, 50) * 1000,
+        'ttft_p99_ms': percentile(first_tokens, 99) * 1000,
+        'p50_ms': percentile([latency for _, latency, _ in samples], 50) * 1000
+    }
+
+def run(streams=200, requests=1000, concurrency=50):
+    """
+    Measure both protocols in-process and over HTTP
+
+    Args:
+        streams: Responses per protocol through the SSE writer
+        requests: Streams per protocol over HTTP
+        concurrency: Concurrent keep-alive clients
+
+    Returns:
+        Dictionary keyed by protocol, with 'writer' and 'http' results
+    """
+    results = {name: {'writer': writer_run(streams, name == 'openai')} for name in REQUESTS}
+    # TCP_NODELAY is inherited by accepted sockets (see benchmarks.suite)
+    listener = socket.socket()
+    listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(concurrency)
+    server = WSGIServer(listener, backend.app, log=None)
+    server.start()
+    try:
+        for name in REQUESTS:
+            results[name]['http'] = http_run(server.server_port, name, requests, concurrency)
+    finally:
+        server.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--streams', type=int, default=200, help='responses per protocol through the writer')
+    parser.add_argument('--requests', type=int, default=1000, help='streams per protocol over HTTP')
+    parser.add_argument('--concurrency', type=int, default=50, help='concurrent keep-alive clients')
+    args = parser.parse_args()
+
+    results = run(args.streams, args.requests, args.concurrency)
+    print(f"{'protocol':>8} {'events/sec':>12} {'bytes/stream':>13} {'streams/sec':>12} "
+          f"{'ttft p50 ms':>12} {'ttft p99 ms':>12}")
+    for name, r in results.items():
+        print(f"{name:>8} {r['writer']['events_per_s']:>12.0f} {r['writer']['bytes_per_stream']:>13.0f} "
+              f"{r['http']['streams_per_s']:>12.1f} {r['http']['ttft_p50_ms']:>12.2f} {r['http']['ttft_p99_ms']:>12.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: per-event encoding cost of each streaming protocol
+
+Materializes the pipeline events of a chart response once, then times only
+the step that turns them into SSE frames: the REST stream's format_sse_event
+and the OpenAI, A2A and AG-UI encoders. Reports microseconds and bytes per
+pipeline event, so the overhead each protocol adds on top of the shared
+pipeline can be compared directly.
+
+    python -m benchmarks.protocol_encoding --streams 500
+"""
+import argparse
+import time
+
+from agent_protocols import A2AEncoder, AgUiEncoder
+from chart_generator import ChartGenerator
+from latency import LatencyProfile
+from openai_compat import ChunkEncoder
+from streaming import format_sse_event, stream_response_generator
+
+ZERO_LATENCY = {"firstToken": 0, "interToken": 0, "thinkingStep": 0, "thinkingComplete": 0}
+
+def rest_frames(events):
+    for item in events:
+        yield format_sse_event(item)
+
+def openai_frames(events):
+    for event in ChunkEncoder('chatcmpl-bench', 'chat-ui-mock', 0).encode(events, 0):
+        yield event.frame
+
+def a2a_frames(events):
+    for event in A2AEncoder('bench-task', 'bench-context').encode(events):
+        yield event.frame
+
+def ag_ui_frames(events):
+    for event in AgUiEncoder('bench-thread', 'bench-run').encode(events):
+        yield event.frame
+
+PROTOCOLS = {'rest': rest_frames, 'openai': openai_frames, 'a2a': a2a_frames, 'ag-ui': ag_ui_frames}
+
+def run(streams=500):
+    """
+    Encode the same pipeline events `streams` times with each protocol
+
+    Args:
+        streams: Responses to encode per protocol
+
+    Returns:
+        Dictionary keyed by protocol name
+    """
+    chart_response = ChartGenerator.create_all_charts_markdown('sales')
+    generator = stream_response_generator("/think test all charts", [], "https://picsum.photos/200/200",
+                                          chart_response, LatencyProfile(ZERO_LATENCY))
+    events = list(generator)
+    results = {}
+    for name, encode in PROTOCOLS.items():
+        size = 0
+        started = time.perf_counter()
+        for _ in range(streams):
+            for frame in encode(events):
+                size += len(frame)
+        elapsed = time.perf_counter() - started
+        encoded = streams * len(events)
+        results[name] = {
+            'us_per_event': elapsed / encoded * 1e6,
+            'bytes_per_event': size / encoded,
+            'events_per_sec': encoded / elapsed
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--streams', type=int, default=500, help='responses to encode per protocol')
+    args = parser.parse_args()
+
+    results = run(args.streams)
+    print(f"{'protocol':>8} {'us/event':>9} {'bytes/event':>12} {'events/sec':>12}")
+    for name, r in results.items():
+        print(f"{name:>8} {r['us_per_event']:>9.2f} {r['bytes_per_event']:>12.1f} {r['events_per_sec']:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Load test: many concurrent sessions on the /api/session endpoints
+
+Starts the Flask app under gevent's WSGI server; each simulated client opens
+a session with its first request, then sends messages (alternating fetch and
+stream) carrying its session cookie over a keep-alive connection.
+
+    python -m benchmarks.session_load --sessions 1000 --messages 10
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import http.client
+import json
+import time
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+import app as backend
+from benchmarks.utils import peak_rss_mb, percentile, raise_open_file_limit
+
+def client(port, messages, latencies, failures):
+    """Run one session: a message round trip per iteration, keeping the session cookie"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    cookie = None
+    for i in range(messages):
+        path = '/api/session/message' if i % 2 == 0 else '/api/session/stream'
+        headers = {'Content-Type': 'application/json'}
+        if cookie:
+            headers['Cookie'] = cookie
+        body = json.dumps({'text': f'message {i} about quarterly planning', 'files': [], 'latency': 'zero'})
+        started = time.perf_counter()
+        conn.request('POST', path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        if response.status != 200:
+            failures.append(response.status)
+        for header, value in response.getheaders():
+            if header.lower() == 'set-cookie' and value.startswith(f'{backend.SESSION_COOKIE}='):
+                cookie = value.split(';', 1)[0]
+    conn.close()
+
+def run(sessions=1000, messages=10):
+    """
+    Drive `sessions` concurrent sessions of `messages` round trips each
+    
+    Args:
+        sessions: Concurrent simulated clients, one session each
+        messages: Message round trips per session
+        
+    Returns:
+        Dictionary of throughput, latency and session store results
+    """
+    raise_open_file_limit(sessions * 2 + 256)
+    server = WSGIServer(('127.0.0.1', 0), backend.app, log=None, backlog=sessions)
+    server.start()
+
+    latencies, failures = [], []
+    started = time.perf_counter()
+    greenlets = [gevent.spawn(client, server.server_port, messages, latencies, failures) for _ in range(sessions)]
+    gevent.joinall(greenlets)
+    elapsed = time.perf_counter() - started
+    server.stop()
+
+    store = backend.session_store.stats()
+    return {
+        'sessions': sessions,
+        'requests': len(latencies),
+        'failed': len(failures),
+        'requests_per_s': len(latencies) / elapsed,
+        'latency_p50_ms': percentile(latencies, 50) * 1000,
+        'latency_p99_ms': percentile(latencies, 99) * 1000,
+        'stored_sessions': store['sessions'],
+        'store_mb': store['bytes'] / (1024 * 1024),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sessions', type=int, default=1000, help='concurrent sessions')
+    parser.add_argument('--messages', type=int, default=10, help='message round trips per session')
+    args = parser.parse_args()
+
+    result = run(args.sessions, args.messages)
+    for key, value in result.items():
+        print(f"{key:>16}: {value:.3f}" if isinstance(value, float) else f"{key:>16}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: SSE frame coalescing policies
+
+Drives the SSE writer over generated responses and reports writes, bytes and
+events per write for each flush policy, plus events/sec for the writer itself.
+
+    python -m benchmarks.sse_coalescing --streams 200
+"""
+import argparse
+import time
+
+from chart_generator import ChartGenerator
+from latency import LatencyProfile
+from streaming import FlushPolicy, StreamStats, stream_response_generator, write_sse_frames
+
+POLICIES = {
+    'immediate': FlushPolicy(),
+    '4KB/20ms': FlushPolicy(max_bytes=4096, max_latency=0.020),
+    '16KB/20ms': FlushPolicy(max_bytes=16384, max_latency=0.020),
+    '64KB/50ms': FlushPolicy(max_bytes=65536, max_latency=0.050)
+}
+
+def run(streams=200, inter_token_ms=0.0):
+    """
+    Stream `streams` chart responses through the writer under each policy
+    
+    Args:
+        streams: Responses to stream per policy
+        inter_token_ms: Simulated gap between text chunks (0 for pure CPU cost)
+        
+    Returns:
+        Dictionary keyed by policy name
+    """
+    chart_response = ChartGenerator.create_all_charts_markdown('sales')
+    profile_spec = {
+        "firstToken": 0,
+        "interToken": inter_token_ms / 1000.0,
+        "thinkingStep": 0,
+        "thinkingComplete": 0
+    }
+    results = {}
+    for name, policy in POLICIES.items():
+        stats = StreamStats()
+        started = time.perf_counter()
+        for _ in range(streams):
+            generator = stream_response_generator("/think test all charts", [], None, chart_response,
+                                                  LatencyProfile(profile_spec))
+            for _payload in write_sse_frames(generator, policy, stats):
+                pass
+        elapsed = time.perf_counter() - started
+        snapshot = stats.snapshot()
+        results[name] = {
+            'writes_per_stream': snapshot['writesPerStream'],
+            'bytes_per_stream': snapshot['bytesPerStream'],
+            'events_per_write': snapshot['eventsPerWrite'],
+            'events_per_sec': snapshot['events'] / elapsed if elapsed else 0.0
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--streams', type=int, default=200, help='responses per policy')
+    parser.add_argument('--inter-token-ms', type=float, default=0.0, help='simulated gap between chunks')
+    args = parser.parse_args()
+
+    results = run(args.streams, args.inter_token_ms)
+    print(f"{'policy':>10} {'writes/stream':>14} {'bytes/stream':>13} {'events/write':>13} {'events/sec':>12}")
+    for name, r in results.items():
+        print(f"{name:>10} {r['writes_per_stream']:>14.1f} {r['bytes_per_stream']:>13.0f} "
+              f"{r['events_per_write']:>13.1f} {r['events_per_sec']:>12.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: SSE event serialization, before and after the serialization layer
+
+Encodes the pipeline events of a chart response on one core in three ways:
+the original per-event json.dumps and f-string frame joined from a list
+("before"), the serialization layer on the standard library ("stdlib"), and
+the serialization layer with orjson ("orjson", when installed). Reports
+events/sec for the encoding step alone and for the whole SSE writer.
+
+    python -m benchmarks.sse_serialization --streams 500
+"""
+import argparse
+import json
+import time
+
+import serialization
+from chart_generator import ChartGenerator
+from latency import LatencyProfile
+from streaming import StreamStats, stream_response_generator, write_sse_frames
+
+ZERO_LATENCY = {"firstToken": 0, "interToken": 0, "thinkingStep": 0, "thinkingComplete": 0}
+
+def chart_events():
+    chart_response = ChartGenerator.create_all_charts_markdown('sales')
+    return stream_response_generator("/think test all charts", [], "https://picsum.photos/200/200", chart_response,
+                                     LatencyProfile(ZERO_LATENCY))
+
+def encode_before(events):
+    """The encoding create_sse_response used before: a new str and bytes object per event"""
+    frames = [f"data: {json.dumps(item)}\n\n".encode('utf-8') for item in events]
+    return len(b''.join(frames))
+
+def encode_after(events):
+    buffer = bytearray()
+    for item in events:
+        serialization.write_event(buffer, item)
+    return len(buffer)
+
+def measure(streams, encode, events):
+    """Events/sec and bytes/event of `encode` over `events`, repeated `streams` times"""
+    size = 0
+    started = time.perf_counter()
+    for _ in range(streams):
+        size += encode(events)
+    elapsed = time.perf_counter() - started
+    return streams * len(events) / elapsed, size / (streams * len(events))
+
+def writer_events_per_sec(streams):
+    stats = StreamStats()
+    started = time.perf_counter()
+    for _ in range(streams):
+        for _payload in write_sse_frames(chart_events(), stats=stats):
+            pass
+    return stats.snapshot()['events'] / (time.perf_counter() - started)
+
+def run(streams=500):
+    """
+    Measure each serialization on the same events
+
+    Args:
+        streams: Responses to encode per variant
+
+    Returns:
+        Dictionary keyed by variant: encode events/sec, bytes/event and, for
+        the serialization layer, whole-writer events/sec
+    """
+    events = list(chart_events())
+    results = {}
+    events_per_sec, size = measure(streams, encode_before, events)
+    results['before'] = {'encode_events_per_s': events_per_sec, 'bytes_per_event': size}
+
+    fast = serialization.orjson
+    variants = [('stdlib', None)] + ([('orjson', fast)] if fast is not None else [])
+    try:
+        for name, backend in variants:
+            serialization.orjson = backend
+            events_per_sec, size = measure(streams, encode_after, events)
+            results[name] = {'encode_events_per_s': events_per_sec, 'bytes_per_event': size,
+                             'writer_events_per_s': writer_events_per_sec(streams)}
+    finally:
+        serialization.orjson = fast
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--streams', type=int, default=500, help='responses to encode per variant')
+    args = parser.parse_args()
+
+    results = run(args.streams)
+    baseline = results['before']['encode_events_per_s']
+    print(f"{'variant':>8} {'encode events/s':>16} {'speedup':>8} {'bytes/event':>12} {'writer events/s':>16}")
+    for name, r in results.items():
+        writer = f"{r['writer_events_per_s']:>16.0f}" if 'writer_events_per_s' in r else f"{'-':>16}"
+        print(f"{name:>8} {r['encode_events_per_s']:>16.0f} {r['encode_events_per_s'] / baseline:>7.1f}x "
+              f"{r['bytes_per_event']:>12.1f} {writer}")
+
+if __name__ == '__main__':
+    main()
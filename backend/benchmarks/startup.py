@@ -0,0 +1,126 @@
+"""
+Benchmark: server startup time and graceful drain
+
+Measures how long a fresh interpreter takes to import the app, how long
+gunicorn (with gunicorn.conf.py) takes from launch to its first /health
+response, and how long a SIGTERM takes to finish a stream that is still in
+flight.
+
+    python -m benchmarks.startup --runs 5 --workers 2
+"""
+import argparse
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.utils import percentile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_seconds():
+    """Wall time of `import main` in a fresh interpreter"""
+    code = 'import time; started = time.perf_counter(); import main; print(time.perf_counter() - started)'
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_healthy(port, deadline):
+    """Poll /health until it answers 200; returns False at the deadline"""
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/health')
+            if conn.getresponse().status == 200:
+                return True
+        except OSError:
+            time.sleep(0.02)
+    return False
+
+def start_gunicorn(port, workers):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:api_app'],
+                            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def gunicorn_ready_seconds(workers):
+    """Seconds from launching gunicorn to its first successful /health"""
+    port = free_port()
+    started = time.monotonic()
+    process = start_gunicorn(port, workers)
+    try:
+        if not wait_healthy(port, started + 60):
+            raise RuntimeError('gunicorn did not become healthy')
+        return time.monotonic() - started
+    finally:
+        process.terminate()
+        process.wait()
+
+def drain_seconds(workers):
+    """
+    Start a slow stream, SIGTERM the server, and time until the stream completes
+
+    Returns:
+        Tuple of (seconds until the stream ended, whether it reached its completion event)
+    """
+    port = free_port()
+    process = start_gunicorn(port, workers)
+    try:
+        if not wait_healthy(port, time.monotonic() + 60):
+            raise RuntimeError('gunicorn did not become healthy')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        conn.request('POST', '/api/message/stream', body='{"text": "tell me a long story", "files": [], "latency": "slow"}',
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read1()  # the stream is open and the worker is inside it
+        started = time.monotonic()
+        process.send_signal(signal.SIGTERM)
+        body = response.read()
+        return time.monotonic() - started, b'"complete":true' in body
+    finally:
+        process.kill()
+        process.wait()
+
+def run(runs=5, workers=2):
+    """
+    Measure import time, time to first response, and drain time
+
+    Args:
+        runs: Repetitions of the import and gunicorn start measurements
+        workers: Gunicorn workers to start
+
+    Returns:
+        Dictionary of timings in milliseconds
+    """
+    imports = [import_seconds() for _ in range(runs)]
+    ready = [gunicorn_ready_seconds(workers) for _ in range(runs)]
+    drain, completed = drain_seconds(workers)
+    return {
+        'workers': workers,
+        'import_p50_ms': percentile(imports, 50) * 1000,
+        'import_max_ms': max(imports) * 1000,
+        'ready_p50_ms': percentile(ready, 50) * 1000,
+        'ready_max_ms': max(ready) * 1000,
+        'drain_ms': drain * 1000,
+        'drained_stream_completed': completed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5, help='repetitions per measurement')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    args = parser.parse_args()
+
+    result = run(args.runs, args.workers)
+    for key, value in result.items():
+        print(f"{key:>24}: {value:.1f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+if __name__ == '__main__':
+    main()
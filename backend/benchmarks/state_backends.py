@@ -0,0 +1,144 @@
+"""
+Microbenchmark: lookup latency of each shared state backend
+
+Times get (hit and miss) and set on the in-process dict, the shared-memory
+table and a Redis-compatible server. The server is the bundled stand-in
+(state_server.py, started in a subprocess) unless --redis-port points at a
+running Redis. With --processes above 1, that many forked workers read the
+same keys at once, as gunicorn workers would.
+
+    python -m benchmarks.state_backends --ops 20000 --value-bytes 1024 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import percentile
+from state import LocalBackend, RedisBackend, SharedMemoryBackend
+
+def timed(operation, keys):
+    """Per-call latencies in seconds of operation(key) over keys"""
+    latencies = []
+    for key in keys:
+        started = time.perf_counter()
+        operation(key)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+def reader(backend, keys, rounds, results):
+    """Worker process body: read every key `rounds` times, report elapsed seconds"""
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for key in keys:
+            backend.get(key)
+    results.put(time.perf_counter() - started)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_stand_in():
+    """Start state_server.py on a free port, returning (process, port) once it answers"""
+    port = free_port()
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen([sys.executable, os.path.join(backend_dir, 'state_server.py'), '--port', str(port)],
+                               stdout=subprocess.DEVNULL)
+    client = RedisBackend(port=port)
+    for _ in range(100):
+        try:
+            client.command('PING')
+            return process, port
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError('state_server.py did not start')
+
+def measure(backend, ops, value_bytes, processes):
+    """Latency percentiles of one backend, plus aggregate read throughput across processes"""
+    value = os.urandom(value_bytes)
+    keys = [f'bench:{i}' for i in range(ops)]
+    sets = timed(lambda key: backend.set(key, value, 300), keys)
+    hits = timed(backend.get, keys)
+    misses = timed(backend.get, [f'missing:{i}' for i in range(ops)])
+    if backend.get(keys[-1]) != value:
+        raise RuntimeError(f'{backend.name}: value did not round trip')
+
+    result = {
+        'backend': backend.name,
+        'set_p50_us': percentile(sets, 50) * 1e6,
+        'get_p50_us': percentile(hits, 50) * 1e6,
+        'get_p99_us': percentile(hits, 99) * 1e6,
+        'miss_p50_us': percentile(misses, 50) * 1e6
+    }
+    if processes > 1 and backend.shared:
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=reader, args=(backend, keys, 3, results)) for _ in range(processes)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        result['gets_per_s'] = processes * 3 * len(keys) / elapsed
+    else:
+        result['gets_per_s'] = len(keys) / sum(hits)
+    return result
+
+def run(ops=20000, value_bytes=1024, processes=1, redis_host='127.0.0.1', redis_port=None):
+    """
+    Measure every backend with the same keys and value size
+    
+    Args:
+        ops: Keys written and read per backend
+        value_bytes: Size of each stored value
+        processes: Forked readers for the throughput figure of shared backends
+        redis_host: Host of an existing Redis, used with redis_port
+        redis_port: Port of an existing Redis; None starts the stand-in server
+        
+    Returns:
+        List of per-backend result dictionaries
+    """
+    results = [measure(LocalBackend(), ops, value_bytes, processes)]
+
+    with tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None) as folder:
+        # Enough slots that the table stays under half full
+        shm = SharedMemoryBackend(os.path.join(folder, 'state'), slots=ops * 2, slot_size=value_bytes + 512)
+        results.append(measure(shm, ops, value_bytes, processes))
+
+    process = None
+    if redis_port is None:
+        process, redis_port = start_stand_in()
+    try:
+        results.append(measure(RedisBackend(redis_host, redis_port), ops, value_bytes, processes))
+    finally:
+        if process is not None:
+            process.kill()
+            process.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--ops', type=int, default=20000, help='keys per backend')
+    parser.add_argument('--value-bytes', type=int, default=1024, help='size of each value')
+    parser.add_argument('--processes', type=int, default=1, help='forked readers for shared backends')
+    parser.add_argument('--redis-host', default='127.0.0.1')
+    parser.add_argument('--redis-port', type=int, default=None,
+                        help='benchmark this Redis instead of starting state_server.py')
+    args = parser.parse_args()
+
+    results = run(args.ops, args.value_bytes, args.processes, args.redis_host, args.redis_port)
+    columns = list(results[0])
+    print('  '.join(f'{column:>12}' for column in columns))
+    for result in results:
+        print('  '.join(f'{result[c]:>12.1f}' if isinstance(result[c], float) else f'{result[c]:>12}'
+                        for c in columns))
+
+if __name__ == '__main__':
+    main()
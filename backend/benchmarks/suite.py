@@ -0,0 +1,257 @@
+"""
+Benchmark suite: load scenarios and micro-benchmarks with JSON results
+
+Starts the Flask app under gevent's WSGI server and drives /api/message/stream,
+/api/message/fetch, /api/upload and /api/files at a fixed concurrency over
+keep-alive connections. It then times chart rendering and the SSE writer in
+isolation. Results (throughput, TTFT, p50/p99 latency, RSS) are written as
+JSON, tagged with the git commit, so runs on different commits can be
+compared with --compare.
+
+    python -m benchmarks.suite --requests 2000 --concurrency 50 --output results.json
+    python -m benchmarks.suite --compare baseline.json
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import uuid
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+import app as backend
+from benchmarks.utils import current_rss_mb, peak_rss_mb, percentile, raise_open_file_limit
+from chart_generator import ChartGenerator
+from file_store import BlobStore, FileIndex
+from streaming import IMMEDIATE_FLUSH, StreamStats, stream_response_generator, write_sse_frames
+
+SCENARIOS = ('stream', 'fetch', 'upload', 'files')
+
+def message_body(i, latency):
+    return json.dumps({'text': f'Question {i}: how should we plan the next quarter?', 'files': [],
+                       'latency': latency})
+
+def stream_request(conn, i, options):
+    """One /api/message/stream round trip; returns seconds to the first text event"""
+    started = time.perf_counter()
+    conn.request('POST', '/api/message/stream', body=message_body(i, options['latency']),
+                 headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    first_token = None
+    for line in response:
+        if first_token is None and line.startswith(b'data: ') and b'"text"' in line:
+            first_token = time.perf_counter() - started
+    return response.status, first_token
+
+def fetch_request(conn, i, options):
+    conn.request('POST', '/api/message/fetch', body=message_body(i, options['latency']),
+                 headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    return response.status, None
+
+def upload_request(conn, i, options):
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="bench{i}.txt"\r\n'.encode(),
+        b'Content-Type: text/plain\r\n\r\n', os.urandom(options['upload_bytes']), f'\r\n--{boundary}--\r\n'.encode()
+    ])
+    conn.request('POST', '/api/upload', body=body,
+                 headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    response = conn.getresponse()
+    response.read()
+    return response.status, None
+
+def files_request(conn, i, options):
+    """Alternate between a page of the listing and the content of one uploaded file"""
+    urls = options['file_urls']
+    conn.request('GET', '/api/files?limit=50' if i % 2 == 0 else urls[i % len(urls)])
+    response = conn.getresponse()
+    response.read()
+    return response.status, None
+
+REQUESTS = {'stream': stream_request, 'fetch': fetch_request, 'upload': upload_request, 'files': files_request}
+
+def client(port, send, counter, options, samples):
+    """Issue requests over one keep-alive connection until the shared budget is spent"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    while counter[0] > 0:
+        counter[0] -= 1
+        i = counter[0]
+        started = time.perf_counter()
+        try:
+            status, first_token = send(conn, i, options)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+            status, first_token = 0, None
+        samples.append((status, time.perf_counter() - started, first_token))
+    conn.close()
+
+def run_scenario(port, name, requests, concurrency, options):
+    """Drive one endpoint and summarize its samples"""
+    samples = []
+    counter = [requests]
+    started = time.perf_counter()
+    greenlets = [gevent.spawn(client, port, REQUESTS[name], counter, options, samples) for _ in range(concurrency)]
+    gevent.joinall(greenlets, raise_error=True)
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for status, latency, _ in samples if 200 <= status < 400]
+    result = {
+        'requests': len(samples),
+        'failed': len(samples) - len(latencies),
+        'requests_per_s': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'rss_mb': current_rss_mb()
+    }
+    first_tokens = [first for _, _, first in samples if first is not None]
+    if first_tokens:
+        result['ttft_p50_ms'] = percentile(first_tokens, 50) * 1000
+        result['ttft_p99_ms'] = percentile(first_tokens, 99) * 1000
+    return result
+
+def chart_micro(iterations):
+    """Chart rendering: uncached (a new seed every time) and through the render cache"""
+    started = time.perf_counter()
+    for seed in range(iterations):
+        ChartGenerator.create_all_charts_markdown('sales', seed)
+    uncached = (time.perf_counter() - started) / iterations
+    ChartGenerator.render_markdown('bar', 'sales', 1)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        ChartGenerator.render_markdown('bar', 'sales', 1)
+    cached = (time.perf_counter() - started) / iterations
+    return {'all_charts_ms': uncached * 1000, 'cached_chart_us': cached * 1e6}
+
+def sse_micro(streams):
+    """SSE writer throughput over chart responses with no simulated latency"""
+    chart_response = ChartGenerator.create_all_charts_markdown('sales')
+    profile = backend.latency_model.resolve('zero')
+    stats = StreamStats()
+    started = time.perf_counter()
+    for _ in range(streams):
+        generator = stream_response_generator("/think test all charts", [], None, chart_response, profile)
+        for _payload in write_sse_frames(generator, IMMEDIATE_FLUSH, stats):
+            pass
+    elapsed = time.perf_counter() - started
+    snapshot = stats.snapshot()
+    return {'events_per_s': snapshot['events'] / elapsed, 'mb_per_s': snapshot['bytes'] / elapsed / (1024 * 1024)}
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(scenarios=SCENARIOS, requests=2000, concurrency=50, latency='zero', upload_bytes=64 * 1024, micro=True):
+    """
+    Run the load scenarios and micro-benchmarks
+    
+    Args:
+        scenarios: Endpoint scenarios to run, from SCENARIOS
+        requests: Requests per scenario
+        concurrency: Concurrent keep-alive clients
+        latency: Latency profile sent with message requests ("zero" measures server overhead)
+        upload_bytes: Size of each uploaded file
+        micro: Also run the in-process micro-benchmarks
+        
+    Returns:
+        Results document: environment, settings and per-benchmark metrics
+    """
+    raise_open_file_limit(concurrency * 2 + 256)
+    folder = tempfile.mkdtemp(dir=backend.UPLOAD_FOLDER)
+    backend.blob_store = BlobStore(folder)
+    backend.file_index = FileIndex(os.path.join(folder, 'index.jsonl'))
+    # Accepted sockets inherit TCP_NODELAY; without it, Nagle's algorithm holds back the
+    # response body until the client's delayed ACK of the headers (~40 ms per request)
+    listener = socket.socket()
+    listener.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(concurrency)
+    server = WSGIServer(listener, backend.app, log=None)
+    server.start()
+
+    options = {'latency': latency, 'upload_bytes': upload_bytes}
+    web = backend.app.test_client()
+    options['file_urls'] = [
+        web.post('/api/upload/stream', data=os.urandom(4096), headers={'X-File-Name': f'seed{i}.txt'}).json['url']
+        for i in range(20)
+    ]
+
+    results = {}
+    try:
+        for name in scenarios:
+            results[name] = run_scenario(server.server_port, name, requests, concurrency, options)
+    finally:
+        server.stop()
+        shutil.rmtree(folder)
+    if micro:
+        results['chart_render'] = chart_micro(50)
+        results['sse_writer'] = sse_micro(200)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'settings': {'requests': requests, 'concurrency': concurrency, 'latency': latency,
+                     'uploadBytes': upload_bytes},
+        'peak_rss_mb': peak_rss_mb(),
+        'results': results
+    }
+
+def compare(baseline, current):
+    """Lines showing each metric of current next to the baseline and the relative change"""
+    lines = [f"{'benchmark':<14} {'metric':<16} {'baseline':>12} {'current':>12} {'change':>8}"]
+    for name, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            before = baseline.get('results', {}).get(name, {}).get(metric)
+            if before is None:
+                continue
+            change = f"{(value - before) / before * 100:+.1f}%" if before else ''
+            lines.append(f"{name:<14} {metric:<16} {before:>12.2f} {value:>12.2f} {change:>8}")
+    return lines
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS),
+                        help='endpoint scenarios to run')
+    parser.add_argument('--requests', type=int, default=2000, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=50, help='concurrent keep-alive clients')
+    parser.add_argument('--latency', default='zero', help='latency profile for message requests')
+    parser.add_argument('--upload-bytes', type=int, default=64 * 1024, help='size of each uploaded file')
+    parser.add_argument('--no-micro', action='store_true', help='skip the micro-benchmarks')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    document = run(args.scenarios, args.requests, args.concurrency, args.latency, args.upload_bytes,
+                   not args.no_micro)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    else:
+        print(json.dumps(document, indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline.get('commit')}):")
+        print('\n'.join(compare(baseline, document)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Load test: upload throughput and server memory
+
+Starts the Flask app under gevent's WSGI server and uploads one large body
+through the multipart /api/upload endpoint and the streaming
+/api/upload/stream endpoint. The client generates the body on the fly, so
+the sampled RSS growth is the server's buffering.
+
+    python -m benchmarks.upload_throughput --mb 256
+"""
+from gevent import monkey
+
+monkey.patch_all()
+
+import argparse
+import http.client
+import os
+import tempfile
+import time
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+import app as backend
+from file_store import BlobStore, FileIndex
+from benchmarks.utils import current_rss_mb
+
+CHUNK = os.urandom(1024 * 1024)
+BOUNDARY = 'benchmarkboundary7MA4YWxk'
+
+def body_chunks(size):
+    """Yield size bytes of payload in 1 MiB chunks"""
+    remaining = size
+    while remaining > 0:
+        piece = CHUNK[:min(remaining, len(CHUNK))]
+        remaining -= len(piece)
+        yield piece
+
+def multipart_parts(size):
+    """The multipart/form-data framing around a size byte file field"""
+    head = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="bench.pdf"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n').encode()
+    tail = f'\r\n--{BOUNDARY}--\r\n'.encode()
+    return head, tail
+
+def upload(port, mode, size):
+    """Send one upload and return the response status"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=600)
+    if mode == 'multipart':
+        head, tail = multipart_parts(size)
+        body = (piece for part in ([head], body_chunks(size), [tail]) for piece in part)
+        headers = {'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+                   'Content-Length': str(len(head) + size + len(tail))}
+        conn.request('POST', '/api/upload', body=body, headers=headers)
+    else:
+        headers = {'Content-Type': 'application/pdf', 'X-File-Name': 'bench.pdf', 'Content-Length': str(size)}
+        conn.request('POST', '/api/upload/stream', body=body_chunks(size), headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status
+
+def run(mb=256, modes=('stream', 'multipart')):
+    """
+    Upload an mb MiB body with each mode
+    
+    Args:
+        mb: Body size in MiB
+        modes: Upload paths to measure ('stream' and/or 'multipart')
+        
+    Returns:
+        Dictionary keyed by mode with status, MB/s and RSS growth in MiB
+    """
+    size = mb * 1024 * 1024
+    backend.app.config['MAX_CONTENT_LENGTH'] = size + 1024 * 1024
+    server = WSGIServer(('127.0.0.1', 0), backend.app, log=None)
+    server.start()
+
+    results = {}
+    for mode in modes:
+        # A fresh store per mode, so no upload is deduplicated against an earlier one
+        folder = tempfile.TemporaryDirectory(dir=backend.UPLOAD_FOLDER)
+        backend.blob_store = BlobStore(folder.name)
+        backend.file_index = FileIndex(os.path.join(folder.name, 'index.jsonl'))
+        baseline = current_rss_mb()
+        peak = [baseline]
+        def sample():
+            while True:
+                peak[0] = max(peak[0], current_rss_mb())
+                gevent.sleep(0.01)
+        sampler = gevent.spawn(sample)
+        started = time.perf_counter()
+        status = upload(server.server_port, mode, size)
+        elapsed = time.perf_counter() - started
+        sampler.kill()
+        folder.cleanup()
+        results[mode] = {
+            'status': status,
+            'mb_per_s': mb / elapsed,
+            'rss_growth_mb': peak[0] - baseline
+        }
+
+    server.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--mb', type=int, default=256, help='upload size in MiB')
+    parser.add_argument('--modes', nargs='+', default=['stream', 'multipart'], choices=['stream', 'multipart'],
+                        help='upload paths to measure')
+    args = parser.parse_args()
+
+    print(f"{'mode':>10} {'status':>7} {'MB/s':>8} {'RSS growth MiB':>15}")
+    for mode, r in run(args.mb, args.modes).items():
+        print(f"{mode:>10} {r['status']:>7} {r['mb_per_s']:>8.1f} {r['rss_growth_mb']:>15.1f}")
+
+if __name__ == '__main__':
+    main()
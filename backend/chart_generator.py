@@ -1,7 +1,179 @@
 import json
 import random
 import re
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterator, Optional, NamedTuple
+
+import datasets
+from datasets import DatasetSpec
+
+# Occurrences of a gate compared phrase by phrase before falling back to whole-text searches
+MAX_GATE_POSITIONS = 32
+
+class KeywordScan:
+    """Keyword lookups against one lower-cased text"""
+
+    __slots__ = ('text', 'gate_positions')
+
+    def __init__(self, text: str):
+        self.text = text
+        self.gate_positions = {}  # gate -> [offsets found so far, next search start or None when done]
+
+    def _occurrences(self, gate: str) -> Iterator[int]:
+        """Yield the gate's offsets in order, searching for each at most once per text"""
+        state = self.gate_positions.get(gate)
+        if state is None:
+            state = self.gate_positions[gate] = [[], 0]
+        found = state[0]
+        index = 0
+        while True:
+            if index < len(found):
+                yield found[index]
+                index += 1
+                continue
+            if state[1] is None:
+                return
+            position = self.text.find(gate, state[1])
+            if position < 0:
+                state[1] = None
+                return
+            found.append(position)
+            state[1] = position + 1
+
+    def any(self, plan) -> bool:
+        """Check whether any keyword of a compiled plan occurs in the text"""
+        text = self.text
+        for gate, keywords in plan:
+            if gate is None:
+                for keyword, _ in keywords:
+                    if keyword in text:
+                        return True
+                continue
+            # A phrase can only occur around an occurrence of its gate, so a
+            # missing gate rules out the whole group
+            for count, position in enumerate(self._occurrences(gate)):
+                if not keywords:
+                    return True
+                if count == MAX_GATE_POSITIONS:
+                    for keyword, _ in keywords:
+                        if keyword in text:
+                            return True
+                    break
+                for keyword, offset in keywords:
+                    if position >= offset and text.startswith(keyword, position - offset):
+                        return True
+        return False
+
+    def first(self, plans) -> Optional[str]:
+        """Return the first label (in order) whose compiled plan matches"""
+        for label, plan in plans:
+            if self.any(plan):
+                return label
+        return None
+
+class KeywordMatcher:
+    """
+    Substring matcher for a fixed keyword vocabulary, compiled once
+
+    Keywords are grouped under the shortest other keyword they contain (their
+    gate). Each gate is located once per text with C-level substring
+    searches. A group is skipped when its gate is absent, so text without
+    "chart", "graph" or "plot" skips every phrase built on them. When the
+    gate is present, its phrases are only compared at the gate's
+    occurrences instead of searched for across the whole text. In CPython
+    this beats a single compiled regex alternation, whose per-position cost
+    dominates on long inputs.
+    """
+
+    def __init__(self, keywords):
+        vocabulary = sorted(set(keywords), key=len)
+        self.gates = {}
+        for keyword in vocabulary:
+            contained = [other for other in vocabulary if len(other) < len(keyword) and other in keyword]
+            self.gates[keyword] = contained[0] if contained else None
+        self._gate_keywords = set(self.gates.values())
+
+    def compile(self, keywords) -> tuple:
+        """
+        Compile a keyword list into a plan of (gate, ((keyword, gate offset), ...)) groups
+        
+        Keywords that are themselves gates become (keyword, ()) so their
+        single probe is shared with every phrase they gate.
+        """
+        grouped = {}
+        for keyword in keywords:
+            if keyword in self._gate_keywords:
+                grouped.setdefault(keyword, [])
+            else:
+                gate = self.gates[keyword]
+                grouped.setdefault(gate, []).append((keyword, keyword.find(gate) if gate is not None else 0))
+        return tuple((gate, tuple(group)) for gate, group in grouped.items())
+
+    def compile_groups(self, groups: Dict[str, List[str]]) -> tuple:
+        """Compile labelled keyword lists, keeping their priority order"""
+        return tuple((label, self.compile(keywords)) for label, keywords in groups.items())
+
+    @staticmethod
+    def scan(text: str) -> KeywordScan:
+        """Start matching against text (lower-cased once here)"""
+        return KeywordScan(text.lower())
+
+class RenderCache:
+    """LRU cache of rendered chart markdown with hit/miss counters"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[str]:
+        """Return the cached markdown for key, or None on a miss"""
+        with self._lock:
+            markdown = self._entries.get(key)
+            if markdown is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return markdown
+
+    def put(self, key, markdown: str):
+        """Store rendered markdown, evicting the least recently used entries"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = markdown
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def resize(self, max_entries: int):
+        """Change the capacity, evicting entries if it shrank"""
+        with self._lock:
+            self.max_entries = max_entries
+            while len(self._entries) > max(max_entries, 0):
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+class ChartIntent(NamedTuple):
+    """Result of ChartGenerator.analyze"""
+    chart_type: Optional[str]
+    data_context: Optional[str]
+    test_all: bool
 
 class ChartGenerator:
     """Generate chart data based on user input keywords"""
@@ -49,46 +221,264 @@ class ChartGenerator:
         ]
     }
     
+    # Chart configuration shared by every context
+    BASE_CHART_CONFIG = {
+        "height": 300,
+        "colors": ["#8884d8", "#82ca9d", "#ffc658", "#ff7300", "#00ff7f"]
+    }
+    
+    # Titles, labels and keys per data context
+    CONTEXT_CHART_CONFIGS = {
+        'sales': {
+            "title": "Sales Performance",
+            "xLabel": "Month",
+            "yLabel": "Sales ($)",
+            "xKey": "name",
+            "yKey": "value"
+        },
+        'performance': {
+            "title": "Quarterly Performance",
+            "xLabel": "Quarter",
+            "yLabel": "Amount ($)",
+            "xKey": "month",
+            "yKey": "revenue"
+        },
+        'demographics': {
+            "title": "Age Demographics",
+            "xLabel": "Age Group",
+            "yLabel": "Percentage",
+            "xKey": "name",
+            "yKey": "value"
+        },
+        'devices': {
+            "title": "Device Usage",
+            "xLabel": "Device Type",
+            "yLabel": "Usage (%)",
+            "xKey": "name",
+            "yKey": "value"
+        },
+        'correlation': {
+            "title": "Data Correlation",
+            "xLabel": "X Values",
+            "yLabel": "Y Values",
+            "xKey": "x",
+            "yKey": "y"
+        }
+    }
+    
+    # Phrases requesting every chart type at once
+    TEST_ALL_KEYWORDS = [
+        'test all charts', 'show all charts', 'all chart types',
+        'test charts', 'demo charts', 'chart examples', 'all supported charts'
+    ]
+    
+    # Chart-related terms without a specific chart type
+    CHART_INDICATORS = [
+        'chart', 'graph', 'plot', 'visualize', 'visualization', 
+        'show data', 'display data', 'analytics', 'metrics'
+    ]
+    
+    # Data context keywords, in priority order
+    CONTEXT_KEYWORDS = {
+        'sales': ['sales', 'revenue', 'money', 'profit'],
+        'performance': ['performance', 'metrics', 'quarterly'],
+        'demographics': ['age', 'demographic', 'population'],
+        'devices': ['device', 'platform', 'browser'],
+        'correlation': ['correlation', 'relationship', 'scatter']
+    }
+    
+    # Built once at class load over every keyword above
+    KEYWORD_MATCHER = KeywordMatcher(
+        TEST_ALL_KEYWORDS + CHART_INDICATORS
+        + [keyword for keywords in CHART_KEYWORDS.values() for keyword in keywords]
+        + [keyword for keywords in CONTEXT_KEYWORDS.values() for keyword in keywords]
+    )
+    _TEST_ALL_PLAN = KEYWORD_MATCHER.compile(TEST_ALL_KEYWORDS)
+    _CHART_TYPE_PLANS = KEYWORD_MATCHER.compile_groups(CHART_KEYWORDS)
+    _INDICATOR_PLAN = KEYWORD_MATCHER.compile(CHART_INDICATORS)
+    _CONTEXT_PLANS = KEYWORD_MATCHER.compile_groups(CONTEXT_KEYWORDS)
+    
+    # Rendered markdown of seeded (deterministic) charts
+    render_cache = RenderCache()
+    
+    # Seed applied when a request does not pass one; None keeps output random
+    default_seed = None
+    
+    # Limits and defaults for large synthetic datasets (backend.charts.dataset)
+    dataset_config = {}
+    
     @classmethod
-    def detect_chart_request(cls, text: str) -> Optional[str]:
+    def configure(cls, charts_config: Dict[str, Any]):
+        """Apply the backend.charts configuration"""
+        cls.default_seed = charts_config.get("seed")
+        cls.render_cache.resize(charts_config.get("cacheSize", 256))
+        cls.dataset_config = charts_config.get("dataset", {})
+    
+    @classmethod
+    def dataset_spec(cls, options: Optional[Dict[str, Any]], seed: Optional[int] = None) -> Optional[DatasetSpec]:
         """
-        Detect if the user is requesting a chart and return the chart type
+        Validate a request's "dataset" options against the configured limits
         
         Args:
-            text: User input text
+            options: The request's dataset options, or None
+            seed: Request seed used when the options do not set one
             
         Returns:
-            Chart type if detected, 'all' for all charts, None otherwise
+            DatasetSpec, or None when no dataset was requested
+            
+        Raises:
+            ValueError: If the options are invalid or exceed a limit
+        """
+        if options is None:
+            return None
+        spec = DatasetSpec.from_request(options, cls.dataset_config)
+        if spec.seed is None:
+            spec.seed = seed if seed is not None else cls.default_seed
+        return spec
+    
+    @classmethod
+    def render_markdown(cls, chart_type: str, data_context: str = 'sales', seed: Optional[int] = None,
+                        dataset: Optional[DatasetSpec] = None) -> str:
         """
-        text_lower = text.lower()
+        Render the markdown response for a chart request
         
-        # Check for test all charts request first
-        test_keywords = [
-            'test all charts', 'show all charts', 'all chart types',
-            'test charts', 'demo charts', 'chart examples', 'all supported charts'
-        ]
+        Seeded output is deterministic, so it is served from the render cache
+        after the first request for the same type, context and seed.
+        
+        Args:
+            chart_type: Chart type, or 'all' for every chart type
+            data_context: Context for the data
+            seed: Seed for deterministic data (defaults to the configured seed)
+            dataset: Synthetic dataset to chart instead of the sample data
+                (single chart types only; never cached)
+            
+        Returns:
+            Markdown string with the chart code block(s)
+        """
+        if dataset is not None and chart_type != 'all':
+            return cls.create_chart_markdown(cls.generate_dataset_chart(chart_type, dataset))
+        
+        if seed is None:
+            seed = cls.default_seed
+        
+        key = (chart_type, data_context, seed)
+        if seed is not None:
+            markdown = cls.render_cache.get(key)
+            if markdown is not None:
+                return markdown
         
-        if any(keyword in text_lower for keyword in test_keywords):
+        if chart_type == 'all':
+            markdown = cls.create_all_charts_markdown(data_context, seed)
+        else:
+            markdown = cls.create_chart_markdown(cls.generate_chart_data(chart_type, data_context, seed))
+        
+        if seed is not None:
+            cls.render_cache.put(key, markdown)
+        return markdown
+    
+    @classmethod
+    def stream_markdown(cls, chart_type: str, data_context: str = 'sales', seed: Optional[int] = None,
+                        dataset: Optional[DatasetSpec] = None) -> Iterator[str]:
+        """
+        Stream the markdown response for a chart request
+        
+        Yields the same text as render_markdown, split at line boundaries so
+        table rows are never broken. Seeded output is cached once the stream
+        has been fully consumed.
+        
+        Args:
+            chart_type: Chart type, or 'all' for every chart type
+            data_context: Context for the data
+            seed: Seed for deterministic data (defaults to the configured seed)
+            dataset: Synthetic dataset to chart instead of the sample data
+                (single chart types only; never cached)
+            
+        Returns:
+            Generator of markdown pieces
+        """
+        if dataset is not None and chart_type != 'all':
+            yield from cls.iter_chart_markdown(cls.generate_dataset_chart(chart_type, dataset))
+            return
+        
+        if seed is None:
+            seed = cls.default_seed
+        
+        key = (chart_type, data_context, seed)
+        if seed is not None:
+            markdown = cls.render_cache.get(key)
+            if markdown is not None:
+                yield from markdown.splitlines(keepends=True)
+                return
+        
+        if chart_type == 'all':
+            pieces = cls.iter_all_charts_markdown(data_context, seed)
+        else:
+            pieces = cls.iter_chart_markdown(cls.generate_chart_data(chart_type, data_context, seed))
+        
+        if seed is None:
+            yield from pieces
+            return
+        
+        rendered = []
+        for piece in pieces:
+            rendered.append(piece)
+            yield piece
+        cls.render_cache.put(key, ''.join(rendered))
+    
+    @classmethod
+    def analyze(cls, text: str) -> ChartIntent:
+        """
+        Detect chart type, data context and "all charts" requests in one scan
+        
+        Args:
+            text: User input text
+            
+        Returns:
+            ChartIntent; data_context is None when no chart is requested
+        """
+        scan = cls.KEYWORD_MATCHER.scan(text)
+        test_all = scan.any(cls._TEST_ALL_PLAN)
+        chart_type = cls._chart_type(scan, test_all)
+        data_context = cls._data_context(scan) if chart_type else None
+        return ChartIntent(chart_type, data_context, test_all)
+    
+    @classmethod
+    def _chart_type(cls, scan: KeywordScan, test_all: bool) -> Optional[str]:
+        """Resolve the requested chart type from a keyword scan"""
+        # Check for test all charts request first
+        if test_all:
             return 'all'
         
         # Check for explicit chart keywords
-        for chart_type, keywords in cls.CHART_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return chart_type
-        
-        # Check for chart-related terms
-        chart_indicators = [
-            'chart', 'graph', 'plot', 'visualize', 'visualization', 
-            'show data', 'display data', 'analytics', 'metrics'
-        ]
+        chart_type = scan.first(cls._CHART_TYPE_PLANS)
+        if chart_type:
+            return chart_type
         
-        if any(indicator in text_lower for indicator in chart_indicators):
-            # Default to bar chart if no specific type detected
+        # Default to bar chart if only chart-related terms are present
+        if scan.any(cls._INDICATOR_PLAN):
             return 'bar'
-            
+        
         return None
     
+    @classmethod
+    def _data_context(cls, scan: KeywordScan) -> str:
+        """Resolve the data context from a keyword scan"""
+        return scan.first(cls._CONTEXT_PLANS) or 'sales'  # Default
+    
+    @classmethod
+    def detect_chart_request(cls, text: str) -> Optional[str]:
+        """
+        Detect if the user is requesting a chart and return the chart type
+        
+        Args:
+            text: User input text
+            
+        Returns:
+            Chart type if detected, 'all' for all charts, None otherwise
+        """
+        scan = cls.KEYWORD_MATCHER.scan(text)
+        return cls._chart_type(scan, scan.any(cls._TEST_ALL_PLAN))
+    
     @classmethod
     def detect_data_context(cls, text: str) -> str:
         """
@@ -100,34 +490,23 @@ class ChartGenerator:
         Returns:
             Data context key
         """
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['sales', 'revenue', 'money', 'profit']):
-            return 'sales'
-        elif any(word in text_lower for word in ['performance', 'metrics', 'quarterly']):
-            return 'performance'
-        elif any(word in text_lower for word in ['age', 'demographic', 'population']):
-            return 'demographics'
-        elif any(word in text_lower for word in ['device', 'platform', 'browser']):
-            return 'devices'
-        elif any(word in text_lower for word in ['correlation', 'relationship', 'scatter']):
-            return 'correlation'
-        else:
-            return 'sales'  # Default
+        return cls._data_context(cls.KEYWORD_MATCHER.scan(text))
     
     @classmethod
-    def generate_chart_data(cls, chart_type: str, data_context: str = 'sales') -> Dict[str, Any]:
+    def generate_chart_data(cls, chart_type: str, data_context: str = 'sales', seed: Optional[int] = None) -> Dict[str, Any]:
         """
         Generate appropriate chart data based on type and context
         
         Args:
             chart_type: Type of chart to generate
             data_context: Context for the data
+            seed: Optional seed making the generated data deterministic
             
         Returns:
             Chart data dictionary
         """
         base_data = cls.SAMPLE_DATA_SETS.get(data_context, cls.SAMPLE_DATA_SETS['sales'])
+        rng = random.Random(seed) if seed is not None else random
         
         # Generate random variations to make data more interesting
         if data_context == 'sales':
@@ -135,14 +514,14 @@ class ChartGenerator:
             for item in base_data:
                 data.append({
                     "name": item["name"],
-                    "value": item["value"] + random.randint(-50, 50),
+                    "value": item["value"] + rng.randint(-50, 50),
                     "target": item.get("target", item["value"] * 0.9)
                 })
         elif data_context == 'performance':
             data = []
             for item in base_data:
-                revenue = item["revenue"] + random.randint(-200, 200)
-                expenses = item["expenses"] + random.randint(-100, 100)
+                revenue = item["revenue"] + rng.randint(-200, 200)
+                expenses = item["expenses"] + rng.randint(-100, 100)
                 data.append({
                     "month": item["month"],
                     "revenue": revenue,
@@ -153,8 +532,8 @@ class ChartGenerator:
             data = []
             for item in base_data:
                 data.append({
-                    "x": item["x"] + random.randint(-5, 5),
-                    "y": item["y"] + random.randint(-10, 10)
+                    "x": item["x"] + rng.randint(-5, 5),
+                    "y": item["y"] + rng.randint(-10, 10)
                 })
         elif data_context == 'devices':
             # For devices, handle the new multi-series structure
@@ -162,9 +541,9 @@ class ChartGenerator:
             for item in base_data:
                 data.append({
                     "name": item["name"],
-                    "desktop": item["desktop"] + random.randint(-3, 3),
-                    "mobile": item["mobile"] + random.randint(-3, 3),
-                    "tablet": item["tablet"] + random.randint(-2, 2)
+                    "desktop": item["desktop"] + rng.randint(-3, 3),
+                    "mobile": item["mobile"] + rng.randint(-3, 3),
+                    "tablet": item["tablet"] + rng.randint(-2, 2)
                 })
         else:
             # For demographics, add some randomization
@@ -172,7 +551,7 @@ class ChartGenerator:
             for item in base_data:
                 data.append({
                     "name": item["name"],
-                    "value": item["value"] + random.randint(-5, 5)
+                    "value": item["value"] + rng.randint(-5, 5)
                 })
         
         # Configure chart based on type and context
@@ -214,53 +593,46 @@ class ChartGenerator:
         }
     
     @classmethod
-    def _get_chart_config(cls, chart_type: str, data_context: str) -> Dict[str, Any]:
-        """Get appropriate configuration for chart type and context"""
+    def generate_dataset_chart(cls, chart_type: str, spec: DatasetSpec) -> Dict[str, Any]:
+        """
+        Generate chart data for a large synthetic dataset
         
-        base_config = {
-            "height": 300,
-            "colors": ["#8884d8", "#82ca9d", "#ffc658", "#ff7300", "#00ff7f"]
+        Values are generated as whole arrays and downsampled to the spec's
+        row budget; rows are only converted to Python values as the table is
+        rendered.
+        
+        Args:
+            chart_type: Type of chart to generate
+            spec: Validated dataset spec
+            
+        Returns:
+            Chart data dictionary with 'columns' and a lazy 'data' iterator
+        """
+        values = datasets.generate(spec)
+        indices = datasets.downsample_indices(values[0], spec.max_rows, spec.downsample)
+        names = spec.column_names
+        
+        config = {
+            **cls.BASE_CHART_CONFIG,
+            "title": f"Synthetic Dataset ({spec.points:,} points, {len(indices):,} rows)",
+            "xKey": "x",
+            "yKey": names if chart_type in ['line', 'area', 'bar'] else names[0],
+            "xLabel": "Index",
+            "yLabel": "Value"
         }
         
-        context_configs = {
-            'sales': {
-                "title": "Sales Performance",
-                "xLabel": "Month",
-                "yLabel": "Sales ($)",
-                "xKey": "name",
-                "yKey": "value"
-            },
-            'performance': {
-                "title": "Quarterly Performance",
-                "xLabel": "Quarter",
-                "yLabel": "Amount ($)",
-                "xKey": "month",
-                "yKey": "revenue"
-            },
-            'demographics': {
-                "title": "Age Demographics",
-                "xLabel": "Age Group",
-                "yLabel": "Percentage",
-                "xKey": "name",
-                "yKey": "value"
-            },
-            'devices': {
-                "title": "Device Usage",
-                "xLabel": "Device Type",
-                "yLabel": "Usage (%)",
-                "xKey": "name",
-                "yKey": "value"
-            },
-            'correlation': {
-                "title": "Data Correlation",
-                "xLabel": "X Values",
-                "yLabel": "Y Values",
-                "xKey": "x",
-                "yKey": "y"
-            }
+        return {
+            "type": chart_type,
+            "columns": ["x"] + names,
+            "data": datasets.iter_rows(spec, values, indices),
+            "config": config
         }
+    
+    @classmethod
+    def _get_chart_config(cls, chart_type: str, data_context: str) -> Dict[str, Any]:
+        """Get appropriate configuration for chart type and context"""
         
-        config = {**base_config, **context_configs.get(data_context, context_configs['sales'])}
+        config = {**cls.BASE_CHART_CONFIG, **cls.CONTEXT_CHART_CONFIGS.get(data_context, cls.CONTEXT_CHART_CONFIGS['sales'])}
         
         # Chart type specific adjustments
         if chart_type == 'pie':
@@ -297,13 +669,49 @@ class ChartGenerator:
         Returns:
             Markdown string with table format chart
         """
+        return ''.join(cls.iter_chart_markdown(chart_data))
+
+    @classmethod
+    def iter_chart_markdown(cls, chart_data: Dict[str, Any]) -> Iterator[str]:
+        """
+        Yield the table format chart markdown piece by piece
+        
+        Args:
+            chart_data: Chart data dictionary
+            
+        Returns:
+            Generator of markdown pieces; joined they equal create_chart_markdown
+        """
+        chart_type = chart_data.get('type', 'bar')
+        
+        if not chart_data.get('data'):
+            yield "No data available for chart"
+            return
+        
+        yield f"Here's your {chart_type} chart visualization using the new table format:\n\n"
+        yield from cls.iter_chart_block(chart_data)
+        yield "\n\nThis chart uses markdown table format for better readability and AI-friendly generation."
+
+    @classmethod
+    def iter_chart_block(cls, chart_data: Dict[str, Any]) -> Iterator[str]:
+        """
+        Yield the fenced chart code block: fence header, table header and
+        separator, then one table row at a time, then the closing fence
+        
+        Rows are formatted as they are consumed, so data may be any iterable
+        when chart_data also lists its 'columns'; it is never materialized.
+        
+        Args:
+            chart_data: Chart data dictionary, optionally with 'columns'
+            
+        Returns:
+            Generator of markdown pieces, each ending at a line boundary
+            except the closing fence
+        """
         chart_type = chart_data.get('type', 'bar')
         data = chart_data.get('data', [])
         config = chart_data.get('config', {})
         
-        if not data:
-            return "No data available for chart"
-        
         # Build attributes string from config - use | as separator and quotes for all values
         attributes = [f'type="{chart_type}"']
         
@@ -336,65 +744,61 @@ class ChartGenerator:
         # Use | as separator instead of spaces
         attribute_string = '|'.join(attributes)
         
-        # Extract all column names from data
-        all_keys = set()
-        for item in data:
-            all_keys.update(item.keys())
-        
-        # Sort keys to ensure consistent column order
-        columns = sorted(list(all_keys))
+        columns = chart_data.get('columns')
+        if columns is None:
+            # Extract all column names from data
+            all_keys = set()
+            for item in data:
+                all_keys.update(item.keys())
+            
+            # Sort keys to ensure consistent column order
+            columns = sorted(list(all_keys))
         
-        # Build markdown table
-        table_lines = []
+        yield f"```chart{{{attribute_string}}}\n"
         
         # Header row
-        header = '| ' + ' | '.join(columns) + ' |'
-        table_lines.append(header)
+        yield '| ' + ' | '.join(columns) + ' |\n'
         
         # Separator row  
-        separator = '|' + '|'.join(['-' * (len(col) + 2) for col in columns]) + '|'
-        table_lines.append(separator)
+        yield '|' + '|'.join(['-' * (len(col) + 2) for col in columns]) + '|\n'
         
         # Data rows
         for item in data:
-            row_values = []
-            for col in columns:
-                value = item.get(col, '')
-                # Format numbers nicely
-                if isinstance(value, (int, float)):
-                    row_values.append(str(value))
-                else:
-                    row_values.append(str(value))
-            row = '| ' + ' | '.join(row_values) + ' |'
-            table_lines.append(row)
-        
-        table_content = '\n'.join(table_lines)
-        
-        return f"""Here's your {chart_type} chart visualization using the new table format:
-
-```chart{{{attribute_string}}}
-{table_content}
-```
-
-This chart uses markdown table format for better readability and AI-friendly generation."""
+            yield '| ' + ' | '.join([str(item.get(col, '')) for col in columns]) + ' |\n'
+        
+        yield "```"
 
     @classmethod
-    def create_all_charts_markdown(cls, data_context: str = 'sales') -> str:
+    def create_all_charts_markdown(cls, data_context: str = 'sales', seed: Optional[int] = None) -> str:
         """
         Create markdown with all supported chart types for testing
         
         Args:
             data_context: Context for the data (default: 'sales')
+            seed: Optional seed making the generated data deterministic
             
         Returns:
             Markdown string with all chart types
         """
+        return ''.join(cls.iter_all_charts_markdown(data_context, seed))
+
+    @classmethod
+    def iter_all_charts_markdown(cls, data_context: str = 'sales', seed: Optional[int] = None) -> Iterator[str]:
+        """
+        Yield the all chart types markdown piece by piece
+        
+        Args:
+            data_context: Context for the data (default: 'sales')
+            seed: Optional seed making the generated data deterministic
+            
+        Returns:
+            Generator of markdown pieces; joined they equal create_all_charts_markdown
+        """
         chart_types = ['bar', 'line', 'pie', 'area', 'scatter']
-        markdown_parts = []
         
-        markdown_parts.append("# Chart Testing - All Chart Types")
-        markdown_parts.append("Here are examples of all supported chart types using markdown table format:")
-        markdown_parts.append("")
+        yield "# Chart Testing - All Chart Types\n"
+        yield "Here are examples of all supported chart types using markdown table format:\n"
+        yield "\n"
         
         for chart_type in chart_types:
             # Use different data contexts for each chart type
@@ -411,30 +815,17 @@ This chart uses markdown table format for better readability and AI-friendly gen
             else:
                 context = 'sales'
             
-            chart_data = cls.generate_chart_data(chart_type, context)
+            chart_data = cls.generate_chart_data(chart_type, context, seed)
             
-            # Table format only
-            markdown_parts.append(f"## {chart_type.title()} Chart")
-            markdown_parts.append("")
-            table_chart = cls._create_table_format_markdown(chart_data)
-            # Extract just the code block part
-            table_lines = table_chart.split('\n')
-            in_code_block = False
-            for line in table_lines:
-                if line.startswith('```chart{'):
-                    in_code_block = True
-                    markdown_parts.append(line)
-                elif line == '```' and in_code_block:
-                    markdown_parts.append(line)
-                    in_code_block = False
-                    break
-                elif in_code_block:
-                    markdown_parts.append(line)
-            markdown_parts.append("")
-        
-        markdown_parts.append("All charts above should render as interactive visualizations.")
-        
-        return "\n".join(markdown_parts)
+            # Table format only - just the code block part
+            yield f"## {chart_type.title()} Chart\n"
+            yield "\n"
+            if chart_data.get('data'):
+                yield from cls.iter_chart_block(chart_data)
+                yield "\n"
+            yield "\n"
+        
+        yield "All charts above should render as interactive visualizations."
 
     @classmethod
     def detect_test_all_charts(cls, text: str) -> bool:
@@ -447,18 +838,7 @@ This chart uses markdown table format for better readability and AI-friendly gen
         Returns:
             True if user wants to test all charts
         """
-        text_lower = text.lower()
-        test_keywords = [
-            'test all charts',
-            'show all charts', 
-            'all chart types',
-            'test charts',
-            'demo charts',
-            'chart examples',
-            'all supported charts'
-        ]
-        
-        return any(keyword in text_lower for keyword in test_keywords)
+        return cls.KEYWORD_MATCHER.scan(text).any(cls._TEST_ALL_PLAN)
     
 
 # Example usage and test functions
@@ -0,0 +1,223 @@
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import brotli
+except ImportError:  # br is not offered without the Brotli package
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # zstd is not offered without the zstandard package
+    zstandard = None
+
+import metrics
+
+# Server preference when the client accepts several encodings equally
+PREFERENCE = ('zstd', 'br', 'gzip')
+
+# Levels suited to compressing on the request path: brotli's default (11) and
+# zstd's higher levels cost far more CPU for a few percent fewer bytes
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+class StreamCompressor:
+    """
+    Compresses a response written in pieces
+
+    Every piece is flushed to a block boundary, so the client can decode all
+    of it as soon as it arrives: an SSE event is never held back inside the
+    compressor waiting for more input.
+    """
+
+    encoding = None
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError
+
+    def finish(self) -> bytes:
+        raise NotImplementedError
+
+class GzipStream(StreamCompressor):
+    encoding = 'gzip'
+
+    def __init__(self, level: int):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+class BrotliStream(StreamCompressor):
+    encoding = 'br'
+
+    def __init__(self, level: int):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+class ZstdStream(StreamCompressor):
+    encoding = 'zstd'
+
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+STREAMS = {'gzip': GzipStream}
+if brotli is not None:
+    STREAMS['br'] = BrotliStream
+if zstandard is not None:
+    STREAMS['zstd'] = ZstdStream
+
+def compress_body(encoding: str, data: bytes, level: int) -> bytes:
+    """Compress a complete body in one call"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Map each coding of an Accept-Encoding header to its quality value"""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+class Compression:
+    """
+    Negotiated response compression (gzip, and br and zstd when their packages are installed)
+
+    JSON bodies are compressed whole when they reach min_bytes. Event streams
+    are compressed event by event with a flush after every write, since their
+    final size is unknown when the headers go out.
+    """
+
+    def __init__(self, encodings: List[str] = PREFERENCE, levels: Optional[Dict[str, int]] = None,
+                 min_bytes: int = 1024, sse: bool = True):
+        self.encodings = [encoding for encoding in encodings if encoding in STREAMS]
+        self.levels = dict(DEFAULT_LEVELS, **(levels or {}))
+        self.min_bytes = min_bytes
+        self.sse = sse
+        self.responses = {}  # encoding -> responses compressed
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, compression_config: Dict[str, Any]) -> 'Compression':
+        """Create from the backend.compression configuration"""
+        return cls(
+            encodings=compression_config.get("encodings", list(PREFERENCE)),
+            levels=compression_config.get("levels"),
+            min_bytes=compression_config.get("minBytes", 1024),
+            sse=compression_config.get("sse", True)
+        )
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """
+        Pick the encoding for a request
+        
+        Args:
+            accept_encoding: The request's Accept-Encoding header
+        
+        Returns:
+            The accepted encoding with the highest quality (ties go to the
+            configured order), or None to send the response uncompressed
+        """
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get('*', 0.0)
+        best, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = accepted.get(encoding, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, encoding: str, data: bytes) -> bytes:
+        """Compress a complete response body"""
+        started = time.perf_counter()
+        body = compress_body(encoding, data, self.levels[encoding])
+        self._record(encoding, len(data), len(body), time.perf_counter() - started, True)
+        return body
+
+    def stream(self, encoding: str, payloads: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Compress a streamed response write by write
+        
+        Args:
+            encoding: The negotiated encoding
+            payloads: The response's writes (for SSE, whole coalesced events)
+        
+        Returns:
+            Generator of compressed writes, each decodable on arrival
+        """
+        compressor = STREAMS[encoding](self.levels[encoding])
+        first = True
+        try:
+            for payload in payloads:
+                started = time.perf_counter()
+                data = compressor.compress(payload)
+                self._record(encoding, len(payload), len(data), time.perf_counter() - started, first)
+                first = False
+                yield data
+            started = time.perf_counter()
+            data = compressor.finish()
+            self._record(encoding, 0, len(data), time.perf_counter() - started, first)
+            yield data
+        finally:
+            # Closing this generator (the client went away) closes the stream's writer too
+            close = getattr(payloads, 'close', None)
+            if close is not None:
+                close()
+
+    def _record(self, encoding, bytes_in, bytes_out, seconds, new_response):
+        with self._lock:
+            if new_response:
+                self.responses[encoding] = self.responses.get(encoding, 0) + 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.seconds += seconds
+        metrics.compression_bytes.inc(bytes_in, encoding, 'in')
+        metrics.compression_bytes.inc(bytes_out, encoding, 'out')
+        metrics.compression_seconds.inc(seconds, encoding)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /api/stats"""
+        with self._lock:
+            return {
+                'encodings': self.encodings,
+                'responses': dict(self.responses),
+                'bytesIn': self.bytes_in,
+                'bytesOut': self.bytes_out,
+                'ratio': self.bytes_out / self.bytes_in if self.bytes_in else None,
+                'cpuSeconds': self.seconds
+            }
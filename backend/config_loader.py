@@ -27,15 +27,53 @@ class ConfigManager:
                     "server": {
                         "host": "0.0.0.0",
                         "port": 5001,
-                        "debug": True
+                        "debug": False,
+                        "workerClass": "gevent",
+                        "workers": "auto",
+                        "threads": 8,
+                        "workerConnections": 2000,
+                        "keepAliveSeconds": 5,
+                        "timeoutSeconds": 30,
+                        "gracefulTimeoutSeconds": 30
                     },
                     "uploads": {
                         "folder": "uploads",
                         "allowedExtensions": ["png", "jpg", "jpeg", "gif", "pdf", "txt", "doc", "docx"],
-                        "maxContentLength": 16 * 1024 * 1024  # 16MB
+                        "maxContentLength": 16 * 1024 * 1024,  # 16MB
+                        "maxStreamLength": 4 * 1024 * 1024 * 1024,  # 4GB
+                        "streamBufferSize": 1024 * 1024,
+                        "indexFile": "index.jsonl",
+                        "indexCompactAfter": 10000,
+                        "blobGraceSeconds": 60,
+                        "thumbnails": {
+                            "enabled": True,
+                            "sizes": [128, 512],
+                            "workers": 2,
+                            "maxQueue": 256
+                        },
+                        "serving": {
+                            "maxAge": 365 * 24 * 3600,
+                            "offload": None,
+                            "accelRedirectPrefix": "/_uploads/"
+                        },
+                        "resumable": {
+                            "folder": "partial",
+                            "maxSize": 4 * 1024 * 1024 * 1024,  # 4GB
+                            "ttlSeconds": 86400
+                        }
                     },
                     "cors": {
                         "enabled": True
+                    },
+                    "streaming": {
+                        "heartbeatSeconds": 15,
+                        "coalesce": {
+                            "maxBytes": 0,
+                            "maxLatencyMs": 0
+                        }
+                    },
+                    "latency": {
+                        "profile": "default"
                     }
                 }
             }
@@ -59,6 +97,38 @@ class ConfigManager:
     def get_cors_config(self):
         """Get CORS configuration"""
         return self.get_backend_config().get("cors", {})
+    
+    def get_streaming_config(self):
+        """Get SSE streaming configuration"""
+        return self.get_backend_config().get("streaming", {})
+    
+    def get_charts_config(self):
+        """Get chart generation configuration"""
+        return self.get_backend_config().get("charts", {})
+    
+    def get_response_cache_config(self):
+        """Get fetch response cache configuration"""
+        return self.get_backend_config().get("responseCache", {})
+    
+    def get_sessions_config(self):
+        """Get session store configuration"""
+        return self.get_backend_config().get("sessions", {})
+    
+    def get_state_config(self):
+        """Get shared state backend configuration"""
+        return self.get_backend_config().get("state", {})
+    
+    def get_metrics_config(self):
+        """Get Prometheus metrics configuration"""
+        return self.get_backend_config().get("metrics", {})
+    
+    def get_compression_config(self):
+        """Get response compression configuration"""
+        return self.get_backend_config().get("compression", {})
+    
+    def get_latency_config(self):
+        """Get simulated latency configuration"""
+        return self.get_backend_config().get("latency", {})
 
 # Create a singleton instance
 config_manager = ConfigManager() 
\ No newline at end of file
@@ -0,0 +1,281 @@
+import math
+import random
+from typing import Any, Dict, Iterator, List
+
+try:
+    import numpy as np
+except ImportError:  # Pure-Python fallback below; much slower for large datasets
+    np = None
+
+DISTRIBUTIONS = ('normal', 'uniform', 'lognormal', 'walk')
+DOWNSAMPLE_METHODS = ('lttb', 'minmax', 'none')
+
+class DatasetSpec:
+    """Parameters of a synthetic chart dataset"""
+
+    __slots__ = ('points', 'series', 'distribution', 'noise', 'trend', 'period',
+                 'amplitude', 'base', 'seed', 'max_rows', 'downsample')
+
+    def __init__(self, points=1000, series=1, distribution='normal', noise=10.0, trend=0.0,
+                 period=0, amplitude=0.0, base=100.0, seed=None, max_rows=2000, downsample='lttb'):
+        self.points = points
+        self.series = series
+        self.distribution = distribution
+        self.noise = noise
+        self.trend = trend
+        self.period = period
+        self.amplitude = amplitude
+        self.base = base
+        self.seed = seed
+        self.max_rows = max_rows
+        self.downsample = downsample
+
+    @classmethod
+    def from_request(cls, options: Dict[str, Any], dataset_config: Dict[str, Any]) -> 'DatasetSpec':
+        """
+        Build and validate a spec from a request's "dataset" options
+        
+        Args:
+            options: Request options (points, series, distribution, noise,
+                trend, seasonality {period, amplitude}, base, seed, maxRows,
+                downsample)
+            dataset_config: The backend.charts.dataset configuration
+            
+        Returns:
+            DatasetSpec instance
+            
+        Raises:
+            ValueError: If an option is missing, malformed or over a limit
+        """
+        if not isinstance(options, dict):
+            raise ValueError("dataset must be an object")
+        seasonality = options.get("seasonality") or {}
+        if not isinstance(seasonality, dict):
+            raise ValueError("dataset.seasonality must be an object")
+        max_rows = dataset_config.get("maxRows", 2000)
+        try:
+            spec = cls(
+                points=int(options.get("points", 1000)),
+                series=int(options.get("series", 1)),
+                distribution=options.get("distribution", "normal"),
+                noise=float(options.get("noise", 10.0)),
+                trend=float(options.get("trend", 0.0)),
+                period=int(seasonality.get("period", 0)),
+                amplitude=float(seasonality.get("amplitude", 0.0)),
+                base=float(options.get("base", 100.0)),
+                seed=options.get("seed"),
+                max_rows=int(options.get("maxRows", max_rows)),
+                downsample=options.get("downsample", dataset_config.get("downsample", "lttb"))
+            )
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid dataset option: {e}")
+
+        max_points = dataset_config.get("maxPoints", 1000000)
+        max_series = dataset_config.get("maxSeries", 8)
+        if not 1 <= spec.points <= max_points:
+            raise ValueError(f"dataset.points must be between 1 and {max_points}")
+        if not 1 <= spec.series <= max_series:
+            raise ValueError(f"dataset.series must be between 1 and {max_series}")
+        if spec.distribution not in DISTRIBUTIONS:
+            raise ValueError(f"dataset.distribution must be one of {', '.join(DISTRIBUTIONS)}")
+        if spec.downsample not in DOWNSAMPLE_METHODS:
+            raise ValueError(f"dataset.downsample must be one of {', '.join(DOWNSAMPLE_METHODS)}")
+        if spec.seed is not None and not isinstance(spec.seed, int):
+            raise ValueError("dataset.seed must be an integer")
+        if spec.max_rows < 3 and spec.downsample != 'none':
+            raise ValueError("dataset.maxRows must be at least 3")
+        # A request can lower the configured row budget, never raise it
+        spec.max_rows = min(spec.max_rows, max_rows)
+        if spec.downsample == 'none' and spec.points > max_rows:
+            raise ValueError(f"dataset.points must be at most {max_rows} when downsample is 'none'")
+        return spec
+
+    @property
+    def column_names(self) -> List[str]:
+        """Names of the value columns"""
+        return [f"series{i + 1}" for i in range(self.series)]
+
+def generate(spec: DatasetSpec):
+    """
+    Generate the dataset's value arrays
+    
+    Each series is base * (1 + 0.25 * index) plus a linear trend, a sine
+    seasonality and noise from the chosen distribution ("walk" accumulates
+    normal noise into a random walk).
+    
+    Returns:
+        List of value arrays (NumPy arrays when available, lists otherwise),
+        one per series, rounded to two decimals
+    """
+    if np is not None:
+        return _generate_numpy(spec)
+    return _generate_python(spec)
+
+def _generate_numpy(spec: DatasetSpec):
+    rng = np.random.default_rng(spec.seed)
+    t = np.arange(spec.points, dtype=np.float64)
+    signal = spec.trend * t
+    if spec.period > 0 and spec.amplitude:
+        signal += spec.amplitude * np.sin(2 * np.pi * t / spec.period)
+
+    values = []
+    for index in range(spec.series):
+        if spec.distribution == 'normal':
+            noise = rng.normal(0.0, spec.noise, spec.points)
+        elif spec.distribution == 'uniform':
+            noise = rng.uniform(-spec.noise, spec.noise, spec.points)
+        elif spec.distribution == 'lognormal':
+            noise = rng.lognormal(0.0, 0.5, spec.points) * spec.noise
+        else:
+            noise = np.cumsum(rng.normal(0.0, spec.noise, spec.points))
+        values.append(np.round(spec.base * (1 + 0.25 * index) + signal + noise, 2))
+    return values
+
+def _generate_python(spec: DatasetSpec):
+    rng = random.Random(spec.seed)
+    values = []
+    for index in range(spec.series):
+        offset = spec.base * (1 + 0.25 * index)
+        walk = 0.0
+        series = []
+        for t in range(spec.points):
+            value = offset + spec.trend * t
+            if spec.period > 0 and spec.amplitude:
+                value += spec.amplitude * math.sin(2 * math.pi * t / spec.period)
+            if spec.distribution == 'normal':
+                value += rng.gauss(0.0, spec.noise)
+            elif spec.distribution == 'uniform':
+                value += rng.uniform(-spec.noise, spec.noise)
+            elif spec.distribution == 'lognormal':
+                value += rng.lognormvariate(0.0, 0.5) * spec.noise
+            else:
+                walk += rng.gauss(0.0, spec.noise)
+                value += walk
+            series.append(round(value, 2))
+        values.append(series)
+    return values
+
+def downsample_indices(values, max_rows: int, method: str = 'lttb'):
+    """
+    Choose which points to keep so a series fits in max_rows
+    
+    Args:
+        values: Series values, indexed by x position
+        max_rows: Row budget
+        method: "lttb" (Largest-Triangle-Three-Buckets, keeps visual shape),
+            "minmax" (min and max of each bucket, keeps extremes) or "none"
+            
+    Returns:
+        Sorted indices of the points to keep (a range when nothing is dropped)
+    """
+    n = len(values)
+    if method == 'none' or n <= max_rows:
+        return range(n)
+    if method == 'minmax':
+        return _minmax_numpy(values, max_rows) if np is not None else _minmax_python(values, max_rows)
+    return _lttb_numpy(values, max_rows) if np is not None else _lttb_python(values, max_rows)
+
+def _lttb_numpy(values, threshold):
+    n = len(values)
+    y = np.asarray(values, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    # Bucket boundaries for the threshold - 2 middle buckets, plus the next bucket's average
+    edges = (np.floor(np.arange(threshold - 1) * every) + 1).astype(np.int64)
+    edges[-1] = n - 1
+    sums = np.concatenate(([0.0], np.cumsum(y)))
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start = end
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        if next_end <= next_start:
+            next_start, next_end = n - 1, n
+        avg_x = (next_start + next_end - 1) / 2.0
+        avg_y = (sums[next_end] - sums[next_start]) / (next_end - next_start)
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+def _lttb_python(values, threshold):
+    n = len(values)
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(math.floor(i * every)) + 1
+        end = int(math.floor((i + 1) * every)) + 1
+        next_start = end
+        next_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        if next_end <= next_start:
+            next_start, next_end = n - 1, n
+        avg_x = (next_start + next_end - 1) / 2.0
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        selected.append(a)
+    selected.append(n - 1)
+    return selected
+
+def _minmax_numpy(values, max_rows):
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    buckets = max(max_rows // 2, 1)
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    grid = padded.reshape(buckets, size)
+    valid = ~np.all(np.isnan(grid), axis=1)
+    offsets = np.arange(buckets) * size
+    mins = np.nanargmin(grid[valid], axis=1) + offsets[valid]
+    maxs = np.nanargmax(grid[valid], axis=1) + offsets[valid]
+    return np.unique(np.concatenate((mins, maxs)))
+
+def _minmax_python(values, max_rows):
+    n = len(values)
+    buckets = max(max_rows // 2, 1)
+    size = -(-n // buckets)
+    selected = set()
+    for start in range(0, n, size):
+        bucket = values[start:start + size]
+        selected.add(start + bucket.index(min(bucket)))
+        selected.add(start + bucket.index(max(bucket)))
+    return sorted(selected)
+
+def iter_rows(spec: DatasetSpec, values, indices, batch_size: int = 1024) -> Iterator[Dict[str, Any]]:
+    """
+    Yield table rows for the kept indices, converting values in batches
+    
+    Args:
+        spec: The dataset's spec (for column names)
+        values: Arrays returned by generate
+        indices: Indices returned by downsample_indices
+        batch_size: Rows converted to Python values at a time
+        
+    Returns:
+        Generator of row dictionaries with an "x" column and one column per series
+    """
+    names = spec.column_names
+    indices = indices if np is None or isinstance(indices, range) else np.asarray(indices)
+    for start in range(0, len(indices), batch_size):
+        batch = indices[start:start + batch_size]
+        if np is not None:
+            batch_index = np.arange(batch.start, batch.stop) if isinstance(batch, range) else batch
+            columns = [series[batch_index].tolist() for series in values]
+            positions = batch_index.tolist()
+        else:
+            columns = [[series[i] for i in batch] for series in values]
+            positions = list(batch)
+        for row in range(len(positions)):
+            item = {"x": positions[row]}
+            for name, column in zip(names, columns):
+                item[name] = column[row]
+            yield item
@@ -0,0 +1,352 @@
+import bisect
+import fcntl
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+from uploads import copy_stream, DEFAULT_BUFFER_SIZE
+
+class ContentMismatch(Exception):
+    """Raised when an upload does not match the hash the client declared for it"""
+
+class BlobStore:
+    """
+    Content-addressed file storage
+    
+    Each unique file is stored once, at blobs/<ab>/<cd>/<sha256> where ab and
+    cd are the first two byte pairs of its hex digest. Uploads are written to
+    a temporary file and renamed into place, or discarded if the blob exists.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_root = os.path.join(root, 'blobs')
+        self.temp_root = os.path.join(root, 'tmp')
+        os.makedirs(self.blob_root, exist_ok=True)
+        os.makedirs(self.temp_root, exist_ok=True)
+    
+    def path(self, sha256: str) -> str:
+        """Filesystem path of a blob"""
+        return os.path.join(self.blob_root, sha256[:2], sha256[2:4], sha256)
+    
+    def receive(self, source: BinaryIO, length: Optional[int] = None, limit: Optional[int] = None,
+                buffer_size: int = DEFAULT_BUFFER_SIZE, expected_sha256: Optional[str] = None) -> Tuple[int, str, bool]:
+        """
+        Store a request body
+        
+        When the client declares the body's hash and that blob is already
+        stored, the body is only hashed to verify it, never written.
+        
+        Args:
+            source: Raw input stream or file object
+            length: Declared Content-Length, or None to read until EOF
+            limit: Maximum number of bytes accepted
+            buffer_size: Size of the copy buffer
+            expected_sha256: Hex SHA-256 declared by the client, if any
+            
+        Returns:
+            Tuple of (size, hex SHA-256 digest, whether a new blob was stored)
+            
+        Raises:
+            ContentMismatch: If the body does not match expected_sha256
+        """
+        if expected_sha256 and self.touch(expected_sha256):
+            size, sha256 = copy_stream(source, None, length, limit, buffer_size)
+            if sha256 != expected_sha256:
+                raise ContentMismatch("Upload does not match X-Content-SHA256")
+            return size, sha256, False
+        
+        fd, temp_path = tempfile.mkstemp(dir=self.temp_root)
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                size, sha256 = copy_stream(source, target, length, limit, buffer_size)
+            if expected_sha256 and sha256 != expected_sha256:
+                raise ContentMismatch("Upload does not match X-Content-SHA256")
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return size, sha256, self._ingest(temp_path, sha256)
+    
+    def ingest_file(self, path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Tuple[str, bool]:
+        """
+        Hash a complete file and move it into the store (or delete it if it is a duplicate)
+        
+        Args:
+            path: File on the same filesystem as the store
+            buffer_size: Read size used for hashing
+            
+        Returns:
+            Tuple of (hex SHA-256 digest, whether a new blob was stored)
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(buffer_size), b''):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        return sha256, self._ingest(path, sha256)
+    
+    def _ingest(self, temp_path: str, sha256: str) -> bool:
+        if self.touch(sha256):
+            os.unlink(temp_path)
+            return False
+        path = self.path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Identical content, so a concurrent upload of the same blob may win harmlessly
+        os.replace(temp_path, path)
+        return True
+    
+    def touch(self, sha256: str) -> bool:
+        """
+        Mark a blob as just reused, so garbage collection spares it
+        
+        Returns:
+            Whether the blob exists
+        """
+        try:
+            os.utime(self.path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+    
+    def age(self, sha256: str) -> Optional[float]:
+        """Seconds since a blob was stored or last deduplicated against, or None if it is missing"""
+        try:
+            return time.time() - os.stat(self.path(sha256)).st_mtime
+        except FileNotFoundError:
+            return None
+    
+    def delete(self, sha256: str):
+        """Remove a blob that is no longer referenced, with any files derived from it"""
+        path = self.path(sha256)
+        for derived in glob.glob(glob.escape(path) + '.*'):
+            os.unlink(derived)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+class FileIndex:
+    """
+    Maps file ids to blobs, with a reference count per blob
+    
+    The index is an append-only JSON-lines log of "add" and "remove" entries
+    replayed into in-memory dictionaries, so lookups by id are O(1) and
+    listings never touch the upload folder. Every worker process appends to
+    the same log (under an flock) and picks up the entries written by the
+    others before reading, so all workers converge on the same view. Once
+    enough entries are dead the log is compacted by rewriting it with only
+    the live records; workers notice the new file and replay it.
+    
+    Each record gets a sequence number in upload order. Listings keep the
+    sequence numbers of every owner's files so a page is found by bisection.
+    """
+    
+    def __init__(self, path: str, compact_after: int = 10000):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self.compact_after = compact_after
+        self.lock = threading.RLock()
+        open(path, 'a').close()
+        self._reset()
+        self.refresh()
+    
+    def _reset(self):
+        self.records = {}
+        self.refcounts = {}
+        # Owner (None for every file) -> ([seq, ...], [id, ...]) in upload order;
+        # removed ids stay behind until the next compaction
+        self.listings = {}
+        self.orphans = set()
+        self.total_bytes = 0
+        self.stored_bytes = 0
+        self.next_seq = 0
+        self.entries = 0
+        self.offset = 0
+        self.inode = None
+    
+    @contextmanager
+    def _file_lock(self):
+        # Opened per use: a descriptor inherited across fork would share the lock
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+    
+    def refresh(self):
+        """Apply log entries appended since the last refresh"""
+        with self.lock:
+            stat = os.stat(self.path)
+            if stat.st_ino == self.inode and stat.st_size == self.offset:
+                return
+            with open(self.path, 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                if inode != self.inode:
+                    # The log was compacted: replay the new one from the start
+                    self._reset()
+                    self.inode = inode
+                f.seek(self.offset)
+                data = f.read()
+            # A line still being appended by another process is picked up next time
+            end = data.rfind(b'\n') + 1
+            for line in data[:end].splitlines():
+                if line.strip():
+                    self._apply(json.loads(line))
+            self.offset += end
+    
+    def _apply(self, entry: Dict[str, Any]):
+        self.entries += 1
+        if entry.get('op') == 'remove':
+            record = self.records.pop(entry['id'], None)
+            if record is not None:
+                self.total_bytes -= record['size']
+                self.refcounts[record['sha256']] -= 1
+                if not self.refcounts[record['sha256']]:
+                    del self.refcounts[record['sha256']]
+                    self.stored_bytes -= record['size']
+                    self.orphans.add(record['sha256'])
+        elif entry['id'] not in self.records:
+            record = {key: value for key, value in entry.items() if key != 'op'}
+            record.setdefault('seq', self.next_seq)
+            self.next_seq = max(self.next_seq, record['seq'] + 1)
+            self.records[record['id']] = record
+            self.total_bytes += record['size']
+            count = self.refcounts.get(record['sha256'], 0)
+            if not count:
+                self.stored_bytes += record['size']
+            self.refcounts[record['sha256']] = count + 1
+            for owner in {None, record.get('owner')}:
+                seqs, ids = self.listings.setdefault(owner, ([], []))
+                seqs.append(record['seq'])
+                ids.append(record['id'])
+    
+    def _append(self, entry: Dict[str, Any]):
+        with self._file_lock():
+            # One O_APPEND write per entry keeps concurrent writers from interleaving
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+            try:
+                os.write(fd, (json.dumps(entry, separators=(',', ':')) + '\n').encode())
+            finally:
+                os.close(fd)
+        self.refresh()
+    
+    def add(self, record: Dict[str, Any]):
+        """
+        Record a file
+        
+        Args:
+            record: File metadata including 'id', 'sha256', 'size' and
+                optionally 'owner'
+        """
+        self._append({'op': 'add', **record})
+    
+    def get(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """File metadata by id, or None"""
+        self.refresh()
+        return self.records.get(file_id)
+    
+    def remove(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Forget a file, compacting the log once enough entries are dead
+        
+        Returns:
+            The removed record, or None if the id was unknown
+        """
+        record = self.get(file_id)
+        if record is not None:
+            self._append({'op': 'remove', 'id': file_id})
+            dead = self.entries - len(self.records)
+            if dead >= self.compact_after and dead > len(self.records):
+                self.compact()
+        return record
+    
+    def page(self, owner: Optional[str] = None, limit: int = 50,
+             cursor: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        One page of files, newest first
+        
+        Args:
+            owner: Only list this owner's files (None lists every file)
+            limit: Maximum number of records
+            cursor: Cursor returned with the previous page
+            
+        Returns:
+            Tuple of (records, cursor for the next page or None)
+        """
+        self.refresh()
+        with self.lock:
+            seqs, ids = self.listings.get(owner, ([], []))
+            index = (len(seqs) if cursor is None else bisect.bisect_left(seqs, cursor)) - 1
+            records = []
+            while index >= 0 and len(records) < limit:
+                record = self.records.get(ids[index])
+                if record is not None:
+                    records.append(record)
+                index -= 1
+            next_cursor = records[-1]['seq'] if index >= 0 and records else None
+            return records, next_cursor
+    
+    def compact(self):
+        """Rewrite the log with only the live records"""
+        with self.lock, self._file_lock():
+            self.refresh()
+            temp_path = self.path + '.compact'
+            with open(temp_path, 'w') as f:
+                for record in sorted(self.records.values(), key=lambda r: r['seq']):
+                    f.write(json.dumps({'op': 'add', **record}, separators=(',', ':')) + '\n')
+            os.replace(temp_path, self.path)
+            orphans = self.orphans
+            self.refresh()
+            self.orphans |= orphans
+    
+    def collect_garbage(self, store: BlobStore, grace: float) -> int:
+        """
+        Delete blobs no file references any more
+        
+        A blob is only deleted once it has been unreferenced and untouched for
+        grace seconds, so an upload that has just deduplicated against it (and
+        touched it) but not yet been indexed keeps it alive.
+        
+        Returns:
+            Number of blobs deleted
+        """
+        with self.lock:
+            candidates = [sha256 for sha256 in self.orphans if sha256 not in self.refcounts]
+            self.orphans.clear()
+        deleted = 0
+        for sha256 in candidates:
+            age = store.age(sha256)
+            if age is None:
+                continue
+            if age < grace:
+                with self.lock:
+                    self.orphans.add(sha256)
+                continue
+            with self.lock:
+                if sha256 in self.refcounts:
+                    continue
+                store.delete(sha256)
+            deleted += 1
+        return deleted
+    
+    def refcount(self, sha256: str) -> int:
+        """Number of files referencing a blob"""
+        return self.refcounts.get(sha256, 0)
+    
+    def stats(self) -> Dict[str, Any]:
+        """File and unique-blob counts and sizes"""
+        with self.lock:
+            return {
+                'files': len(self.records),
+                'blobs': len(self.refcounts),
+                'bytes': self.total_bytes,
+                'storedBytes': self.stored_bytes,
+                'logEntries': self.entries
+            }
@@ -0,0 +1,77 @@
+"""
+Gunicorn settings for the backend
+
+Streaming responses spend nearly all of their life waiting between events, so
+the default worker class is gevent: each worker multiplexes thousands of open
+SSE streams cooperatively instead of dedicating a whole process to each one.
+"""
+import os
+import signal
+import time
+from config_loader import config_manager
+
+started = time.monotonic()
+
+server_config = config_manager.get_server_config()
+
+bind = f"{server_config.get('host', '0.0.0.0')}:{os.environ.get('PORT', server_config.get('port', 5001))}"
+
+# server.workerClass accepts gunicorn's names or the generic sync/threads/async
+WORKER_CLASSES = {'sync': 'sync', 'threads': 'gthread', 'gthread': 'gthread', 'async': 'gevent', 'gevent': 'gevent'}
+worker_class = WORKER_CLASSES.get(server_config.get("workerClass", "gevent"), server_config.get("workerClass"))
+
+def available_cores():
+    """CPU cores this process may run on (respects affinity masks and cgroup cpusets)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def auto_workers(worker_class, cores):
+    """
+    Worker processes for `cores` cores
+
+    Sync workers block on I/O, so they get the usual 2 x cores + 1. Threaded
+    and gevent workers overlap I/O inside each process, so one per core keeps
+    every core busy without extra memory.
+    """
+    if worker_class == 'sync':
+        return 2 * cores + 1
+    return cores
+
+# WEB_CONCURRENCY (the usual platform setting) wins over server.workers; "auto" sizes to the cores
+workers_setting = os.environ.get('WEB_CONCURRENCY') or server_config.get("workers", "auto")
+workers = auto_workers(worker_class, available_cores()) if workers_setting == "auto" else int(workers_setting)
+
+# Threads per gthread worker; each open stream holds one
+threads = server_config.get("threads", 8) if worker_class == 'gthread' else 1
+
+# Maximum simultaneous clients (open streams) per gevent worker
+worker_connections = server_config.get("workerConnections", 2000)
+
+# Seconds an idle keep-alive connection is held open between requests
+keepalive = server_config.get("keepAliveSeconds", 5)
+
+# Seconds a worker may go silent before the arbiter restarts it
+timeout = server_config.get("timeoutSeconds", 30)
+
+# Seconds workers get to finish in-flight requests after SIGTERM
+graceful_timeout = server_config.get("gracefulTimeoutSeconds", 30)
+
+def when_ready(server):
+    server.log.info("Listening after %.2fs: %d %s worker(s)", time.monotonic() - started, workers, worker_class)
+
+def post_fork(server, worker):
+    worker.forked_at = time.monotonic()
+
+def post_worker_init(worker):
+    """Log how long the worker took to load the app, and drain streams on graceful shutdown"""
+    worker.log.info("Worker %s loaded the app in %.2fs", worker.pid, time.monotonic() - worker.forked_at)
+
+    from streaming import begin_drain
+    handle_exit = worker.handle_exit
+
+    def drain_and_exit(sig, frame):
+        # Open SSE streams skip their remaining delays and complete before graceful_timeout
+        begin_drain()
+        handle_exit(sig, frame)
+    signal.signal(signal.SIGTERM, drain_and_exit)
@@ -0,0 +1,194 @@
+import json
+import math
+import os
+import random
+from typing import Any, Callable, Dict, Optional, Union
+
+# Timings of the original hard-coded mock backend
+DEFAULT_PROFILE = {
+    "firstToken": 3.0,
+    "interToken": 0.1,
+    "thinkingStep": 0.3,
+    "thinkingComplete": 0.2
+}
+
+# Built-in profiles, available even when config.json defines none
+BUILTIN_PROFILES = {
+    "default": DEFAULT_PROFILE,
+    "zero": {
+        "firstToken": 0,
+        "interToken": 0,
+        "thinkingStep": 0,
+        "thinkingComplete": 0
+    }
+}
+
+DelaySpec = Union[int, float, Dict[str, Any]]
+
+# Trace files named by configured profiles are resolved inside this directory
+TRACES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'traces')
+
+# Larger trace files are refused rather than read into memory
+MAX_TRACE_BYTES = 1024 * 1024
+
+DELAY_KEYS = ("firstToken", "interToken", "thinkingStep", "thinkingComplete")
+
+def build_sampler(spec: DelaySpec, rng: random.Random) -> Callable[[], float]:
+    """
+    Build a delay sampler from a distribution spec
+    
+    Args:
+        spec: A number of seconds (fixed delay) or a dictionary with a
+            "distribution" of fixed, normal, lognormal, trace or zero
+        rng: Random generator used for sampling
+        
+    Returns:
+        Callable returning the next delay in seconds (never negative)
+    """
+    if isinstance(spec, (int, float)):
+        spec = {"distribution": "fixed", "value": spec}
+    if not isinstance(spec, dict):
+        raise ValueError(f"Invalid delay spec: {spec!r}")
+
+    distribution = spec.get("distribution", "fixed")
+    cap = spec.get("max")
+
+    if distribution == "zero":
+        return lambda: 0.0
+    elif distribution == "fixed":
+        value = float(spec.get("value", 0))
+        sample = lambda: value
+    elif distribution == "normal":
+        mean = float(spec.get("mean", 0))
+        stddev = float(spec.get("stddev", 0))
+        sample = lambda: rng.gauss(mean, stddev)
+    elif distribution == "lognormal":
+        # Parameterised by the median delay so values stay in seconds
+        median = float(spec.get("median", 0))
+        if median <= 0:
+            return lambda: 0.0
+        mu = math.log(median)
+        sigma = float(spec.get("sigma", 0.5))
+        sample = lambda: rng.lognormvariate(mu, sigma)
+    elif distribution == "trace":
+        if "file" in spec:
+            # Files are read once by LatencyModel, and only for configured profiles
+            raise ValueError("Trace 'file' is only accepted in configured latency profiles")
+        values = spec.get("values")
+        if not values:
+            raise ValueError("Trace distribution requires 'values'")
+        values = [float(v) for v in values]
+        position = [0]
+
+        def sample():
+            # Replay the recorded gaps in order, wrapping around at the end
+            value = values[position[0] % len(values)]
+            position[0] += 1
+            return value
+    else:
+        raise ValueError(f"Unknown delay distribution: {distribution}")
+
+    if cap is not None:
+        cap = float(cap)
+        return lambda: min(max(sample(), 0.0), cap)
+    return lambda: max(sample(), 0.0)
+
+def _load_trace(name: str) -> list:
+    """
+    Load recorded delays from a JSON list or a one-value-per-line text file in TRACES_DIR
+    
+    Args:
+        name: Path of the file relative to TRACES_DIR
+        
+    Returns:
+        The delays in seconds
+        
+    Raises:
+        ValueError: If the file is outside TRACES_DIR, unreadable, too large or
+            not a list of numbers (the message never includes its content)
+    """
+    root = os.path.realpath(TRACES_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.isabs(name) or os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Trace file must be inside {TRACES_DIR}: {name}")
+    if not os.path.isfile(path) or os.path.getsize(path) > MAX_TRACE_BYTES:
+        raise ValueError(f"Trace file is missing or larger than {MAX_TRACE_BYTES} bytes: {name}")
+    try:
+        with open(path, 'r') as f:
+            content = f.read(MAX_TRACE_BYTES)
+        values = json.loads(content) if content.lstrip().startswith('[') else content.split()
+        return [float(v) for v in values]
+    except (OSError, TypeError, ValueError):
+        raise ValueError(f"Trace file is not a list of delays: {name}") from None
+
+def load_traces(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a configured profile with each trace 'file' replaced by its loaded 'values'"""
+    loaded = dict(profile)
+    for key in DELAY_KEYS:
+        spec = profile.get(key)
+        if isinstance(spec, dict) and spec.get("distribution") == "trace" and "file" in spec:
+            loaded[key] = {k: v for k, v in spec.items() if k != "file"}
+            loaded[key]["values"] = _load_trace(spec["file"])
+    return loaded
+
+class LatencyProfile:
+    """Timing model for a simulated response"""
+
+    def __init__(self, spec: Dict[str, Any], seed: Optional[int] = None):
+        """
+        Args:
+            spec: Profile dictionary with firstToken, interToken, thinkingStep
+                and thinkingComplete delay specs (missing keys use the defaults)
+            seed: Optional seed for reproducible sampling
+        """
+        rng = random.Random(seed if seed is not None else spec.get("seed"))
+        merged = {**DEFAULT_PROFILE, **spec}
+        try:
+            self.first_token = build_sampler(merged["firstToken"], rng)
+            self.inter_token = build_sampler(merged["interToken"], rng)
+            self.thinking_step = build_sampler(merged["thinkingStep"], rng)
+            self.thinking_complete = build_sampler(merged["thinkingComplete"], rng)
+        except (TypeError, OSError) as e:
+            raise ValueError(f"Invalid latency profile: {e}")
+
+    @classmethod
+    def zero(cls) -> 'LatencyProfile':
+        """Profile with no delays at all, for throughput benchmarking"""
+        return cls(BUILTIN_PROFILES["zero"])
+
+class LatencyModel:
+    """Resolve latency profiles from configuration and per-request overrides"""
+
+    def __init__(self, latency_config: Dict[str, Any]):
+        self.default_profile = latency_config.get("profile", "default")
+        # Trace files are read here, once, so responses never touch the filesystem
+        self.profiles = {name: load_traces(profile)
+                         for name, profile in {**BUILTIN_PROFILES, **latency_config.get("profiles", {})}.items()}
+        if self.default_profile not in self.profiles:
+            raise ValueError(f"Unknown latency profile: {self.default_profile}")
+
+    def resolve(self, override: Optional[Union[str, Dict[str, Any]]] = None) -> LatencyProfile:
+        """
+        Create a fresh profile for one response
+        
+        Args:
+            override: Optional per-request override, either the name of a
+                configured profile or a profile dictionary layered over the
+                default profile (it may name a base with "profile")
+            
+        Returns:
+            LatencyProfile instance (trace replay starts from the beginning)
+        """
+        if override is None:
+            return LatencyProfile(self.profiles[self.default_profile])
+        if isinstance(override, str):
+            if override not in self.profiles:
+                raise ValueError(f"Unknown latency profile: {override}")
+            return LatencyProfile(self.profiles[override])
+        if isinstance(override, dict):
+            base_name = override.get("profile", self.default_profile)
+            if base_name not in self.profiles:
+                raise ValueError(f"Unknown latency profile: {base_name}")
+            spec = {k: v for k, v in override.items() if k != "profile"}
+            return LatencyProfile({**self.profiles[base_name], **spec})
+        raise ValueError(f"Invalid latency override: {override!r}")
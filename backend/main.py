@@ -1,28 +1,19 @@
 import os
-from flask import Flask, send_from_directory
+from flask import send_from_directory
 from app import app as api_app
 from config_loader import config_manager
 
 # Configure app to serve frontend from ../dist directory
 frontend_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'dist'))
 
-# Register all API routes
-for rule in api_app.url_map.iter_rules():
-    # Skip static and debug endpoints
-    if rule.endpoint != 'static' and not rule.rule.startswith('/debug'):
-        api_app.add_url_rule(rule.rule, view_func=api_app.view_functions[rule.endpoint], methods=rule.methods)
-
-# Route for serving the frontend assets
-@api_app.route('/<path:path>')
-def serve_frontend_assets(path):
-    """Serve static files from the frontend build"""
-    return send_from_directory(frontend_path, path)
-
-# Route for serving index.html for all other routes (SPA client routing)
+# API routes are registered on api_app by app.py; the catch-all below only
+# matches paths none of them claim
 @api_app.route('/', defaults={'path': ''})
 @api_app.route('/<path:path>')
-def serve_spa(path):
-    """Serve index.html for all client-side routes"""
+def serve_frontend(path):
+    """Serve a file from the frontend build, or index.html for client-side routes"""
+    if path and os.path.isfile(os.path.join(frontend_path, path)):
+        return send_from_directory(frontend_path, path)
     return send_from_directory(frontend_path, 'index.html')
 
 if __name__ == '__main__':
@@ -0,0 +1,302 @@
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Optional, Sequence
+
+# Seconds, from a fast cached hit to a slow simulated response
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Seconds between two events of one stream
+GAP_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# Bytes sent over one stream
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Upload bytes per second
+THROUGHPUT_BUCKETS = (1e5, 1e6, 1e7, 5e7, 1e8, 2.5e8, 5e8, 1e9, 2e9)
+
+class Metric:
+    """
+    A named family of samples, one per combination of label values
+
+    Updates take a per-metric lock, which is uncontended under gevent workers
+    and costs well under a microsecond, so instrumenting every event is cheap.
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # tuple of label values -> sample value
+        self.lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the samples"""
+        with self.lock:
+            values = {json.dumps(key): self._copy(value) for key, value in self.values.items()}
+        return {'type': self.kind, 'help': self.help, 'labels': list(self.labelnames), 'values': values}
+
+    def _copy(self, value):
+        return value
+
+class Counter(Metric):
+    """Monotonically increasing total"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    """Value that goes up and down, or is read from a callback at collection time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.function = function
+
+    def inc(self, amount: float = 1, *labels):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, amount: float = 1, *labels):
+        self.inc(-amount, *labels)
+
+    def set(self, value: float, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+    def snapshot(self):
+        if self.function is not None:
+            self.set(self.function())
+        return super().snapshot()
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets, plus their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                # Per-bucket (not cumulative) counts, the +Inf bucket last, then sum
+                state = self.values[labels] = [0] * (len(self.bounds) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _copy(self, value):
+        return list(value)
+
+    def snapshot(self):
+        result = super().snapshot()
+        result['buckets'] = list(self.bounds)
+        return result
+
+class Registry:
+    """
+    The metrics of one worker process, rendered in the Prometheus text format
+
+    Each worker aggregates its own samples in memory. When a shared directory
+    is configured, every worker also writes its snapshot there periodically,
+    and a scrape of any worker sums the snapshots of all live workers.
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.directory = None
+        self.interval = 5.0
+        self._exporter = None
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=(), function=None):
+        return self.register(Gauge(name, help_text, labelnames, function))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def start_export(self, directory: str, interval: float = 5.0):
+        """Write this worker's snapshot to directory every interval seconds"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        if self._exporter is None:
+            self._exporter = threading.Thread(target=self._export_loop, name='metrics-export', daemon=True)
+            self._exporter.start()
+
+    def _export_loop(self):
+        while True:
+            self.export()
+            time.sleep(self.interval)
+
+    def export(self):
+        """Write this worker's snapshot to the shared directory (atomically, by rename)"""
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def collect(self) -> Dict[str, Any]:
+        """This worker's snapshot merged with those of the other live workers"""
+        merged = self.snapshot()
+        if self.directory is None:
+            return merged
+        for name in os.listdir(self.directory):
+            pid, ext = os.path.splitext(name)
+            if ext != '.json' or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            if not process_alive(int(pid)):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:  # another worker removed it first
+                    pass
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    merge_snapshot(merged, json.load(f))
+            except (OSError, ValueError):
+                continue
+        return merged
+
+    def render(self) -> str:
+        """Prometheus text exposition of collect()"""
+        return render_text(self.collect())
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def merge_snapshot(target: Dict[str, Any], other: Dict[str, Any]):
+    """Add the samples of another worker's snapshot into target"""
+    for name, metric in other.items():
+        if name not in target:
+            target[name] = metric
+            continue
+        values = target[name]['values']
+        for key, value in metric['values'].items():
+            if key not in values:
+                values[key] = value
+            elif isinstance(value, list):
+                values[key] = [a + b for a, b in zip(values[key], value)]
+            else:
+                values[key] += value
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_text(snapshot: Dict[str, Any]) -> str:
+    """
+    Render a snapshot in the Prometheus text exposition format (version 0.0.4)
+
+    Args:
+        snapshot: Mapping of metric name to its snapshot, as from Registry.collect
+
+    Returns:
+        The exposition text
+    """
+    lines = []
+    for name, metric in snapshot.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric['labels']
+        for key, value in metric['values'].items():
+            labels = json.loads(key)
+            if metric['type'] != 'histogram':
+                lines.append(f"{name}{_format_labels(names, labels)} {_format_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric['buckets'] + [math.inf], value[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(names, labels, ('le', _format_number(float(bound))))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(names, labels)} {_format_number(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(names, labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+# HTTP handlers, labelled by Flask endpoint name
+http_requests = registry.counter(
+    'chatui_http_requests_total', 'Requests handled, by endpoint, method and status', ('endpoint', 'method', 'status'))
+http_latency = registry.histogram(
+    'chatui_http_request_duration_seconds', 'Time until the handler returned its response (for streams, until headers)',
+    ('endpoint',))
+
+# SSE streams
+sse_first_event = registry.histogram(
+    'chatui_sse_time_to_first_event_seconds', 'Time from the request to the first event written to the client')
+sse_gap = registry.histogram(
+    'chatui_sse_inter_event_seconds', 'Time between consecutive events of one stream', buckets=GAP_BUCKETS)
+sse_duration = registry.histogram(
+    'chatui_sse_stream_duration_seconds', 'Time from the request to the end of the stream')
+sse_stream_bytes = registry.histogram(
+    'chatui_sse_stream_bytes', 'Bytes written per stream', buckets=SIZE_BUCKETS)
+sse_bytes = registry.counter('chatui_sse_bytes_total', 'Bytes written to SSE streams')
+sse_events = registry.counter('chatui_sse_events_total', 'Events written to SSE streams')
+sse_active = registry.gauge('chatui_sse_active_streams', 'SSE streams currently open')
+sse_reaped = registry.counter(
+    'chatui_sse_reaped_streams_total', 'Streams ended early because they were cancelled or the client disconnected',
+    ('reason',))
+sse_reaped_seconds = registry.counter(
+    'chatui_sse_reaped_seconds_total',
+    'Simulated waiting skipped by ending streams early: worker time saved (a lower bound)', ('reason',))
+
+# Uploads
+upload_bytes = registry.counter('chatui_upload_bytes_total', 'Bytes received by upload endpoints', ('endpoint',))
+upload_throughput = registry.histogram(
+    'chatui_upload_throughput_bytes_per_second', 'Upload request body bytes divided by handler time',
+    ('endpoint',), buckets=THROUGHPUT_BUCKETS)
+
+# Response compression
+compression_bytes = registry.counter(
+    'chatui_compression_bytes_total', 'Response bytes before (in) and after (out) compression',
+    ('encoding', 'direction'))
+compression_seconds = registry.counter(
+    'chatui_compression_seconds_total', 'Time spent compressing responses', ('encoding',))
+
+def configure(metrics_config: Dict[str, Any]) -> Optional[Registry]:
+    """
+    Apply the backend.metrics configuration
+
+    Returns:
+        The registry, or None when metrics are disabled
+    """
+    if not metrics_config.get("enabled", True):
+        return None
+    directory = metrics_config.get("multiprocessDir")
+    if directory:
+        registry.start_export(directory, metrics_config.get("exportSeconds", 5.0))
+    return registry
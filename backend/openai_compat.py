@@ -0,0 +1,181 @@
+import time
+import uuid
+from typing import Any, Dict, Iterator, Optional
+
+from serialization import dumps, dumps_str
+from streaming import Delay, EncodedEvent, iter_events
+
+DEFAULT_MODEL = 'chat-ui-mock'
+
+DONE_FRAME = b'data: [DONE]\n\n'
+
+def _message_text(message: Dict[str, Any]) -> str:
+    """Text of a chat message whose content is a string or a list of content parts"""
+    content = message.get('content') or ''
+    if isinstance(content, str):
+        return content
+    if not isinstance(content, list):
+        raise ValueError("'content' must be a string or an array of content parts")
+    texts = [part.get('text') or '' for part in content if isinstance(part, dict) and part.get('type') == 'text']
+    if not all(isinstance(text, str) for text in texts):
+        raise ValueError("text content parts must have a string 'text'")
+    return ''.join(texts)
+
+def count_tokens(text: str) -> int:
+    """Approximate token count: whitespace-separated words"""
+    return len(text.split())
+
+class ChatRequest:
+    """A /v1/chat/completions request translated for the message pipeline"""
+
+    __slots__ = ('model', 'stream', 'include_usage', 'prompt_tokens', 'data')
+
+    def __init__(self, body: Dict[str, Any]):
+        """
+        Args:
+            body: The request's JSON body
+        
+        Raises:
+            ValueError: If the body is not an object, messages is missing or
+                has no user message, or a field has the wrong type
+        """
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        messages = body.get('messages')
+        if not isinstance(messages, list) or not messages:
+            raise ValueError("'messages' must be a non-empty array")
+        user_messages = [m for m in messages if isinstance(m, dict) and m.get('role') == 'user']
+        if not user_messages:
+            raise ValueError("'messages' must contain a user message")
+
+        self.model = body.get('model') or DEFAULT_MODEL
+        self.stream = bool(body.get('stream', False))
+        stream_options = body.get('stream_options') or {}
+        if not isinstance(stream_options, dict):
+            raise ValueError("'stream_options' must be an object")
+        self.include_usage = bool(stream_options.get('include_usage', False))
+        self.prompt_tokens = sum(count_tokens(_message_text(m)) for m in messages if isinstance(m, dict))
+        # The mock answers the latest user message; latency, seed and dataset
+        # are accepted as extensions so benchmarks can shape the response
+        self.data = {
+            'text': _message_text(user_messages[-1]),
+            'files': [],
+            'latency': body.get('latency'),
+            'seed': body.get('seed'),
+            'dataset': body.get('dataset')
+        }
+
+class ChunkEncoder:
+    """
+    Encodes message pipeline events as chat.completion.chunk SSE frames
+
+    Everything in a chunk except the delta text is the same for the whole
+    completion, so the frame is built once as a prefix and suffix around the
+    JSON-encoded text: one string encoding per token instead of a dict.
+    """
+
+    __slots__ = ('head', 'content_prefix', 'reasoning_prefix', 'suffix', 'role_frame', 'finish_frame',
+                 'completion_tokens')
+
+    def __init__(self, completion_id: str, model: str, created: int):
+        # Compact JSON throughout, like the REST stream's frames
+        self.head = b'data: ' + dumps({'id': completion_id, 'object': 'chat.completion.chunk', 'created': created,
+                                       'model': model})[:-1]
+        self.content_prefix = self.head + b',"choices":[{"index":0,"delta":{"content":'
+        self.reasoning_prefix = self.head + b',"choices":[{"index":0,"delta":{"reasoning_content":'
+        self.suffix = b'},"finish_reason":null}]}\n\n'
+        self.role_frame = (self.head + b',"choices":[{"index":0,"delta":{"role":"assistant","content":""},'
+                           b'"finish_reason":null}]}\n\n')
+        self.finish_frame = self.head + b',"choices":[{"index":0,"delta":{},"finish_reason":"stop"}]}\n\n'
+        self.completion_tokens = 0
+
+    def content(self, text: str) -> bytes:
+        self.completion_tokens += count_tokens(text)
+        return self.content_prefix + dumps_str(text) + self.suffix
+
+    def reasoning(self, text: str) -> bytes:
+        self.completion_tokens += count_tokens(text)
+        return self.reasoning_prefix + dumps_str(text) + self.suffix
+
+    def usage_frame(self, prompt_tokens: int) -> bytes:
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': self.completion_tokens,
+                 'total_tokens': prompt_tokens + self.completion_tokens}
+        return self.head + b',"choices":[],"usage":' + dumps(usage) + b'}\n\n'
+
+    def encode(self, events: Iterator[Any], prompt_tokens: Optional[int] = None) -> Iterator[Any]:
+        """
+        Translate pipeline events into encoded chunk frames
+        
+        Args:
+            events: Generator of data chunks and Delay markers
+            prompt_tokens: Include a usage chunk computed with this prompt
+                size before [DONE] (stream_options.include_usage), or None
+        
+        Returns:
+            Generator of EncodedEvents and Delay markers for create_sse_response
+        """
+        yield EncodedEvent(self.role_frame, {})
+        for item in events:
+            if isinstance(item, Delay):
+                yield item
+            elif item.get('complete'):
+                frame = self.finish_frame
+                if prompt_tokens is not None:
+                    frame += self.usage_frame(prompt_tokens)
+                yield EncodedEvent(frame + DONE_FRAME, item)
+            elif 'thinking' in item:
+                if item['thinking']:
+                    yield EncodedEvent(self.reasoning(item['thinking']), item)
+            else:
+                text = item.get('text', '')
+                if item.get('imageUrl'):
+                    text += f"\n\n![image]({item['imageUrl']})\n\n"
+                yield EncodedEvent(self.content(text), item)
+
+    @property
+    def cancel_frame(self) -> bytes:
+        """Frames ending a cancelled completion"""
+        return self.finish_frame + DONE_FRAME
+
+def new_completion_id() -> str:
+    return f'chatcmpl-{uuid.uuid4().hex}'
+
+def completion_response(request: ChatRequest, events: Iterator[Any]) -> Dict[str, Any]:
+    """
+    Run the pipeline to the end (performing its delays) and build a chat.completion object
+    
+    Args:
+        request: The parsed request
+        events: Generator of data chunks and Delay markers
+    
+    Returns:
+        The chat.completion response body
+    """
+    content, reasoning = [], []
+    for item in iter_events(events):
+        if 'thinking' in item:
+            reasoning.append(item['thinking'])
+        elif 'text' in item:
+            content.append(item['text'])
+            if item.get('imageUrl'):
+                content.append(f"\n\n![image]({item['imageUrl']})\n\n")
+    message = {'role': 'assistant', 'content': ''.join(content)}
+    if reasoning:
+        message['reasoning_content'] = ''.join(reasoning)
+    completion_tokens = count_tokens(message['content']) + count_tokens(message.get('reasoning_content', ''))
+    return {
+        'id': new_completion_id(),
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.model,
+        'choices': [{'index': 0, 'message': message, 'finish_reason': 'stop'}],
+        'usage': {
+            'prompt_tokens': request.prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': request.prompt_tokens + completion_tokens
+        }
+    }
+
+def error_body(message: str, error_type: str = 'invalid_request_error') -> Dict[str, Any]:
+    """Error in the shape OpenAI clients parse"""
+    return {'error': {'message': message, 'type': error_type, 'param': None, 'code': None}}
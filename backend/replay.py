@@ -0,0 +1,228 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from streaming import Delay, EncodedEvent, format_sse_event
+
+class ReplayGap(Exception):
+    """Raised when the events a client missed are no longer buffered"""
+
+class ReplayBuffer:
+    """
+    Bounded ring of encoded frames for one stream, plus the unconsumed remainder
+    of the stream's generator
+
+    When a client disconnects the generator is simply left suspended here; a
+    client that reconnects with Last-Event-ID gets the frames it missed and then
+    continues from the same generator, so nothing is generated twice.
+    """
+
+    __slots__ = ('stream_id', 'registry', 'source', 'frames', 'bytes', 'next_id',
+                 'owner', 'last_access', 'lock')
+
+    def __init__(self, stream_id, registry, source):
+        self.stream_id = stream_id
+        self.registry = registry
+        self.source = source
+        self.frames = deque()  # (event_id, frame) pairs, oldest first
+        self.bytes = 0
+        self.next_id = 1
+        self.owner = None
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self):
+        """True once the generator has been fully consumed"""
+        return self.source is None
+
+    def attach(self, last_event_id=None):
+        """
+        Attach a connection to this stream
+        
+        A newer connection takes over from an older one, which stops at its
+        next event.
+        
+        Args:
+            last_event_id: Id of the last event the client received, or None
+                to receive the stream from the beginning
+            
+        Returns:
+            Generator of EncodedEvents and Delay markers for create_sse_response
+            
+        Raises:
+            ReplayGap: If events after last_event_id have been evicted
+        """
+        after = last_event_id or 0
+        with self.lock:
+            oldest = self.frames[0][0] if self.frames else self.next_id
+            if after + 1 < oldest:
+                raise ReplayGap(f"Events {after + 1}-{oldest - 1} of stream {self.stream_id} are no longer buffered")
+            owner = object()
+            self.owner = owner
+            missed = [frame for event_id, frame in self.frames if event_id > after]
+        self.registry.touch(self)
+        return self._follow(owner, missed)
+
+    def _follow(self, owner, missed):
+        """Replay missed frames, then keep pulling from the live generator"""
+        try:
+            for frame in missed:
+                yield EncodedEvent(frame)
+            while True:
+                with self.lock:
+                    if self.owner is not owner or self.source is None:
+                        return
+                    try:
+                        # Generators never block, so holding the lock here is cheap
+                        item = next(self.source)
+                    except StopIteration:
+                        self.source = None
+                        return
+                    if isinstance(item, Delay):
+                        event = item
+                    else:
+                        frame = format_sse_event(item, self.next_id)
+                        self._append(self.next_id, frame)
+                        self.next_id += 1
+                        event = EncodedEvent(frame, item)
+                self.registry.touch(self)
+                yield event
+        finally:
+            with self.lock:
+                if self.owner is owner:
+                    self.owner = None
+
+    def _append(self, event_id, frame):
+        """Store a frame, dropping the oldest ones beyond the per-stream caps"""
+        self.frames.append((event_id, frame))
+        self.bytes += len(frame)
+        freed = 0
+        while self.frames and (len(self.frames) > self.registry.max_events_per_stream
+                               or self.bytes > self.registry.max_bytes_per_stream):
+            _, dropped = self.frames.popleft()
+            self.bytes -= len(dropped)
+            freed += len(dropped)
+        self.registry.account(len(frame) - freed)
+
+    def close(self):
+        """Drop buffered frames and stop the generator"""
+        with self.lock:
+            source, self.source = self.source, None
+            freed = self.bytes
+            self.frames.clear()
+            self.bytes = 0
+            self.owner = None
+        if source is not None:
+            source.close()
+        self.registry.account(-freed)
+
+class ReplayRegistry:
+    """
+    Replay buffers for in-flight and recently finished streams
+
+    Buffers are kept in least-recently-used order and evicted lazily when they
+    have been idle longer than the TTL, or when the stream count or total
+    buffered bytes exceed their caps.
+    """
+
+    def __init__(self, max_streams=10000, max_events_per_stream=2048,
+                 max_bytes_per_stream=1024 * 1024, max_total_bytes=256 * 1024 * 1024, ttl=300):
+        self.max_streams = max_streams
+        self.max_events_per_stream = max_events_per_stream
+        self.max_bytes_per_stream = max_bytes_per_stream
+        self.max_total_bytes = max_total_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.evictions = 0
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, replay_config):
+        """Build a registry from the backend.streaming.replay configuration"""
+        return cls(
+            max_streams=replay_config.get("maxStreams", 10000),
+            max_events_per_stream=replay_config.get("maxEventsPerStream", 2048),
+            max_bytes_per_stream=replay_config.get("maxBytesPerStream", 1024 * 1024),
+            max_total_bytes=replay_config.get("maxTotalBytes", 256 * 1024 * 1024),
+            ttl=replay_config.get("ttlSeconds", 300)
+        )
+
+    def open(self, source):
+        """
+        Register a new stream
+        
+        Args:
+            source: Response generator yielding data chunks and Delay markers
+            
+        Returns:
+            The stream's ReplayBuffer
+        """
+        stream_id = uuid.uuid4().hex
+        buffer = ReplayBuffer(stream_id, self, source)
+        with self._lock:
+            self._buffers[stream_id] = buffer
+        self.evict()
+        return buffer
+
+    def get(self, stream_id):
+        """Look up a stream's buffer, or None if it is unknown or evicted"""
+        self.evict()
+        with self._lock:
+            return self._buffers.get(stream_id)
+
+    def discard(self, stream_id):
+        """Remove a stream and release its buffer"""
+        with self._lock:
+            buffer = self._buffers.pop(stream_id, None)
+        if buffer is not None:
+            buffer.close()
+        return buffer is not None
+
+    def touch(self, buffer):
+        """Mark a buffer as recently used"""
+        buffer.last_access = time.monotonic()
+        with self._lock:
+            if buffer.stream_id in self._buffers:
+                self._buffers.move_to_end(buffer.stream_id)
+
+    def account(self, delta):
+        """Track the change in total buffered bytes"""
+        with self._lock:
+            self.total_bytes += delta
+
+    def evict(self):
+        """Evict expired buffers, then least recently used ones over the caps"""
+        now = time.monotonic()
+        victims = []
+        with self._lock:
+            excess_streams = len(self._buffers) - self.max_streams
+            projected_bytes = self.total_bytes
+            for stream_id, buffer in self._buffers.items():
+                expired = now - buffer.last_access > self.ttl
+                over_cap = excess_streams > 0 or projected_bytes > self.max_total_bytes
+                if not expired and not over_cap:
+                    break
+                if buffer.owner is not None and not expired:
+                    # Never cut off a connected stream just to make room
+                    continue
+                victims.append(buffer)
+                excess_streams -= 1
+                projected_bytes -= buffer.bytes
+            for buffer in victims:
+                del self._buffers[buffer.stream_id]
+            self.evictions += len(victims)
+        # Close outside the registry lock; buffers account for their own bytes
+        for buffer in victims:
+            buffer.close()
+        return len(victims)
+
+    def stats(self):
+        """Return buffer counts and memory use"""
+        with self._lock:
+            return {
+                "streams": len(self._buffers),
+                "bytes": self.total_bytes,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+def request_key(data: Dict[str, Any]) -> str:
+    """
+    Cache key of a message request
+    
+    Requests that differ only in the order of attached files share a key.
+    The text is used exactly as sent, since the response echoes it and
+    thinking mode depends on it; chart seed and dataset options are part of
+    the key too, the latency profile is not.
+    
+    Args:
+        data: The request's JSON body
+        
+    Returns:
+        Hex digest identifying the request
+    """
+    text = data.get('text', '')
+    files = sorted(str(f.get('id') or f.get('name')) for f in data.get('files', []) if isinstance(f, dict))
+    normalized = [text, files, data.get('seed'), data.get('dataset')]
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+class ResponseCache:
+    """
+    LRU cache of serialized responses bounded by total bytes, with a TTL
+
+    Entries older than ttl seconds are treated as misses and dropped. Bodies
+    larger than max_entry_bytes are not cached at all. With a shared state
+    backend the entries live there instead (so every worker sees them) and
+    the backend does its own eviction; hit counters stay per process.
+    """
+
+    KEY_PREFIX = 'fetch:'
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0, max_entry_bytes: int = 1024 * 1024,
+                 backend=None):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_entry_bytes = max_entry_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires, body), least recently used first
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cache_config: Dict[str, Any], backend=None) -> 'ResponseCache':
+        """Create a cache from the backend.responseCache configuration, optionally on a shared state backend"""
+        return cls(
+            max_bytes=cache_config.get("maxBytes", 64 * 1024 * 1024),
+            ttl=cache_config.get("ttlSeconds", 300),
+            max_entry_bytes=cache_config.get("maxEntryBytes", 1024 * 1024),
+            backend=backend
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached body for key, or None on a miss"""
+        if self.backend is not None:
+            body = self.backend.get(self.KEY_PREFIX + key)
+            with self._lock:
+                if body is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            return body
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, body: bytes):
+        """Store a body, evicting the least recently used entries beyond max_bytes"""
+        if len(body) > self.max_entry_bytes or len(body) > self.max_bytes:
+            return
+        if self.backend is not None:
+            self.backend.set(self.KEY_PREFIX + key, body, self.ttl)
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, body = self._entries.pop(key)
+        self.bytes -= len(body)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+            if self.backend is not None:
+                return dict(counters, backend=self.backend.name)
+            return dict(counters, entries=len(self._entries), bytes=self.bytes,
+                        maxBytes=self.max_bytes, evictions=self.evictions)
@@ -0,0 +1,97 @@
+import json
+from json.encoder import encode_basestring
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # Stdlib fallback below; about twice as slow per event
+    orjson = None
+
+# Compact and UTF-8, so both backends produce the same bytes
+_stdlib_encode = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False).encode
+
+# Encodings of JSON object keys, e.g. 'text' -> b'"text":'
+_keys: Dict[str, bytes] = {}
+
+# Encodings of registered constant values, by id (the value is kept alive alongside)
+_constants: Dict[int, tuple] = {}
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON encoding of a value, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:  # e.g. integers beyond 64 bits or non-string keys
+            pass
+    try:
+        return _stdlib_encode(value).encode('utf-8')
+    except UnicodeEncodeError:  # lone surrogates are only representable escaped
+        return json.dumps(value, separators=(',', ':')).encode('ascii')
+
+def dumps_str(text: str) -> bytes:
+    """JSON string literal of text; the cheapest way to encode the text of one token"""
+    try:
+        return encode_basestring(text).encode('utf-8')
+    except UnicodeEncodeError:
+        return json.dumps(text).encode('ascii')
+
+def constant(value: Any) -> Any:
+    """
+    Register a value that is never mutated, so its encoding is computed once
+    
+    Constant sub-objects (such as the metadata of each thinking step) and whole
+    constant events are then spliced into frames as cached bytes.
+    
+    Returns:
+        The value itself
+    """
+    _constants[id(value)] = (value, dumps(value))
+    return value
+
+def _key(key: str) -> bytes:
+    encoded = _keys.get(key)
+    if encoded is None:
+        encoded = _keys[key] = dumps_str(key) + b':'
+    return encoded
+
+def _write_object(buffer: bytearray, data: Dict[str, Any]):
+    """Append the JSON of a dictionary from cached key and constant encodings"""
+    separator = b'{'
+    for key, value in data.items():
+        buffer += separator
+        buffer += _key(key) if key.__class__ is str else dumps_str(str(key)) + b':'
+        if value.__class__ is str:
+            buffer += dumps_str(value)
+        elif value is None:
+            buffer += b'null'
+        elif value is True:
+            buffer += b'true'
+        elif value is False:
+            buffer += b'false'
+        else:
+            cached = _constants.get(id(value))
+            buffer += cached[1] if cached is not None else dumps(value)
+        separator = b','
+    buffer += b'}' if separator == b',' else b'{}'
+
+def write_event(buffer: bytearray, data: Dict[str, Any], event_id: Optional[int] = None):
+    """
+    Append one data chunk as a Server-Sent Event frame to a buffer
+    
+    Args:
+        buffer: The stream's reusable write buffer
+        data: The chunk to send
+        event_id: Optional SSE event id (for resumable streams)
+    """
+    if event_id is not None:
+        buffer += b'id: %d\n' % event_id
+    buffer += b'data: '
+    cached = _constants.get(id(data))
+    if cached is not None:
+        buffer += cached[1]
+    elif orjson is not None:
+        # One call into orjson beats splicing cached fragments in Python
+        buffer += dumps(data)
+    else:
+        _write_object(buffer, data)
+    buffer += b'\n\n'
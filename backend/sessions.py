@@ -0,0 +1,299 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Approximate fixed cost of one stored message and one session, for the memory cap
+MESSAGE_OVERHEAD = 120
+SESSION_OVERHEAD = 600
+
+class SessionMessage:
+    """One conversation turn"""
+
+    __slots__ = ('role', 'text', 'files', 'timestamp')
+
+    def __init__(self, role, text, files=(), timestamp=None):
+        self.role = role
+        self.text = text
+        self.files = tuple(files)
+        self.timestamp = timestamp if timestamp is not None else time.time()
+
+    @property
+    def size(self):
+        """Approximate memory footprint in bytes"""
+        return MESSAGE_OVERHEAD + len(self.text) + 40 * len(self.files)
+
+    def to_dict(self):
+        return {'role': self.role, 'text': self.text, 'files': list(self.files), 'timestamp': self.timestamp}
+
+class Session:
+    """A client session: a bounded ring of recent messages plus its MCP configuration"""
+
+    __slots__ = ('session_id', 'messages', 'mcp_config', 'bytes', 'created', 'last_access')
+
+    def __init__(self, session_id, max_messages):
+        self.session_id = session_id
+        self.messages = deque(maxlen=max_messages)
+        self.mcp_config = None
+        self.bytes = SESSION_OVERHEAD
+        self.created = time.time()
+        self.last_access = time.monotonic()
+
+    @classmethod
+    def from_dict(cls, data, max_messages):
+        """Rebuild a session saved by SharedSessionStore"""
+        session = cls(data['id'], max_messages)
+        session.created = data['created']
+        session.mcp_config = data.get('mcp')
+        for message in data['messages']:
+            session.messages.append(SessionMessage(message['role'], message['text'], message['files'],
+                                                   message['timestamp']))
+        return session
+
+    def to_dict(self):
+        return {
+            'id': self.session_id,
+            'created': self.created,
+            'messages': [message.to_dict() for message in self.messages]
+        }
+
+class SessionStore:
+    """
+    In-memory sessions with LRU eviction
+
+    Sessions idle for ttl seconds are dropped, and the least recently used
+    sessions are dropped whenever max_sessions or max_bytes (an estimate of
+    the memory held by stored messages) is exceeded. Each session keeps only
+    its last max_messages messages.
+    """
+
+    def __init__(self, max_sessions=100000, max_messages=100, max_bytes=256 * 1024 * 1024, ttl=3600):
+        self.max_sessions = max_sessions
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sessions = OrderedDict()  # session id -> Session, least recently used first
+        self.bytes = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, sessions_config):
+        """Create a store from the backend.sessions configuration"""
+        return cls(
+            max_sessions=sessions_config.get("maxSessions", 100000),
+            max_messages=sessions_config.get("maxMessagesPerSession", 100),
+            max_bytes=sessions_config.get("maxBytes", 256 * 1024 * 1024),
+            ttl=sessions_config.get("ttlSeconds", 3600)
+        )
+
+    def get(self, session_id):
+        """Look up a live session, marking it recently used"""
+        if not session_id:
+            return None
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            if time.monotonic() - session.last_access > self.ttl:
+                self._drop(session_id)
+                return None
+            session.last_access = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            return session
+
+    def get_or_create(self, session_id):
+        """
+        Look up a session, starting a new one if it is unknown or expired
+        
+        Args:
+            session_id: Id from the client's session cookie, or None
+            
+        Returns:
+            Tuple of (Session, whether it was created)
+        """
+        session = self.get(session_id)
+        if session is not None:
+            return session, False
+        session = Session(secrets.token_urlsafe(24), self.max_messages)
+        with self.lock:
+            self.sessions[session.session_id] = session
+            self.bytes += session.bytes
+            self._evict()
+        return session, True
+
+    def append(self, session, role, text, files=()):
+        """Add a message to a session's ring, evicting other sessions if over the memory cap"""
+        message = SessionMessage(role, text, files)
+        with self.lock:
+            delta = message.size
+            if len(session.messages) == session.messages.maxlen:
+                delta -= session.messages[0].size
+            session.messages.append(message)
+            session.bytes += delta
+            if session.session_id in self.sessions:
+                self.bytes += delta
+                self._evict()
+
+    def set_mcp_config(self, session, config):
+        """Replace a session's MCP configuration"""
+        with self.lock:
+            session.mcp_config = config
+
+    def _drop(self, session_id):
+        session = self.sessions.pop(session_id)
+        self.bytes -= session.bytes
+        self.evictions += 1
+
+    def _evict(self):
+        now = time.monotonic()
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if (len(self.sessions) > self.max_sessions or self.bytes > self.max_bytes
+                    or now - session.last_access > self.ttl):
+                self._drop(session_id)
+            else:
+                break
+
+    def stats(self):
+        """Session counts and memory estimate"""
+        with self.lock:
+            return {
+                'sessions': len(self.sessions),
+                'bytes': self.bytes,
+                'evictions': self.evictions
+            }
+
+class SharedSessionStore:
+    """
+    Sessions kept in a shared state backend, so any worker can serve any session
+
+    Each session is one JSON value under session:<id>, rewritten (renewing
+    its ttl) whenever it is read or changed. Eviction is up to the backend;
+    if a session is larger than the backend's max_value_bytes, the oldest
+    messages are dropped until it fits. A save that fails otherwise (the
+    backend is unreachable) leaves the session as it was. Two workers
+    changing the same session at once: the last write wins.
+    """
+
+    KEY_PREFIX = 'session:'
+
+    def __init__(self, backend, max_messages=100, ttl=3600):
+        self.backend = backend
+        self.max_messages = max_messages
+        self.ttl = ttl
+        self.writes = 0
+        self.truncations = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, sessions_config, backend):
+        """Create a store from the backend.sessions configuration"""
+        return cls(
+            backend,
+            max_messages=sessions_config.get("maxMessagesPerSession", 100),
+            ttl=sessions_config.get("ttlSeconds", 3600)
+        )
+
+    def _save(self, session):
+        capacity = self.backend.max_value_bytes
+        while True:
+            data = {
+                'id': session.session_id,
+                'created': session.created,
+                'mcp': session.mcp_config,
+                'messages': [message.to_dict() for message in session.messages]
+            }
+            value = json.dumps(data, separators=(',', ':')).encode()
+            if capacity is None or len(value) <= capacity or not session.messages:
+                break
+            for _ in range(max(len(session.messages) // 2, 1)):
+                session.messages.popleft()
+            with self.lock:
+                self.truncations += 1
+        saved = self.backend.set(self.KEY_PREFIX + session.session_id, value, self.ttl)
+        with self.lock:
+            if saved:
+                self.writes += 1
+            else:
+                self.errors += 1
+
+    def get(self, session_id):
+        """Load a live session, renewing its ttl"""
+        if not session_id:
+            return None
+        value = self.backend.get(self.KEY_PREFIX + session_id)
+        if value is None:
+            return None
+        try:
+            session = Session.from_dict(json.loads(value), self.max_messages)
+        except (ValueError, KeyError, TypeError):
+            return None
+        self._save(session)
+        return session
+
+    def get_or_create(self, session_id):
+        """
+        Look up a session, starting a new one if it is unknown or expired
+        
+        Args:
+            session_id: Id from the client's session cookie, or None
+            
+        Returns:
+            Tuple of (Session, whether it was created)
+        """
+        session = self.get(session_id)
+        if session is not None:
+            return session, False
+        session = Session(secrets.token_urlsafe(24), self.max_messages)
+        self._save(session)
+        return session, True
+
+    def append(self, session, role, text, files=()):
+        """Add a message to a session's ring and save it"""
+        session.messages.append(SessionMessage(role, text, files))
+        self._save(session)
+
+    def set_mcp_config(self, session, config):
+        """Replace a session's MCP configuration"""
+        session.mcp_config = config
+        self._save(session)
+
+    def stats(self):
+        """Write counters of this process"""
+        with self.lock:
+            return {
+                'backend': self.backend.name,
+                'writes': self.writes,
+                'truncations': self.truncations,
+                'errors': self.errors
+            }
+
+def create_session_store(sessions_config, backend=None):
+    """Use the shared state backend when there is one, otherwise keep sessions in process"""
+    if backend is not None:
+        return SharedSessionStore.from_config(sessions_config, backend)
+    return SessionStore.from_config(sessions_config)
+
+def record_reply(events, store, session):
+    """
+    Pass a message stream through, storing the assistant's text in the session when it completes
+    
+    Args:
+        events: Generator from stream_response_generator
+        store: SessionStore holding the session
+        session: Session to record the reply in
+        
+    Returns:
+        Generator yielding the same items as events
+    """
+    parts = []
+    for item in events:
+        if isinstance(item, dict):
+            if 'text' in item:
+                parts.append(item['text'])
+            if item.get('complete'):
+                store.append(session, 'assistant', ''.join(parts))
+        yield item
@@ -0,0 +1,401 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class StateBackend:
+    """
+    Key-value store for state that should outlive a request
+
+    Keys are strings and values bytes. Values set with a ttl (seconds) expire.
+    Backends may evict entries to stay within their capacity, so callers must
+    treat every get as possibly missing.
+    """
+
+    name = 'none'
+    shared = False
+
+    # Largest value set can store; a set of a smaller value that fails is an error, not a size problem
+    max_value_bytes: Optional[int] = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value for key, or None if it is missing or expired"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Store a value; returns False if the backend cannot hold it"""
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        """Remove a key if present"""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend-specific size counters"""
+        return {}
+
+class LocalBackend(StateBackend):
+    """In-process LRU dictionary bounded by total value bytes"""
+
+    name = 'local'
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_value_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires or None, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        if len(value) > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def keys(self):
+        """Snapshot of the stored keys (including expired ones not yet dropped)"""
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _remove(self, key):
+        _, value = self._entries.pop(key)
+        self.bytes -= len(value)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': self.name, 'entries': len(self._entries), 'bytes': self.bytes,
+                    'maxBytes': self.max_bytes, 'evictions': self.evictions}
+
+class SharedMemoryBackend(StateBackend):
+    """
+    Fixed-size hash table in a memory-mapped file shared by worker processes
+
+    Every worker maps the same file (under /dev/shm by default, so it never
+    touches disk), so a value set by one worker is visible to all of them.
+    The table has `slots` slots of `slot_size` bytes; a key may live in any
+    of the `probe` slots after its home slot, and when they are all taken
+    the one closest to expiry is overwritten. Values that do not fit in a
+    slot are refused.
+
+    Operations take a POSIX record lock on the file (per process, so it also
+    works after fork) plus a thread lock within the process.
+    """
+
+    name = 'shm'
+    shared = True
+    MAGIC = b'CUS1'
+    HEADER = struct.Struct('<4sIII')  # magic, slots, slot size, used slots
+    SLOT = struct.Struct('<BdHI')  # used, expires (0 = never), key length, value length
+    MAX_KEY = 200
+    probe = 8
+
+    def __init__(self, path: str, slots: int = 16384, slot_size: int = 4096):
+        if slot_size <= self.SLOT.size + self.MAX_KEY:
+            raise ValueError(f"slotSize must be larger than {self.SLOT.size + self.MAX_KEY}")
+        self.path = path
+        self.slots = slots
+        self.slot_size = slot_size
+        self.value_capacity = slot_size - self.SLOT.size - self.MAX_KEY
+        self.max_value_bytes = self.value_capacity
+        self._lock = threading.Lock()
+        size = self.HEADER.size + slots * slot_size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._acquire()
+        try:
+            header = os.pread(self.fd, self.HEADER.size, 0)
+            if len(header) < self.HEADER.size or self.HEADER.unpack(header)[:3] != (self.MAGIC, slots, slot_size):
+                # New file, or one laid out for different settings: start empty
+                os.ftruncate(self.fd, 0)
+                os.ftruncate(self.fd, size)
+                os.pwrite(self.fd, self.HEADER.pack(self.MAGIC, slots, slot_size, 0), 0)
+            self.map = mmap.mmap(self.fd, size)
+        finally:
+            self._release()
+
+    @classmethod
+    def from_config(cls, shm_config: Dict[str, Any]) -> 'SharedMemoryBackend':
+        """Create a backend from the backend.state.shm configuration"""
+        folder = '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp'
+        return cls(
+            shm_config.get("path") or os.path.join(folder, 'chat-ui-state'),
+            slots=shm_config.get("slots", 16384),
+            slot_size=shm_config.get("slotSize", 4096)
+        )
+
+    def _acquire(self):
+        self._lock.acquire()
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, 0)
+
+    def _release(self):
+        fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, 0)
+        self._lock.release()
+
+    def _home(self, key_bytes):
+        digest = hashlib.blake2b(key_bytes, digest_size=8).digest()
+        return int.from_bytes(digest, 'little') % self.slots
+
+    def _offset(self, index):
+        return self.HEADER.size + index * self.slot_size
+
+    def _find(self, key_bytes, now):
+        """Slot index holding key, and the best slot to write it to otherwise"""
+        home = self._home(key_bytes)
+        found, free, victim, victim_expires = None, None, None, None
+        for step in range(self.probe):
+            index = (home + step) % self.slots
+            offset = self._offset(index)
+            used, expires, key_length, _ = self.SLOT.unpack_from(self.map, offset)
+            live = used and not (expires and expires < now)
+            if not live:
+                if free is None:
+                    free = index
+                continue
+            start = offset + self.SLOT.size
+            if key_length == len(key_bytes) and self.map[start:start + key_length] == key_bytes:
+                found = index
+                break
+            rank = expires or float('inf')
+            if victim is None or rank < victim_expires:
+                victim, victim_expires = index, rank
+        return found, free if free is not None else victim
+
+    def _adjust_used(self, delta):
+        magic, slots, slot_size, used = self.HEADER.unpack_from(self.map, 0)
+        self.HEADER.pack_into(self.map, 0, magic, slots, slot_size, used + delta)
+
+    def get(self, key):
+        key_bytes = key.encode()
+        now = time.time()
+        self._acquire()
+        try:
+            index, _ = self._find(key_bytes, now)
+            if index is None:
+                return None
+            offset = self._offset(index)
+            _, _, key_length, value_length = self.SLOT.unpack_from(self.map, offset)
+            start = offset + self.SLOT.size + self.MAX_KEY
+            return self.map[start:start + value_length]
+        finally:
+            self._release()
+
+    def set(self, key, value, ttl=None):
+        key_bytes = key.encode()
+        if len(key_bytes) > self.MAX_KEY or len(value) > self.value_capacity:
+            return False
+        now = time.time()
+        self._acquire()
+        try:
+            index, target = self._find(key_bytes, now)
+            if index is None:
+                index = target
+                used = self.SLOT.unpack_from(self.map, self._offset(index))[0]
+                if not used:
+                    self._adjust_used(1)
+            offset = self._offset(index)
+            self.SLOT.pack_into(self.map, offset, 1, now + ttl if ttl is not None else 0.0,
+                                len(key_bytes), len(value))
+            start = offset + self.SLOT.size
+            self.map[start:start + len(key_bytes)] = key_bytes
+            start += self.MAX_KEY
+            self.map[start:start + len(value)] = value
+        finally:
+            self._release()
+        return True
+
+    def delete(self, key):
+        key_bytes = key.encode()
+        self._acquire()
+        try:
+            index, _ = self._find(key_bytes, time.time())
+            if index is not None:
+                self.SLOT.pack_into(self.map, self._offset(index), 0, 0.0, 0, 0)
+                self._adjust_used(-1)
+        finally:
+            self._release()
+
+    def stats(self):
+        used = self.HEADER.unpack_from(self.map, 0)[3]
+        return {'backend': self.name, 'usedSlots': used, 'slots': self.slots, 'slotSize': self.slot_size}
+
+class RespError(Exception):
+    """Error reply from a Redis-compatible server"""
+
+class RedisBackend(StateBackend):
+    """
+    Client for a Redis-compatible server (Redis itself, or state_server.py)
+
+    Speaks the RESP protocol directly over a small pool of connections, so no
+    client library is needed.
+    """
+
+    name = 'redis'
+    shared = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 6379, timeout: float = 1.0, pool_size: int = 16,
+                 max_value_bytes: int = 512 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_value_bytes = max_value_bytes  # Redis refuses larger strings (proto-max-bulk-len)
+        self.errors = 0
+        self._pool = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, redis_config: Dict[str, Any]) -> 'RedisBackend':
+        """Create a client from the backend.state.redis configuration"""
+        return cls(
+            redis_config.get("host", "127.0.0.1"),
+            redis_config.get("port", 6379),
+            timeout=redis_config.get("timeoutSeconds", 1.0),
+            pool_size=redis_config.get("poolSize", 16),
+            max_value_bytes=redis_config.get("maxValueBytes", 512 * 1024 * 1024)
+        )
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile('rb')
+
+    def command(self, *args):
+        """Send one command and return its reply"""
+        with self._lock:
+            connection = self._pool.pop() if self._pool else None
+        if connection is None:
+            connection = self._connect()
+        sock, reader = connection
+        error = None
+        try:
+            sock.sendall(encode_command(args))
+            reply = read_reply(reader)
+        except (OSError, ValueError):
+            sock.close()
+            raise
+        except RespError as e:
+            error = e  # the whole error reply was read, so the connection can be reused
+        with self._lock:
+            if len(self._pool) < self.pool_size:
+                self._pool.append(connection)
+                connection = None
+        if connection is not None:
+            sock.close()
+        if error is not None:
+            raise error
+        return reply
+
+    # An unreachable server degrades to cache misses rather than failing requests
+    def get(self, key):
+        try:
+            return self.command('GET', key)
+        except (OSError, ValueError, RespError):
+            self.errors += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        args = ('SET', key, value, 'PX', max(int(ttl * 1000), 1)) if ttl is not None else ('SET', key, value)
+        try:
+            return self.command(*args) == b'OK'
+        except (OSError, ValueError, RespError):
+            self.errors += 1
+            return False
+
+    def delete(self, key):
+        try:
+            self.command('DEL', key)
+        except (OSError, ValueError, RespError):
+            self.errors += 1
+
+    def stats(self):
+        try:
+            keys = self.command('DBSIZE')
+        except (OSError, ValueError, RespError):
+            keys = None
+        return {'backend': self.name, 'keys': keys, 'errors': self.errors}
+
+def encode_command(args) -> bytes:
+    """Encode a command as a RESP array of bulk strings"""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+def read_reply(reader):
+    """Read one RESP reply: bytes for strings, int, list, or None"""
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ValueError('Connection closed')
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload
+    if kind == b'-':
+        raise RespError(payload.decode())
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        return data[:-2]
+    if kind == b'*':
+        count = int(payload)
+        return None if count < 0 else [read_reply(reader) for _ in range(count)]
+    raise ValueError(f'Unexpected reply {line!r}')
+
+def create_backend(state_config: Dict[str, Any]) -> Optional[StateBackend]:
+    """
+    Create the shared state backend named by backend.state.backend
+    
+    Returns:
+        A shared backend, or None for "local" (each consumer then keeps its
+        own in-process state)
+        
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    name = state_config.get("backend", "local")
+    if name == "local":
+        return None
+    if name == "shm":
+        return SharedMemoryBackend.from_config(state_config.get("shm", {}))
+    if name == "redis":
+        return RedisBackend.from_config(state_config.get("redis", {}))
+    raise ValueError(f"Unknown state backend '{name}' (expected local, shm or redis)")
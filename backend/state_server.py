@@ -0,0 +1,111 @@
+"""
+Minimal Redis-compatible server for local development
+
+Stands in for Redis when running several workers with the "redis" state
+backend, so nothing else has to be installed. It keeps keys in memory and
+supports the commands the backend uses (GET, SET with EX/PX, DEL) plus a few
+for inspection (PING, ECHO, EXISTS, DBSIZE, FLUSHALL, FLUSHDB, QUIT).
+
+Usage:
+    python state_server.py --port 6379 --max-bytes 268435456
+"""
+
+import argparse
+import socketserver
+
+from state import LocalBackend, encode_command
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Serve RESP commands on one client connection until it closes"""
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            try:
+                args = read_command(self.rfile)
+            except ValueError as e:
+                self.wfile.write(b'-ERR %s\r\n' % str(e).encode())
+                return
+            if args is None:
+                return
+            name = args[0].upper()
+            if name == b'QUIT':
+                self.wfile.write(b'+OK\r\n')
+                return
+            self.wfile.write(execute(store, name, args[1:]))
+
+def read_command(reader):
+    """Read a RESP array of bulk strings (or an inline command); None at end of stream"""
+    line = reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b'*'):
+        return line.split() or [b'PING']
+    args = []
+    for _ in range(int(line[1:])):
+        header = reader.readline()
+        if not header.startswith(b'$'):
+            raise ValueError('Protocol error: expected bulk string')
+        args.append(reader.read(int(header[1:]) + 2)[:-2])
+    return args
+
+def execute(store, name, args):
+    """Run one command against the store and return the encoded reply"""
+    if name == b'PING':
+        return b'$%d\r\n%s\r\n' % (len(args[0]), args[0]) if args else b'+PONG\r\n'
+    if name == b'ECHO' and len(args) == 1:
+        return b'$%d\r\n%s\r\n' % (len(args[0]), args[0])
+    if name == b'GET' and len(args) == 1:
+        value = store.get(args[0].decode())
+        return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+    if name == b'SET' and len(args) in (2, 4):
+        ttl = None
+        if len(args) == 4:
+            unit = args[2].upper()
+            if unit not in (b'EX', b'PX'):
+                return b'-ERR syntax error\r\n'
+            ttl = int(args[3]) / (1 if unit == b'EX' else 1000)
+        if not store.set(args[0].decode(), args[1], ttl):
+            return b'-OOM value larger than maxmemory\r\n'
+        return b'+OK\r\n'
+    if name in (b'DEL', b'EXISTS') and args:
+        count = 0
+        for key in args:
+            if store.get(key.decode()) is not None:
+                count += 1
+                if name == b'DEL':
+                    store.delete(key.decode())
+        return b':%d\r\n' % count
+    if name == b'DBSIZE':
+        return b':%d\r\n' % len(store.keys())
+    if name in (b'FLUSHALL', b'FLUSHDB'):
+        store.clear()
+        return b'+OK\r\n'
+    if name == b'COMMAND':
+        return encode_command([])
+    return b"-ERR unknown command or wrong number of arguments for '%s'\r\n" % name.lower()
+
+class StateServer(socketserver.ThreadingTCPServer):
+    """Threaded RESP server over an in-memory LRU store"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, max_bytes=256 * 1024 * 1024):
+        self.store = LocalBackend(max_bytes)
+        super().__init__(address, RespHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--max-bytes', type=int, default=256 * 1024 * 1024,
+                        help='Memory cap; least recently used keys are evicted beyond it')
+    args = parser.parse_args()
+
+    with StateServer((args.host, args.port), args.max_bytes) as server:
+        print(f"Serving on {server.server_address[0]}:{server.server_address[1]}", flush=True)
+        server.serve_forever()
+
+if __name__ == '__main__':
+    main()
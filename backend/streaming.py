@@ -1,23 +1,407 @@
-import json
+import threading
 import time
 from flask import Response
+from latency import LatencyProfile, DEFAULT_PROFILE
+from serialization import constant, write_event
+import metrics
 
-def create_sse_response(data_generator):
+class Delay:
+    """
+    Marker yielded by response generators to request a pause before the next event
+
+    Generators never sleep themselves; the consumer driving them decides how to
+    wait. Under cooperative workers (gevent) the wait yields to other streams
+    instead of holding the worker.
+    """
+
+    __slots__ = ('seconds',)
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __repr__(self):
+        return f"Delay({self.seconds!r})"
+
+# Set when the worker is shutting down: streams stop waiting between events so
+# they finish within the server's graceful timeout instead of being cut off
+draining = threading.Event()
+
+def begin_drain():
+    """Make in-flight streams skip their remaining delays"""
+    draining.set()
+
+def iter_events(data_generator):
+    """
+    Drive a response generator, performing its requested delays
+    
+    Args:
+        data_generator: Generator that yields data chunks and Delay markers
+        
+    Returns:
+        Generator that yields only the data chunks
+    """
+    for item in data_generator:
+        if isinstance(item, Delay):
+            if item.seconds > 0 and not draining.is_set():
+                # Looked up at call time so gevent's monkey-patched sleep is used
+                time.sleep(item.seconds)
+            continue
+        yield item
+
+class FlushPolicy:
+    """
+    When the SSE writer hands buffered frames to the server
+
+    Every flush is one write to the socket, so batching several small events
+    into one flush trades a bounded amount of latency for fewer syscalls and
+    TCP segments per stream.
+    """
+
+    __slots__ = ('max_bytes', 'max_latency', 'flush_on_thinking_end', 'flush_on_complete')
+
+    def __init__(self, max_bytes=0, max_latency=0.0, flush_on_thinking_end=True, flush_on_complete=True):
+        """
+        Args:
+            max_bytes: Flush once this many bytes are buffered (0 flushes every event)
+            max_latency: Longest time in seconds a buffered frame may wait
+            flush_on_thinking_end: Flush when the stream moves from thinking to text
+            flush_on_complete: Flush as soon as the completion event is buffered
+        """
+        self.max_bytes = max_bytes
+        self.max_latency = max_latency
+        self.flush_on_thinking_end = flush_on_thinking_end
+        self.flush_on_complete = flush_on_complete
+
+    @classmethod
+    def from_config(cls, coalesce_config):
+        """Build a policy from the backend.streaming.coalesce configuration"""
+        return cls(
+            max_bytes=coalesce_config.get("maxBytes", 0),
+            max_latency=coalesce_config.get("maxLatencyMs", 0) / 1000.0,
+            flush_on_thinking_end=coalesce_config.get("flushOnThinkingEnd", True),
+            flush_on_complete=coalesce_config.get("flushOnComplete", True)
+        )
+
+# Flush every event as soon as it is produced
+IMMEDIATE_FLUSH = FlushPolicy()
+
+class StreamStats:
+    """Aggregate counters for SSE streams served by this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.active = 0
+        self.events = 0
+        self.writes = 0
+        self.bytes = 0
+        self.cancelled = 0
+        self.disconnected = 0
+        self.reaped_seconds = 0.0
+
+    def opened(self):
+        """Count a stream that has started writing"""
+        with self._lock:
+            self.active += 1
+
+    def record(self, events, writes, sent_bytes):
+        """Add the totals of one finished stream"""
+        with self._lock:
+            self.active -= 1
+            self.streams += 1
+            self.events += events
+            self.writes += writes
+            self.bytes += sent_bytes
+
+    def reaped(self, reason, seconds):
+        """Count a stream cut short by a cancel or a disconnect, and the waiting it skipped"""
+        with self._lock:
+            if reason == 'cancelled':
+                self.cancelled += 1
+            else:
+                self.disconnected += 1
+            self.reaped_seconds += seconds
+        metrics.sse_reaped.inc(1, reason)
+        metrics.sse_reaped_seconds.inc(seconds, reason)
+
+    def snapshot(self):
+        """Return totals plus per-stream averages"""
+        with self._lock:
+            streams = self.streams or 1
+            return {
+                "streams": self.streams,
+                "active": self.active,
+                "events": self.events,
+                "writes": self.writes,
+                "bytes": self.bytes,
+                "writesPerStream": self.writes / streams,
+                "bytesPerStream": self.bytes / streams,
+                "eventsPerWrite": self.events / (self.writes or 1),
+                "cancelled": self.cancelled,
+                "disconnected": self.disconnected,
+                "reapedSeconds": self.reaped_seconds
+            }
+
+stream_stats = StreamStats()
+metrics.sse_active.function = lambda: stream_stats.active
+
+class StreamControl:
+    """
+    Cancellation handle of one open stream
+
+    The writer waits out delays on the handle, so a cancel wakes it at once.
+    `remote` is an optional callable taking the stream id, polled between
+    waits, for cancels that arrive at another worker process.
+    """
+
+    __slots__ = ('stream_id', 'streams', 'cancelled', 'remote')
+
+    def __init__(self, stream_id, streams, remote=None):
+        self.stream_id = stream_id
+        self.streams = streams
+        self.cancelled = threading.Event()
+        self.remote = remote
+
+    def wait(self, seconds):
+        """Sleep up to seconds; returns True if the stream was cancelled"""
+        if self.cancelled.wait(seconds):
+            return True
+        if self.remote is not None and self.remote(self.stream_id):
+            self.cancelled.set()
+            return True
+        return False
+
+    def close(self):
+        """Unregister once the stream has ended"""
+        self.streams.release(self)
+
+class ActiveStreams:
+    """Controls of the streams open in this process, by stream id"""
+
+    def __init__(self):
+        self._controls = {}  # stream id -> set of StreamControls (a resumed stream may briefly have two)
+        self._lock = threading.Lock()
+
+    def open(self, stream_id, remote=None):
+        """Register a stream and return its StreamControl"""
+        control = StreamControl(stream_id, self, remote)
+        with self._lock:
+            self._controls.setdefault(stream_id, set()).add(control)
+        return control
+
+    def cancel(self, stream_id):
+        """Cancel every connection of a stream; returns False if none is open here"""
+        with self._lock:
+            controls = list(self._controls.get(stream_id, ()))
+        for control in controls:
+            control.cancelled.set()
+        return bool(controls)
+
+    def release(self, control):
+        with self._lock:
+            controls = self._controls.get(control.stream_id)
+            if controls is not None:
+                controls.discard(control)
+                if not controls:
+                    del self._controls[control.stream_id]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._controls)
+
+active_streams = ActiveStreams()
+
+# SSE comment frame sent while a stream is idle; clients ignore it, and a failed
+# write tells the server the client has gone
+HEARTBEAT_FRAME = b': heartbeat\n\n'
+
+class EncodedEvent:
+    """
+    An event whose SSE frame has already been encoded
+
+    Used for frames stored in a replay buffer. `data` is the original chunk when
+    it is still at hand and None for frames replayed from storage.
+    """
+
+    __slots__ = ('frame', 'data')
+
+    def __init__(self, frame, data=None):
+        self.frame = frame
+        self.data = data
+
+def format_sse_event(data, event_id=None):
+    """Format one data chunk as a Server-Sent Event frame"""
+    frame = bytearray()
+    write_event(frame, data, event_id)
+    return bytes(frame)
+
+# Last event of a cancelled stream
+CANCELLED_FRAME = format_sse_event({'cancelled': True, 'complete': True})
+
+def write_sse_frames(data_generator, policy=IMMEDIATE_FLUSH, stats=stream_stats, started=None, control=None,
+                     heartbeat=0.0, cancel_frame=None):
+    """
+    Drive a response generator and coalesce its events into batched writes
+    
+    Delays requested by the generator are performed here. Because the writer
+    knows how long it is about to wait, buffered frames are flushed before any
+    delay that would push them past the policy's latency budget.
+    
+    A stream that is cancelled ends with a {"cancelled": true, "complete": true}
+    event. One whose client disconnects is closed by the server at its next
+    write, and heartbeat comments make sure such a write happens during long
+    delays. Either way the generator is closed at once, and the delay left
+    unslept is recorded as worker time saved.
+    
+    Args:
+        data_generator: Generator that yields data chunks, EncodedEvents and Delay markers
+        policy: FlushPolicy deciding when buffered frames are written
+        stats: StreamStats receiving the stream's totals when it ends
+        started: perf_counter() at the start of the request, for the latency metrics
+        control: StreamControl that can cancel the stream, or None
+        heartbeat: Send a comment frame after this many idle seconds (0 disables)
+        cancel_frame: Frame ending a cancelled stream, for protocols with their
+            own completion event (defaults to the cancelled event above)
+        
+    Returns:
+        Generator that yields encoded SSE payloads, one per write
+    """
+    buffer = bytearray()  # frames are encoded straight into it
+    buffered_since = 0.0
+    in_thinking = False
+    events = writes = sent_bytes = 0
+    if started is None:
+        started = time.perf_counter()
+    last_event = None
+    first_sent = False
+    last_write = time.perf_counter()
+    pending = 0.0  # unslept part of the delay in progress
+    cancelled = False
+
+    def take():
+        """Empty the buffer into one payload"""
+        nonlocal writes, sent_bytes, first_sent, last_write
+        payload = bytes(buffer)
+        buffer.clear()
+        last_write = time.perf_counter()
+        if not first_sent:
+            first_sent = True
+            metrics.sse_first_event.observe(last_write - started)
+        writes += 1
+        sent_bytes += len(payload)
+        return payload
+
+    stats.opened()
+    try:
+        for item in data_generator:
+            if isinstance(item, Delay):
+                if item.seconds <= 0 or draining.is_set():
+                    continue
+                if buffer and time.perf_counter() - buffered_since + item.seconds > policy.max_latency:
+                    yield take()
+                pending = item.seconds
+                while pending > 0:
+                    step = pending
+                    if heartbeat:
+                        step = min(step, max(last_write + heartbeat - time.perf_counter(), 0.0))
+                    if control is not None:
+                        waited_from = time.perf_counter()
+                        cancelled = control.wait(step)
+                        if cancelled:
+                            pending = max(pending - (time.perf_counter() - waited_from), 0.0)
+                            break
+                    else:
+                        # Looked up at call time so gevent's monkey-patched sleep is used
+                        time.sleep(step)
+                    pending -= step
+                    if pending > 0 and heartbeat and time.perf_counter() - last_write >= heartbeat:
+                        if buffer:
+                            yield take()
+                        last_write = time.perf_counter()
+                        writes += 1
+                        sent_bytes += len(HEARTBEAT_FRAME)
+                        yield HEARTBEAT_FRAME
+                if cancelled:
+                    break
+                pending = 0.0
+                continue
+
+            if control is not None and control.cancelled.is_set():
+                cancelled = True
+                break
+
+            frame = None
+            if isinstance(item, EncodedEvent):
+                frame, item = item.frame, item.data or {}
+
+            is_thinking = 'thinking' in item
+            if buffer and in_thinking and not is_thinking and policy.flush_on_thinking_end:
+                yield take()
+            in_thinking = is_thinking
+
+            now = time.perf_counter()
+            if last_event is not None:
+                metrics.sse_gap.observe(now - last_event)
+            last_event = now
+            if not buffer:
+                buffered_since = now
+            if frame is None:
+                write_event(buffer, item)
+            else:
+                buffer += frame
+            events += 1
+
+            if (len(buffer) >= policy.max_bytes
+                    or (policy.flush_on_complete and item.get('complete'))
+                    or time.perf_counter() - buffered_since >= policy.max_latency):
+                yield take()
+
+        if control is not None and control.cancelled.is_set() and not cancelled:
+            # Cancelled while suspended at a write, and the source was closed under us
+            cancelled = True
+        if cancelled:
+            stats.reaped('cancelled', pending)
+            buffer += cancel_frame or CANCELLED_FRAME
+            events += 1
+        if buffer:
+            yield take()
+    except GeneratorExit:
+        # The server closes the response when a write fails: the client has gone
+        stats.reaped('disconnected', pending)
+        raise
+    finally:
+        close = getattr(data_generator, 'close', None)
+        if close is not None:
+            close()
+        if control is not None:
+            control.close()
+        stats.record(events, writes, sent_bytes)
+        metrics.sse_duration.observe(time.perf_counter() - started)
+        metrics.sse_stream_bytes.observe(sent_bytes)
+        metrics.sse_bytes.inc(sent_bytes)
+        metrics.sse_events.inc(events)
+
+def create_sse_response(data_generator, policy=IMMEDIATE_FLUSH, started=None, control=None, heartbeat=0.0,
+                        cancel_frame=None):
     """
     Create a Server-Sent Events (SSE) response from a data generator
     
     Args:
-        data_generator: Generator function that yields data chunks
+        data_generator: Generator function that yields data chunks, EncodedEvents and Delay markers
+        policy: FlushPolicy controlling how events are batched into writes
+        started: perf_counter() when the request arrived (defaults to now)
+        control: StreamControl that can cancel the stream, or None
+        heartbeat: Idle seconds between heartbeat comments (0 disables them)
+        cancel_frame: Frame ending a cancelled stream (see write_sse_frames)
         
     Returns:
         Flask Response object configured for SSE
     """
-    def stream():
-        for data in data_generator:
-            # Format the data as a Server-Sent Event
-            yield f"data: {json.dumps(data)}\n\n"
-            
-    return Response(stream(), mimetype="text/event-stream")
+    if started is None:
+        started = time.perf_counter()
+    frames = write_sse_frames(data_generator, policy, started=started, control=control, heartbeat=heartbeat,
+                              cancel_frame=cancel_frame)
+    return Response(frames, mimetype="text/event-stream")
 
 def chunk_text(text, chunk_size=3):
     """
@@ -36,9 +420,32 @@ def chunk_text(text, chunk_size=3):
         chunk = words[i:i+chunk_size]
         # Add a space after each chunk except for the last one
         yield ' '.join(chunk) + (' ' if i + chunk_size < len(words) else '')
-        time.sleep(0.1)  # Simulate network delay
 
-def stream_response_generator(text, uploaded_files, image_url=None, chart_response=None):
+# Constant parts of generated events, encoded once (see serialization.constant).
+# They are shared by every stream and must not be modified.
+THINKING_STEP_METADATA = {}
+THINKING_COMPLETE_EVENT = constant({
+    "thinking": "",
+    "thinkingComplete": True,
+    "thinkingMetadata": {
+        "backend": "python",
+        "format": "streaming"
+    }
+})
+COMPLETE_EVENT = constant({"complete": True})
+
+def thinking_step_metadata(step):
+    """The (shared, constant) thinkingMetadata of a thinking step"""
+    metadata = THINKING_STEP_METADATA.get(step)
+    if metadata is None:
+        metadata = THINKING_STEP_METADATA[step] = constant({
+            "backend": "python",
+            "format": "streaming",
+            "step": step
+        })
+    return metadata
+
+def stream_response_generator(text, uploaded_files, image_url=None, chart_response=None, latency=None, chart_stream=None):
     """
     Generator function that yields response chunks
     
@@ -47,10 +454,23 @@ def stream_response_generator(text, uploaded_files, image_url=None, chart_respon
         uploaded_files: List of uploaded file metadata
         image_url: Optional image URL to include in the response
         chart_response: Optional chart response text
+        latency: Optional LatencyProfile timing the events (defaults to the
+            original mock backend timings)
+        chart_stream: Optional iterable of chart markdown pieces (see
+            ChartGenerator.stream_markdown); each piece is sent as its own
+            text event so table rows are streamed whole as they are produced
         
     Returns:
-        Generator that yields response chunks
+        Generator that yields response chunks and Delay markers
     """
+    if latency is None:
+        latency = LatencyProfile(DEFAULT_PROFILE)
+
+    # Wait before the first event (after headers are sent) to test pause functionality
+    delay = latency.first_token()
+    if delay:
+        yield Delay(delay)
+
     # Check if thinking mode should be enabled
     enable_thinking = '/think' in text
     
@@ -68,38 +488,37 @@ def stream_response_generator(text, uploaded_files, image_url=None, chart_respon
 
         # Stream thinking content
         for i, thinking_step in enumerate(thinking_steps):
-            time.sleep(0.3)  # Simulate thinking delay
+            delay = latency.thinking_step()  # Simulate thinking delay
+            if delay:
+                yield Delay(delay)
             
             yield {
                 "thinking": thinking_step,
                 "thinkingComplete": False,
-                "thinkingMetadata": {
-                    "backend": "python",
-                    "format": "streaming",
-                    "step": i + 1
-                }
+                "thinkingMetadata": thinking_step_metadata(i + 1)
             }
 
         # Mark thinking complete
-        time.sleep(0.2)
-        yield {
-            "thinking": "",
-            "thinkingComplete": True,
-            "thinkingMetadata": {
-                "backend": "python",
-                "format": "streaming"
-            }
-        }
+        delay = latency.thinking_complete()
+        if delay:
+            yield Delay(delay)
+        yield THINKING_COMPLETE_EVENT
     
-    # Create the full response text
-    if chart_response:
-        full_response_text = chart_response
+    if chart_stream is not None:
+        # Chart markdown is streamed piece by piece as it is generated
+        chunks = chart_stream
     else:
-        full_response_text = f"AI stream response to: \"{text}\". Files received: {', '.join([f['name'] for f in uploaded_files]) if uploaded_files else 'None'}. This response streams in chunks."
+        # Create the full response text
+        if chart_response:
+            full_response_text = chart_response
+        else:
+            full_response_text = f"AI stream response to: \"{text}\". Files received: {', '.join([f['name'] for f in uploaded_files]) if uploaded_files else 'None'}. This response streams in chunks."
+        
+        # Stream the text in chunks
+        chunks = chunk_text(full_response_text)
     
-    # Stream the text in chunks
     sent_image = False
-    for chunk in chunk_text(full_response_text):
+    for chunk in chunks:
         # Decide if we should send the image with this chunk
         chunk_image_url = None
         if image_url and not sent_image and len(chunk) > 10:  # Send image after some text
@@ -110,6 +529,9 @@ def stream_response_generator(text, uploaded_files, image_url=None, chart_respon
             "text": chunk,
             "imageUrl": chunk_image_url
         }
+        delay = latency.inter_token()  # Simulate network delay
+        if delay:
+            yield Delay(delay)
         
     # Signal completion
-    yield {"complete": True} 
\ No newline at end of file
+    yield COMPLETE_EVENT
\ No newline at end of file
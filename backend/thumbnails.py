@@ -0,0 +1,148 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # Thumbnails are disabled without Pillow
+    Image = None
+
+# Content types Pillow can decode that are worth shrinking
+THUMBNAIL_TYPES = {'image/png', 'image/jpeg', 'image/jpg', 'image/gif', 'image/webp', 'image/bmp'}
+
+def thumbnail_path(blob_path: str, size: int, extension: str) -> str:
+    """Where the thumbnail of a blob is stored: next to the blob itself"""
+    return f"{blob_path}.thumb{size}.{extension}"
+
+def render_thumbnails(blob_path: str, sizes: List[int]) -> int:
+    """
+    Write thumbnails of an image for each size (runs in a worker process)
+    
+    Images with transparency are saved as PNG, everything else as JPEG. Each
+    file is written under a temporary name and renamed into place.
+    
+    Args:
+        blob_path: Path of the original image
+        sizes: Longest-edge sizes in pixels
+        
+    Returns:
+        Number of thumbnails written
+    """
+    with Image.open(blob_path) as image:
+        image.load()
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+        extension = 'png' if has_alpha else 'jpg'
+        
+        written = 0
+        for size in sorted(sizes, reverse=True):
+            if max(image.size) > size:
+                image.thumbnail((size, size))
+            path = thumbnail_path(blob_path, size, extension)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            image.save(temp_path, 'PNG' if has_alpha else 'JPEG', optimize=True, **({} if has_alpha else {'quality': 85}))
+            os.replace(temp_path, path)
+            written += 1
+        return written
+
+class ThumbnailPipeline:
+    """
+    Generates thumbnails of uploaded images in a bounded process pool
+    
+    Uploads submit their blob and return immediately; the pool renders every
+    configured size off the request path. Submissions beyond max_queue are
+    dropped (the original is served until a later upload of the same image
+    queues it again), so a burst of uploads cannot grow memory without bound.
+    """
+    
+    def __init__(self, sizes: List[int], workers: int = 2, max_queue: int = 256, enabled: bool = True):
+        self.sizes = sorted(sizes)
+        self.workers = workers
+        self.max_queue = max_queue
+        self.enabled = enabled and Image is not None and bool(sizes)
+        self.executor = None
+        self.pending = set()
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, thumbnails_config: Dict[str, Any]) -> 'ThumbnailPipeline':
+        """Create a pipeline from the backend.uploads.thumbnails configuration"""
+        return cls(
+            thumbnails_config.get("sizes", [128, 512]),
+            workers=thumbnails_config.get("workers", 2),
+            max_queue=thumbnails_config.get("maxQueue", 256),
+            enabled=thumbnails_config.get("enabled", True)
+        )
+    
+    def accepts(self, content_type: str) -> bool:
+        """Whether uploads of this type get thumbnails"""
+        return self.enabled and content_type in THUMBNAIL_TYPES
+    
+    def submit(self, blob_path: str, content_type: str) -> bool:
+        """
+        Queue thumbnail generation for an uploaded file
+        
+        Args:
+            blob_path: Path of the stored blob
+            content_type: MIME type of the upload
+            
+        Returns:
+            Whether a job was queued (False for non-images, images that
+            already have thumbnails, or a full queue)
+        """
+        if not self.accepts(content_type):
+            return False
+        if all(self.find(blob_path, size) for size in self.sizes):
+            return False
+        
+        with self.lock:
+            if blob_path in self.pending:
+                return False
+            if len(self.pending) >= self.max_queue:
+                self.dropped += 1
+                return False
+            if self.executor is None:
+                # Created on first use so no pool is forked into the gunicorn master
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.pending.add(blob_path)
+        
+        future = self.executor.submit(render_thumbnails, blob_path, self.sizes)
+        future.add_done_callback(lambda f: self._done(blob_path, f))
+        return True
+    
+    def _done(self, blob_path, future):
+        with self.lock:
+            self.pending.discard(blob_path)
+            if future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+    
+    def find(self, blob_path: str, size: int) -> Optional[str]:
+        """Path of a generated thumbnail, or None if it does not exist (yet)"""
+        for extension in ('jpg', 'png'):
+            path = thumbnail_path(blob_path, size, extension)
+            if os.path.exists(path):
+                return path
+        return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and job counters"""
+        with self.lock:
+            return {
+                'enabled': self.enabled,
+                'workers': self.workers,
+                'queueDepth': len(self.pending),
+                'completed': self.completed,
+                'failed': self.failed,
+                'dropped': self.dropped
+            }
+    
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
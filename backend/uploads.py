@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+
+# Bytes read from the request per iteration of a streaming upload
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+class UploadTooLarge(Exception):
+    """Raised when a streamed body exceeds the configured size limit"""
+
+class IncompleteUpload(Exception):
+    """Raised when a body ends before its declared Content-Length"""
+
+class UploadAlreadyCompleted(Exception):
+    """Raised when another request completed (or is completing) the upload session, so its files are gone"""
+
+def copy_stream(source: BinaryIO, target: Optional[BinaryIO], length: Optional[int] = None,
+                limit: Optional[int] = None, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Tuple[int, str]:
+    """
+    Copy a request body to a file through one fixed-size buffer
+    
+    Uses readinto when the source supports it, so no per-chunk bytes objects
+    are allocated; otherwise falls back to read. The SHA-256 and size are
+    computed as the data passes through.
+    
+    Args:
+        source: Raw input stream (wsgi.input)
+        target: Binary file opened for writing, or None to only hash the body
+        length: Declared Content-Length, or None to read until EOF
+        limit: Maximum number of bytes accepted
+        buffer_size: Size of the copy buffer
+        
+    Returns:
+        Tuple of (bytes written, hex SHA-256 digest)
+        
+    Raises:
+        UploadTooLarge: If the body is (or declares to be) over the limit
+        IncompleteUpload: If the body ends before length bytes were read
+    """
+    if limit is not None and length is not None and length > limit:
+        raise UploadTooLarge(f"Upload of {length} bytes exceeds the {limit} byte limit")
+    
+    digest = hashlib.sha256()
+    size = 0
+    readinto = getattr(source, 'readinto', None)
+    buffer = bytearray(buffer_size) if readinto is not None else None
+    view = memoryview(buffer) if buffer is not None else None
+    
+    while length is None or size < length:
+        wanted = buffer_size if length is None else min(buffer_size, length - size)
+        if readinto is not None:
+            count = readinto(view[:wanted])
+            chunk = view[:count] if count else None
+        else:
+            chunk = source.read(wanted)
+            count = len(chunk)
+        if not count:
+            break
+        size += count
+        if limit is not None and size > limit:
+            raise UploadTooLarge(f"Upload exceeds the {limit} byte limit")
+        digest.update(chunk)
+        if target is not None:
+            target.write(chunk)
+    
+    if length is not None and size < length:
+        raise IncompleteUpload(f"Body ended after {size} of {length} bytes")
+    return size, digest.hexdigest()
+
+class UploadSessions:
+    """
+    Resumable uploads: create a session, write byte ranges in any order (and
+    in parallel), then complete it
+    
+    Each session is a preallocated <id>.part file that ranges are written
+    into at their offsets, a <id>.json metadata file and an append-only
+    <id>.ranges log of the ranges received. All state lives on disk, so any
+    worker process can accept any range and sessions survive restarts.
+    Completing a session moves the part file into the blob store without
+    copying it.
+    """
+    
+    ID_LENGTH = 32
+    
+    def __init__(self, folder: str, max_size: Optional[int] = None, ttl: float = 86400.0):
+        self.folder = folder
+        self.max_size = max_size
+        self.ttl = ttl
+        os.makedirs(folder, exist_ok=True)
+    
+    @classmethod
+    def from_config(cls, upload_folder: str, resumable_config: Dict[str, Any]) -> 'UploadSessions':
+        """Create sessions stored under the upload folder from backend.uploads.resumable"""
+        return cls(
+            os.path.join(upload_folder, resumable_config.get("folder", "partial")),
+            max_size=resumable_config.get("maxSize"),
+            ttl=resumable_config.get("ttlSeconds", 86400)
+        )
+    
+    def _path(self, upload_id: str, suffix: str) -> str:
+        if len(upload_id) != self.ID_LENGTH or not all(c in '0123456789abcdef' for c in upload_id):
+            raise KeyError(upload_id)
+        return os.path.join(self.folder, upload_id + suffix)
+    
+    def create(self, name: str, size: int, content_type: str) -> Dict[str, Any]:
+        """
+        Start a session, reserving size bytes of disk up front
+        
+        Args:
+            name: Stored file name
+            size: Total size of the file in bytes
+            content_type: MIME type of the file
+            
+        Returns:
+            Session metadata dictionary including its 'id'
+            
+        Raises:
+            UploadTooLarge: If size exceeds the configured maximum
+            OSError: If the disk space cannot be reserved
+        """
+        if self.max_size is not None and size > self.max_size:
+            raise UploadTooLarge(f"Upload of {size} bytes exceeds the {self.max_size} byte limit")
+        self.sweep()
+        
+        upload_id = uuid.uuid4().hex
+        session = {'id': upload_id, 'name': name, 'type': content_type, 'size': size, 'created': time.time()}
+        part_path = self._path(upload_id, '.part')
+        fd = os.open(part_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            if size and hasattr(os, 'posix_fallocate'):
+                os.posix_fallocate(fd, 0, size)
+            else:
+                os.ftruncate(fd, size)
+        except OSError:
+            os.close(fd)
+            os.unlink(part_path)
+            raise
+        os.close(fd)
+        
+        open(self._path(upload_id, '.ranges'), 'w').close()
+        with open(self._path(upload_id, '.json'), 'w') as f:
+            json.dump(session, f)
+        return session
+    
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Session metadata, or None if the session does not exist"""
+        try:
+            with open(self._path(upload_id, '.json')) as f:
+                return json.load(f)
+        except (KeyError, OSError, ValueError):
+            return None
+    
+    def write(self, session: Dict[str, Any], start: int, end: int, source: BinaryIO,
+              buffer_size: int = DEFAULT_BUFFER_SIZE):
+        """
+        Write bytes start..end (inclusive) of the file from a request body
+        
+        Args:
+            session: Session metadata from get
+            start: First byte offset
+            end: Last byte offset (inclusive)
+            source: Raw input stream holding exactly end - start + 1 bytes
+            buffer_size: Size of the copy buffer
+            
+        Raises:
+            ValueError: If the range lies outside the file
+            IncompleteUpload: If the body ends early (the range is not recorded)
+            UploadAlreadyCompleted: If the session was completed in the meantime
+        """
+        if start < 0 or end < start or end >= session['size']:
+            raise ValueError(f"Range {start}-{end} is outside the {session['size']} byte file")
+        
+        # Each request writes through its own descriptor at its own offset
+        try:
+            target = open(self._path(session['id'], '.part'), 'r+b')
+        except FileNotFoundError:
+            raise UploadAlreadyCompleted(f"Upload {session['id']} is already completed")
+        with target:
+            target.seek(start)
+            copy_stream(source, target, end - start + 1, buffer_size=buffer_size)
+        
+        # One short O_APPEND write per range keeps concurrent writers from interleaving
+        try:
+            fd = os.open(self._path(session['id'], '.ranges'), os.O_WRONLY | os.O_APPEND)
+        except FileNotFoundError:
+            raise UploadAlreadyCompleted(f"Upload {session['id']} is already completed")
+        try:
+            os.write(fd, f"{start} {end + 1}\n".encode())
+        finally:
+            os.close(fd)
+    
+    def received(self, session: Dict[str, Any]) -> List[Tuple[int, int]]:
+        """
+        Merged byte ranges received so far
+        
+        Returns:
+            Sorted list of [start, end) tuples
+            
+        Raises:
+            UploadAlreadyCompleted: If the session was completed in the meantime
+        """
+        try:
+            with open(self._path(session['id'], '.ranges')) as f:
+                ranges = sorted(tuple(map(int, line.split())) for line in f if line.strip())
+        except FileNotFoundError:
+            raise UploadAlreadyCompleted(f"Upload {session['id']} is already completed")
+        merged = []
+        for start, end in ranges:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+    
+    def missing(self, session: Dict[str, Any]) -> List[Tuple[int, int]]:
+        """Byte ranges ([start, end) tuples) not received yet"""
+        gaps = []
+        position = 0
+        for start, end in self.received(session):
+            if start > position:
+                gaps.append((position, start))
+            position = end
+        if position < session['size']:
+            gaps.append((position, session['size']))
+        return gaps
+    
+    def complete(self, session: Dict[str, Any], store) -> Tuple[str, bool]:
+        """
+        Move a fully received file into a blob store
+        
+        Args:
+            session: Session metadata from get
+            store: BlobStore that takes ownership of the part file
+            
+        Returns:
+            Tuple of (hex SHA-256 digest, whether a new blob was stored)
+            
+        Raises:
+            IncompleteUpload: If some ranges are still missing
+            UploadAlreadyCompleted: If a concurrent call claimed the part file first
+        """
+        missing = self.missing(session)
+        if missing:
+            raise IncompleteUpload(f"{sum(end - start for start, end in missing)} bytes not received yet")
+        # Renaming the part file is atomic, so exactly one concurrent call gets to ingest it
+        part = self._path(session['id'], '.part')
+        claimed = self._path(session['id'], f'.{uuid.uuid4().hex}.claimed')
+        try:
+            os.rename(part, claimed)
+        except FileNotFoundError:
+            raise UploadAlreadyCompleted(f"Upload {session['id']} is already completed")
+        os.utime(claimed)  # sweep measures a claim's age from here
+        try:
+            result = store.ingest_file(claimed)
+        except BaseException:
+            # Give the data back to the session so completing can be retried
+            if os.path.exists(claimed):
+                os.rename(claimed, part)
+            raise
+        self.abort(session['id'])
+        return result
+    
+    def abort(self, upload_id: str):
+        """Delete a session and everything received for it"""
+        for suffix in ('.json', '.ranges', '.part'):
+            try:
+                os.unlink(self._path(upload_id, suffix))
+            except (KeyError, FileNotFoundError):
+                pass
+    
+    def sweep(self):
+        """Delete sessions not touched for ttl seconds, and part files a crashed complete left claimed"""
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(('.ranges', '.claimed')):
+                try:
+                    expired = entry.stat().st_mtime < cutoff
+                except FileNotFoundError:
+                    continue
+                if not expired:
+                    continue
+                if entry.name.endswith('.ranges'):
+                    self.abort(entry.name[:-len('.ranges')])
+                else:
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
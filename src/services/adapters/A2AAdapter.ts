@@ -1,7 +1,7 @@
 import { ApiClient, DataTransformer } from '../apiClient';
 import { AbstractBaseAdapter, StreamCallbacks, ProgressCallback } from './BaseAdapter';
 import { MessageRequest, MessageResponse, FileUploadResponse, StreamMessageChunk } from '../../types/api';
-import { mapA2AChunk, normalizeMessageResponse, toA2APayload } from './protocolPayload';
+import { mapA2AChunk, normalizeA2AResponse, toA2APayload } from './protocolPayload';
 
 const A2A_SEND_ENDPOINTS = ['/message:send', '/message/send'];
 const A2A_STREAM_ENDPOINTS = ['/message:stream', '/message/stream'];
@@ -51,7 +51,7 @@ export class A2AAdapter extends AbstractBaseAdapter {
   }
 
   private transformA2AResponse: DataTransformer<unknown, MessageResponse> = (rawData) => {
-    return normalizeMessageResponse(rawData);
+    return normalizeA2AResponse(rawData);
   };
 
   async sendStreamingMessage(
@@ -325,7 +325,91 @@ function eventType(raw: unknown): string {
   return value.toLowerCase();
 }
 
+function readA2AParts(parts: unknown): { text?: string; imageUrl?: string } {
+  if (!Array.isArray(parts)) return {};
+  let text = '';
+  let imageUrl: string | undefined;
+  for (let i = 0; i < parts.length; i += 1) {
+    const part = parts[i];
+    if (!isRecord(part)) continue;
+    const kind = String(part.kind ?? part.type ?? '').toLowerCase();
+    if (kind === 'text') {
+      text += toStringValue(part.text) ?? '';
+    } else if (kind === 'file' && isRecord(part.file)) {
+      const file = part.file;
+      const mimeType = String(file.mimeType ?? '');
+      const uri = toStringValue(file.uri);
+      if (uri && mimeType.startsWith('image/')) imageUrl = uri;
+    }
+  }
+  return {
+    ...(text ? { text } : {}),
+    ...(imageUrl ? { imageUrl } : {}),
+  };
+}
+
+/**
+ * Map A2A task events (`kind`: task, status-update, artifact-update):
+ * artifact parts carry the response, agent messages on working status
+ * updates carry intermediate thinking, and `final` ends the stream.
+ */
+function mapA2ATaskEvent(raw: JsonRecord): StreamMessageChunk | null {
+  if (raw.kind === 'artifact-update') {
+    const artifact = isRecord(raw.artifact) ? raw.artifact : {};
+    const mapped = readA2AParts(artifact.parts);
+    return mapped.text || mapped.imageUrl ? mapped : null;
+  }
+  if (raw.kind === 'status-update') {
+    if (raw.final === true) return { complete: true };
+    const status = isRecord(raw.status) ? raw.status : {};
+    const message = isRecord(status.message) ? status.message : {};
+    const thinking = readA2AParts(message.parts).text;
+    return thinking ? { thinking, thinkingComplete: false } : null;
+  }
+  return null;
+}
+
+export function normalizeA2AResponse(raw: unknown): MessageResponse {
+  if (!isRecord(raw) || (raw.kind !== 'task' && raw.kind !== 'message')) {
+    return normalizeMessageResponse(raw);
+  }
+
+  if (raw.kind === 'message') {
+    const { text = '', imageUrl } = readA2AParts(raw.parts);
+    return { text, ...(imageUrl ? { imageUrl } : {}) };
+  }
+
+  let text = '';
+  let imageUrl: string | undefined;
+  const artifacts = Array.isArray(raw.artifacts) ? raw.artifacts : [];
+  for (let i = 0; i < artifacts.length; i += 1) {
+    const artifact = artifacts[i];
+    if (!isRecord(artifact)) continue;
+    const mapped = readA2AParts(artifact.parts);
+    text += mapped.text ?? '';
+    imageUrl = mapped.imageUrl ?? imageUrl;
+  }
+
+  let thinking = '';
+  const history = Array.isArray(raw.history) ? raw.history : [];
+  for (let i = 0; i < history.length; i += 1) {
+    const message = history[i];
+    if (!isRecord(message) || message.role !== 'agent') continue;
+    thinking += readA2AParts(message.parts).text ?? '';
+  }
+
+  return {
+    text,
+    ...(imageUrl ? { imageUrl } : {}),
+    ...(thinking ? { thinking } : {}),
+  };
+}
+
 export function mapA2AChunk(raw: unknown): StreamMessageChunk | null {
+  if (isRecord(raw) && (raw.kind === 'task' || raw.kind === 'status-update' || raw.kind === 'artifact-update')) {
+    return mapA2ATaskEvent(raw);
+  }
+
   const mapped = normalizeGenericChunk(raw);
   if (mapped) return mapped;
 
@@ -354,6 +438,17 @@ export function mapAgUiChunk(raw: unknown): StreamMessageChunk | null {
     return { ...(generic ?? {}), complete: true };
   }
 
+  // Thinking content events also contain TEXT_MESSAGE_CONTENT; their delta is thinking, not text
+  if (type.startsWith('THINKING_TEXT_MESSAGE_CONTENT')) {
+    const thinking = isRecord(raw) ? toStringValue(raw.delta) : undefined;
+    return thinking ? { thinking, thinkingComplete: false } : null;
+  }
+
+  // Start and end events of messages and thinking blocks are not the end of the run
+  if (/^(THINKING_|TEXT_MESSAGE_|THINKING_TEXT_MESSAGE_)(START|END)$/.test(type)) {
+    return null;
+  }
+
   if (type.includes('TEXT_MESSAGE_CONTENT') || type.includes('TEXT_DELTA')) {
     const text = extractText(raw);
     if (!text) return generic;